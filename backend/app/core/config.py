@@ -28,11 +28,88 @@ class Settings(BaseSettings):
     DB_POOL_SIZE: int = 20
     DB_MAX_OVERFLOW: int = 30
     DB_POOL_RECYCLE: int = 3600
+    # Write-behind queue for chat turns and summaries (see ConversationWriter)
+    CONVERSATION_WRITE_QUEUE_SIZE: int = 1000
+    CONVERSATION_WRITE_BATCH_SIZE: int = 100
+    CONVERSATION_WRITE_MAX_WAIT_MS: float = 50.0
     
     # OpenAI settings
     OPENAI_API_KEY: str
     OPENAI_MODEL: str = "gpt-3.5-turbo"
     OPENAI_MAX_TOKENS: int = 1500
+    CHAT_HISTORY_TURNS: int = 5  # Recent turns sent with each prompt; the rolling summary covers older ones
+    # Streamed tokens are sent in one SSE frame per this many characters or milliseconds
+    SSE_COALESCE_CHARS: int = 64
+    SSE_COALESCE_MS: float = 30.0
+
+    # RAG settings
+    EMBEDDING_MODEL: str = "text-embedding-3-small"
+    VECTOR_BACKEND: str = "pgvector"  # "pgvector" (Supabase documents table) or "local" (memory-mapped index)
+    LOCAL_INDEX_DIR: str = ".cache/local_index"
+    RAG_MATCH_THRESHOLD: float = 0.5
+    RAG_MATCH_COUNT: int = 100
+    # Compact first-pass search: 0 disables; otherwise must match the `embedding_compact`
+    # column (pgvector, scripts/supabase_compact_embeddings.sql) - the local index records its own layout
+    EMBEDDING_COMPACT_DIMENSIONS: int = 0
+    RAG_RESCORE_FACTOR: int = 4  # Compact candidates re-scored at full precision, per requested match
+    RAG_PARENT_EXPANSION: bool = True  # Replace winning child chunks with their parent sections
+    # pgvector >= 0.8 iterative index scan for filtered searches ("relaxed_order", "strict_order"; "" leaves it off)
+    RAG_HNSW_ITERATIVE_SCAN: str = "relaxed_order"
+    # hnsw.ef_search per query (recall vs latency); raised to the rows a scan must return, max 1000
+    RAG_HNSW_EF_SEARCH: int = 40
+
+    # Rerank cascade: how many vector hits reach the cross-encoder
+    RAG_RERANK_SIMILARITY_WINDOW: float = 0.15
+    RAG_RERANK_DECISIVE_GAP: float = 0.10
+    RAG_RERANK_MIN_PAIRS: int = 10
+    RAG_RERANK_MAX_PAIRS: int = 50
+
+    # Hybrid retrieval: BM25 hits fused with vector hits before reranking
+    RAG_HYBRID_ENABLED: bool = True
+    RAG_LEXICAL_TOP_K: int = 20
+    RAG_RRF_K: int = 60
+    LEXICAL_INDEX_PATH: str = ".cache/lexical_index.npz"
+
+    # Context packing: chunks go into the system prompt in rerank order until the budget is spent
+    RAG_CONTEXT_TOKEN_BUDGET: int = 1500
+    RAG_CONTEXT_MAX_CHUNKS: int = 5
+    RAG_CONTEXT_REDUNDANCY_THRESHOLD: float = 0.8
+
+    # PDF ingestion pipeline (parse in processes -> chunk -> embed concurrently -> bulk insert)
+    INGEST_CHUNK_SIZE: int = 400  # Child chunks: embedded and matched
+    INGEST_CHUNK_OVERLAP: int = 50
+    INGEST_PARENT_CHUNK_SIZE: int = 2000  # Parent sections sent to the LLM in place of their children; 0 disables
+    INGEST_PARSE_WORKERS: int = 2
+    INGEST_EMBED_CONCURRENCY: int = 4
+    INGEST_EMBED_BATCH_SIZE: int = 256  # Max inputs per embeddings request
+    INGEST_EMBED_BATCH_TOKENS: int = 100_000  # Max tokens per embeddings request
+    INGEST_EMBED_REQUESTS_PER_MINUTE: int = 500
+    INGEST_EMBED_TOKENS_PER_MINUTE: int = 1_000_000
+    INGEST_EMBED_MAX_RETRIES: int = 6  # Per batch, on 429s and transient API errors
+    INGEST_INSERT_BATCH_SIZE: int = 500
+    INGEST_QUEUE_SIZE: int = 8  # Batches buffered between stages
+    INGEST_MANIFEST_FILENAME: str = ".ingest_manifest.json"  # Per-file/per-chunk hashes, kept in the PDF directory
+    INGEST_ATTRIBUTES_FILENAME: str = "ingest_metadata.json"  # Optional department/state/issued_on per PDF, same directory
+    INGEST_DEDUP_ENABLED: bool = True  # MinHash near-duplicate chunks share one row
+    INGEST_DEDUP_THRESHOLD: float = 0.9  # Estimated Jaccard similarity of 5-word shingles
+    INGEST_JOB_WORKERS: int = 1  # Concurrent ingestion jobs; runs over one directory share its manifest
+    INGEST_JOBS_KEPT: int = 50
+
+    # Query embedding cache (in-process LRU + on-disk SQLite store)
+    EMBEDDING_CACHE_SIZE: int = 2048
+    EMBEDDING_CACHE_DISK_SIZE: int = 50000
+    EMBEDDING_CACHE_PATH: str = ".cache/embeddings.sqlite3"  # Empty disables the disk tier
+
+    # Cross-encoder reranking (micro-batched across concurrent requests)
+    RERANKER_BACKEND: str = "torch"  # "torch" (fp32 sentence-transformers) or "onnx" (int8 ONNX Runtime)
+    RERANKER_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    RERANKER_ONNX_DIR: str = ".cache/reranker-onnx"
+    RERANKER_MAX_LENGTH: int = 512
+    RERANK_MAX_BATCH_SIZE: int = 256
+    RERANK_MAX_WAIT_MS: float = 5.0
+    RERANK_PREDICT_BATCH_SIZE: int = 64
+    RERANK_CACHE_SIZE: int = 50000
+    RERANK_CACHE_TTL_SECONDS: int = 3600
     
     # ElevenLabs TTS settings
     ELEVENLABS_API_KEY: str
@@ -54,6 +131,9 @@ class Settings(BaseSettings):
     # Logging
     LOG_LEVEL: str = "INFO"
 
+    # Build models and API clients during startup instead of on the first request
+    PRELOAD_PROVIDERS: bool = True
+
     @field_validator("ALLOWED_ORIGINS", mode="before")
     @classmethod
     def split_origins(cls, v):
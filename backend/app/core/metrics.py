@@ -0,0 +1,63 @@
+import threading
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict
+
+
+class MetricsRegistry:
+    """Thread-safe in-process counters and latency/size samples"""
+
+    def __init__(self, window: int = 1024):
+        self._window = window
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def incr(self, name: str, value: float = 1) -> None:
+        """Increment a counter"""
+        with self._lock:
+            self._counters[name] += value
+
+    def observe(self, name: str, value: float) -> None:
+        """Record a sample; only the most recent `window` samples are kept"""
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self._window)
+            samples.append(value)
+
+    def counter(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return counters and summary statistics for every sample series"""
+        with self._lock:
+            counters = dict(self._counters)
+            series = {name: sorted(values) for name, values in self._samples.items()}
+
+        summaries = {}
+        for name, values in series.items():
+            if not values:
+                continue
+            summaries[name] = {
+                "count": len(values),
+                "mean": sum(values) / len(values),
+                "p50": _percentile(values, 0.50),
+                "p95": _percentile(values, 0.95),
+                "max": values[-1],
+            }
+        return {"counters": counters, "samples": summaries}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._samples.clear()
+
+
+def _percentile(sorted_values, q: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+# Global registry shared by services and exposed via /health/metrics
+metrics = MetricsRegistry()
@@ -0,0 +1,88 @@
+import asyncio
+import inspect
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderRegistry:
+    """
+    Lazily constructed, process-wide shared components (models, API clients).
+
+    Factories are registered at import time but only run on first `get()` or
+    during an explicit `warm_up()` from the application lifespan, so importing a
+    service module stays cheap for tests, scripts and worker start-up.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._closers: Dict[str, Callable[[Any], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._load_times: Dict[str, float] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+
+    def register(self, name: str, factory: Callable[[], Any], close: Optional[Callable[[Any], Any]] = None) -> None:
+        """Register a factory; `close` (sync or async) is called on shutdown if the provider was built"""
+        self._factories[name] = factory
+        self._locks.setdefault(name, threading.Lock())
+        if close is not None:
+            self._closers[name] = close
+
+    def get(self, name: str) -> Any:
+        """Return the shared instance, building it on first use"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        if name not in self._factories:
+            raise KeyError(f"Unknown provider: {name}")
+
+        with self._locks[name]:
+            instance = self._instances.get(name)
+            if instance is None:
+                started = time.perf_counter()
+                instance = self._factories[name]()
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                self._instances[name] = instance
+                self._load_times[name] = elapsed_ms
+                metrics.observe(f"providers.{name}.load_ms", elapsed_ms)
+                logger.info(f"Provider '{name}' loaded in {elapsed_ms:.0f} ms")
+        return instance
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._instances
+
+    async def warm_up(self, names: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """Build providers off the event loop; returns load times in milliseconds"""
+        names = list(names) if names is not None else list(self._factories)
+        for name in names:
+            try:
+                await asyncio.to_thread(self.get, name)
+            except Exception as e:
+                logger.error(f"Provider '{name}' failed to load: {e}")
+        return {name: self._load_times[name] for name in names if name in self._load_times}
+
+    def load_times(self) -> Dict[str, float]:
+        return dict(self._load_times)
+
+    async def close(self) -> None:
+        """Release every built provider that registered a closer"""
+        for name, closer in self._closers.items():
+            instance = self._instances.pop(name, None)
+            if instance is None:
+                continue
+            try:
+                result = closer(instance)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Error closing provider '{name}': {e}")
+
+
+# Global registry shared by all services
+providers = ProviderRegistry()
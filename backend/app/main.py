@@ -7,7 +7,9 @@ import httpx
 
 from .core.config import get_settings
 from .core.database import init_db, close_db
-from .routers import chat, health, tts, document, user, auth, admin
+from .routers import chat, health, tts, document, user, auth, admin, rag
+from .core.providers import providers
+from .services.conversation_writer import conversation_writer
 
 # Configure logging
 logging.basicConfig(
@@ -33,11 +35,23 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Database initialization failed: {e}")
         raise
+
+    await conversation_writer.start()
+
+    if settings.PRELOAD_PROVIDERS:
+        load_times = await providers.warm_up()
+        for name, elapsed_ms in load_times.items():
+            logger.info(f"Warm-up: {name} ready in {elapsed_ms:.0f} ms")
     
     yield
     
     # Shutdown
     logger.info("Shutting down application")
+    # Summary refreshes still in flight queue their writes, then queued chat turns
+    # and summaries are written before the connection pool goes away
+    await chat.drain_summary_refreshes()
+    await conversation_writer.close()
+    await providers.close()
     await close_db()
 
 
@@ -68,6 +82,7 @@ app.include_router(document.router)
 app.include_router(user.router)
 app.include_router(auth.router)
 app.include_router(admin.router)
+app.include_router(rag.router)
 # Health check endpoints
 @app.get("/")
 async def root():
@@ -2,7 +2,7 @@ import uuid
 from datetime import datetime, timezone
 from typing import Optional
 
-from sqlalchemy import Column, String, Integer, DateTime, Text, ForeignKey, Boolean, func
+from sqlalchemy import Column, String, Integer, DateTime, Text, ForeignKey, Boolean, Index, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
@@ -21,7 +21,8 @@ class User(Base):
 
     conversations = relationship("Conversation", back_populates="user")
 
-# Simplified SQLAlchemy Model - Single Table
+# Conversation header; the question/answer columns hold the opening exchange (turn 0)
+# for listings and admin stats, every exchange is a ConversationTurn
 class Conversation(Base):
     __tablename__ = "conversations"
 
@@ -30,7 +31,27 @@ class Conversation(Base):
     user_question = Column(Text, nullable=False)
     assistant_answer = Column(Text, nullable=False)
     response_time = Column(Integer, nullable=False)  # Response time in milliseconds
+    summary = Column(Text, nullable=True)  # Rolling summary, refreshed after each answer
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     user = relationship("User", back_populates="conversations")
+    turns = relationship("ConversationTurn", back_populates="conversation", passive_deletes=True)
+
+# One question/answer exchange, ordered by turn_index within its conversation
+class ConversationTurn(Base):
+    __tablename__ = "conversation_turns"
+    __table_args__ = (
+        # Recent turns are a range scan on this index; uniqueness orders concurrent appends
+        Index("idx_conversation_turns_conversation_turn", "conversation_id", "turn_index", unique=True),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    conversation_id = Column(UUID(as_uuid=True), ForeignKey('conversations.id', ondelete="CASCADE"), nullable=False)
+    turn_index = Column(Integer, nullable=False)
+    user_question = Column(Text, nullable=False)
+    assistant_answer = Column(Text, nullable=False)
+    response_time = Column(Integer, nullable=False)  # Response time in milliseconds
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    conversation = relationship("Conversation", back_populates="turns")
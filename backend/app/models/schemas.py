@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date, datetime
 from typing import Dict, List, Optional, Any
 from pydantic import BaseModel, UUID4, Field, EmailStr
 from uuid import UUID
@@ -39,6 +39,17 @@ class Conversation(BaseModel):
     created_at: datetime
 
 
+class ConversationTurn(BaseModel):
+    turn_index: int
+    user_question: str
+    assistant_answer: str
+    response_time: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
 # Chat models
 class ChatMessage(BaseModel):
     role: str  # "user" or "assistant"
@@ -46,10 +57,20 @@ class ChatMessage(BaseModel):
     timestamp: Optional[datetime] = None
 
 
+class RetrievalFilterRequest(BaseModel):
+    """Limits document search to matching circulars; unset fields do not filter"""
+    sources: Optional[List[str]] = None  # PDF filenames
+    department: Optional[str] = None
+    state: Optional[str] = None
+    issued_from: Optional[date] = None
+    issued_to: Optional[date] = None
+
+
 class ChatRequest(BaseModel):
     message: str
     conversation_history: Optional[List[ChatMessage]] = []
     conversation_id: Optional[str] = None
+    filters: Optional[RetrievalFilterRequest] = None
 
 
 class ChatResponse(BaseModel):
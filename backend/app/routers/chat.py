@@ -1,20 +1,75 @@
+import asyncio
 import logging
+import uuid
+from collections import OrderedDict
 from datetime import datetime, timezone
 from fastapi import APIRouter, HTTPException, Request, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.responses import StreamingResponse
-from typing import List
-import json
+from typing import List, Optional
 
-from ..models.schemas import ChatRequest, User, Conversation as ConversationSchema
-from ..services.database_service import database_service
+from ..models.schemas import ChatRequest, User, Conversation as ConversationSchema, ConversationTurn as ConversationTurnSchema
+from ..services.database_service import SummaryRecord, TurnRecord, database_service
+from ..services.conversation_writer import conversation_writer
+from ..core.config import get_settings
 from ..core.database import get_session
-from ..utils.openai_helpers import get_openai_response, detect_language
+from ..utils.openai_helpers import get_openai_response, detect_language, summarize_exchange
 from ..utils.dependencies import get_current_user
+from ..utils.sse import SSEWriter, coalesce, sse_frame
 from ..services.rag_service import get_rag_context
+from ..services.vector_store import RetrievalFilters
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# The event loop only holds weak references to tasks; keep summary refreshes alive
+_summary_tasks: set = set()
+# Latest summary refresh per conversation (recent ones only). A refresh folds its turn
+# into the result of the one before it, so a quick follow-up whose refresh overlaps,
+# or reads the summary before the previous one is written, cannot drop a turn.
+_summary_refreshes: "OrderedDict[str, asyncio.Task]" = OrderedDict()
+_SUMMARY_REFRESHES_KEPT = 1024
+
+
+async def refresh_conversation_summary(
+    conversation_id: str,
+    previous_summary: str | None,
+    user_message: str,
+    assistant_answer: str,
+    after: Optional[asyncio.Task] = None,
+) -> Optional[str]:
+    """Fold the finished exchange into the stored summary, after the response has streamed"""
+    if after is not None:
+        await asyncio.wait((after,))
+        if not after.cancelled() and after.exception() is None and after.result():
+            previous_summary = after.result()
+    summary = await summarize_exchange(previous_summary, user_message, assistant_answer)
+    if summary:
+        await conversation_writer.put(SummaryRecord(conversation_id, summary))
+    return summary or previous_summary
+
+
+def schedule_summary_refresh(
+    conversation_id: str, previous_summary: str | None, user_message: str, assistant_answer: str
+) -> None:
+    """Queue a summary refresh behind any earlier one for the same conversation"""
+    task = asyncio.create_task(refresh_conversation_summary(
+        conversation_id, previous_summary, user_message, assistant_answer,
+        after=_summary_refreshes.get(conversation_id),
+    ))
+    _summary_tasks.add(task)
+    task.add_done_callback(_summary_tasks.discard)
+    _summary_refreshes[conversation_id] = task
+    _summary_refreshes.move_to_end(conversation_id)
+    while len(_summary_refreshes) > _SUMMARY_REFRESHES_KEPT:
+        _summary_refreshes.popitem(last=False)
+
+
+async def drain_summary_refreshes() -> None:
+    """Wait for pending summary refreshes; the lifespan calls this before closing the writer"""
+    while _summary_tasks:
+        await asyncio.gather(*_summary_tasks, return_exceptions=True)
 
 
 @router.post("/")
@@ -24,6 +79,7 @@ async def chat(
     db: AsyncSession = Depends(get_session)
 ):
     """Main chat endpoint - now user-centric and conversation-aware"""
+    retrieval = None
     try:
         start_time = datetime.now()
         
@@ -36,126 +92,115 @@ async def chat(
             
             async def error_stream():
                 # Format error as an SSE message
-                yield f"data: {json.dumps({'error': error_response})}\n\n"
+                yield sse_frame({'error': error_response})
             return StreamingResponse(error_stream(), media_type="text/event-stream")
+
+        # Retrieval only needs the raw message: start it now so it overlaps the
+        # history lookup below
+        filters = RetrievalFilters(**request.filters.model_dump()) if request.filters else None
+        retrieval = asyncio.create_task(get_rag_context(request.message, filters=filters))
         
-        # Get conversation history for context
+        # Get the latest turns for context
         if request.conversation_id:
-            conversation_history = await database_service.get_conversation_by_id(
-                db, request.conversation_id, str(current_user.id)
+            conversation_history = await database_service.get_recent_turns(
+                db, request.conversation_id, str(current_user.id), limit=settings.CHAT_HISTORY_TURNS
             )
         else:
             conversation_history = []
         
-        # Prepare context for OpenAI from previous conversations
+        # Prepare context for OpenAI from previous turns
         conversation_context = []
-        for conv in conversation_history:
+        for turn in conversation_history:
             conversation_context.extend([
-                {"role": "user", "content": conv.user_question},
-                {"role": "assistant", "content": conv.assistant_answer}
+                {"role": "user", "content": turn.user_question},
+                {"role": "assistant", "content": turn.assistant_answer}
             ])
+        # Maintained after each answer, so reading it costs nothing here
+        conversation_summary = conversation_history[-1].summary if conversation_history else None
+
+        # An unknown (or another user's) conversation id starts a new conversation. Its
+        # header is written now, so a follow-up finds it from any worker even while the
+        # opening turn is still in the write-behind queue.
+        is_new_conversation = not conversation_history and (
+            not request.conversation_id
+            or not await database_service.conversation_exists(db, request.conversation_id, str(current_user.id))
+        )
+        if is_new_conversation:
+            conversation_id = str(uuid.uuid4())
+            await database_service.create_conversation(db, conversation_id, str(current_user.id), request.message)
+        else:
+            conversation_id = request.conversation_id
+
+        # Nothing below touches the database: hand the connection back to the pool now
+        # rather than holding it for the whole stream (writes go through the queue)
+        await db.close()
         
         async def stream_generator():
             full_response = ""
-            new_conversation_id = request.conversation_id
+            sse = SSEWriter("chat.sse")
 
             try:
-                # If it's a new chat, create the conversation entry first to get an ID
-                if not new_conversation_id:
-                    saved_conv = await database_service.save_conversation(
-                        db,
-                        user_id=str(current_user.id),
-                        user_question=request.message,
-                        assistant_answer="", # Save empty first
-                        response_time=0
-                    )
-                    new_conversation_id = str(saved_conv.id)
-                
-                # 1. Get RAG context before yielding anything to the client.
-                # This ensures the potentially slow operation completes first.
-                # Summarize the conversation history using OpenAI's fastest model (gpt-3.5-turbo)
-                summary_text = ""
-                if conversation_context:
-                    # Prepare a summarization prompt
-                    summary_prompt = (
-                        "Summarize the following conversation between a user and an assistant in 2-3 sentences, "
-                        "focusing on the main topics, user needs, and any important context. "
-                        "Use the same language as the conversation.\n\n"
-                        "Conversation:\n"
-                    )
-                    # Flatten the conversation context for summarization
-                    for msg in conversation_context:
-                        summary_prompt += f"{msg['role'].capitalize()}: {msg['content']}\n"
-                    try:
-                        from app.utils.openai_helpers import openai_client
-                        summary_response = openai_client.chat.completions.create(
-                            model="gpt-3.5-turbo",
-                            messages=[
-                                {"role": "system", "content": "You are a helpful assistant that summarizes conversations."},
-                                {"role": "user", "content": summary_prompt}
-                            ],
-                            max_tokens=128,
-                            temperature=0.3
-                        )
-                        summary_text = summary_response.choices[0].message.content.strip()
-                    except Exception as e:
-                        logger.error(f"Error during conversation summarization: {e}")
-                        summary_text = ""
-
-                # Enhance the user message with the conversation summary (if available)
-                enhanced_message = request.message
-                if summary_text:
-                    enhanced_message = (
-                        f"Previous conversation summary: {summary_text}\n\n"
-                        f"Current user message: {request.message}"
-                    )
-
-                # Get RAG context using the enhanced message
-                rag_context = get_rag_context(enhanced_message)
+                # 1. Finish retrieval before yielding anything
+                rag_context = await retrieval
 
                 # Now send the conversation_id as the first event
-                yield f"data: {json.dumps({'conversationId': new_conversation_id})}\n\n"
+                yield sse.frame({'conversationId': conversation_id})
                 
                 # 2. Get the streaming response using the retrieved context
                 response_stream =  get_openai_response(
                     request.message, 
                     conversation_context,
                     language=input_language,
-                    rag_context=rag_context  # Pass the context here
+                    rag_context=rag_context,  # Pass the context here
+                    conversation_summary=conversation_summary
                 )
                 
-                async for chunk in response_stream:
-                    if chunk:
-                        full_response += chunk
-                        # Send each chunk as a data-only SSE message
-                        # Use json.dumps to handle special characters like newlines correctly
-                        yield f"data: {json.dumps({'chunk': chunk})}\n\n"
+                # Send the tokens as data-only SSE messages, batched into a frame per
+                # SSE_COALESCE_CHARS characters or SSE_COALESCE_MS, whichever comes first
+                async for chunk in coalesce(
+                    response_stream,
+                    max_chars=settings.SSE_COALESCE_CHARS,
+                    max_delay=settings.SSE_COALESCE_MS / 1000,
+                ):
+                    full_response += chunk
+                    yield sse.frame({'chunk': chunk})
 
             except Exception as e:
                 logger.error(f"Error during stream generation: {e}")
                 # --- FIX: Send error as a JSON object ---
                 error_data = {"error": "An unexpected error occurred during streaming."}
-                yield f"data: {json.dumps(error_data)}\n\n"
+                yield sse.frame(error_data)
             
             finally:
-                # Update the conversation with the full response at the end
-                if new_conversation_id:
-                    processing_time = int((datetime.now() - start_time).total_seconds() * 1000)
-                    await database_service.update_conversation(
-                        db,
-                        conversation_id=new_conversation_id,
-                        assistant_answer=full_response,
-                        response_time=processing_time
-                    )
+                sse.close()
+                # The client went away (or a stage failed) before retrieval was awaited
+                retrieval.cancel()
+                # Queue the finished turn; the background writer batches it with others
+                processing_time = int((datetime.now() - start_time).total_seconds() * 1000)
+                await conversation_writer.put(TurnRecord(
+                    conversation_id=conversation_id,
+                    user_id=str(current_user.id),
+                    user_question=request.message,
+                    assistant_answer=full_response,
+                    response_time=processing_time,
+                    created_at=datetime.now(timezone.utc),
+                    new_conversation=is_new_conversation
+                ))
+                if full_response:
+                    # The next turn reads the refreshed summary; nobody waits for it now
+                    schedule_summary_refresh(conversation_id, conversation_summary, request.message, full_response)
         
         # Use text/event-stream media type
         return StreamingResponse(stream_generator(), media_type="text/event-stream")
         
     except Exception as e:
         logger.error(f"Chat endpoint error: {e}")
+        # The stream that would have awaited retrieval never starts
+        if retrieval is not None:
+            retrieval.cancel()
         async def exception_stream():
             error_data = {"error": "An unexpected error occurred."}
-            yield f"data: {json.dumps(error_data)}\n\n"
+            yield sse_frame(error_data)
         return StreamingResponse(exception_stream(), media_type="text/event-stream", status_code=500)
 
 
@@ -177,6 +222,26 @@ async def get_chat_history(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/{conversation_id}/turns", response_model=List[ConversationTurnSchema])
+async def get_conversation_turns(
+    conversation_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_session)
+):
+    """Get the full transcript of one of the user's conversations, oldest turn first"""
+    try:
+        turns = await database_service.get_conversation_turns(db, conversation_id, str(current_user.id))
+        if not turns and not await database_service.conversation_exists(db, conversation_id, str(current_user.id)):
+            raise HTTPException(status_code=404, detail="Conversation not found")
+        return turns
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting turns of conversation {conversation_id} for user {current_user.id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/stats")
 async def get_user_stats(
     current_user: User = Depends(get_current_user),
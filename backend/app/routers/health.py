@@ -3,8 +3,11 @@ from datetime import datetime, timezone
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..models.schemas import HealthResponse
+from ..models.schemas import HealthResponse, User
 from ..core.database import get_session, check_db_health
+from ..core.metrics import metrics
+from ..core.providers import providers
+from ..utils.admin_dependencies import require_admin
 
 router = APIRouter(prefix="/health", tags=["health"])
 logger = logging.getLogger(__name__)
@@ -46,4 +49,14 @@ async def check_database_health():
             "status": "error",
             "message": str(e),
             "timestamp": datetime.now(timezone.utc)
-        } 
\ No newline at end of file
+        }
+
+
+@router.get("/metrics")
+async def get_metrics(admin_user: User = Depends(require_admin)):
+    """In-process counters and latency summaries for this worker (admins only)"""
+    return {
+        **metrics.snapshot(),
+        "provider_load_ms": providers.load_times(),
+        "timestamp": datetime.now(timezone.utc)
+    }
@@ -1,17 +1,22 @@
 # app/routers/rag.py
 
-from fastapi import APIRouter, HTTPException, Body
-from app.services.rag_service import query_rag, ingest_pdfs_from_directory
+from fastapi import APIRouter, HTTPException, Body, Depends
+from app.core.providers import providers
+from app.models.schemas import User
+from app.services.rag_service import query_rag
+from app.services import ingestion_jobs  # noqa: F401  (registers the "ingestion_jobs" provider)
+from app.utils.admin_dependencies import require_admin
+from app.utils.dependencies import get_current_user
 import os
 
-router = APIRouter()
+router = APIRouter(prefix="/rag", tags=["rag"])
 
 # Define the path to your local PDF directory
 # Make sure this directory exists and contains your PDF files.
 PDF_DIRECTORY = os.path.join(os.path.dirname(__file__), "..", "..", "data")
 
 @router.post("/query")
-async def query_endpoint(query: str = Body(..., embed=True)):
+async def query_endpoint(query: str = Body(..., embed=True), current_user: User = Depends(get_current_user)):
     """
     Accepts a query and returns a RAG-generated answer.
     """
@@ -19,21 +24,53 @@ async def query_endpoint(query: str = Body(..., embed=True)):
         raise HTTPException(status_code=400, detail="Query cannot be empty.")
     
     try:
-        answer = query_rag(query)
+        answer = await query_rag(query)
         return {"answer": answer}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
-@router.post("/ingest")
-async def ingest_endpoint():
+@router.post("/ingest", status_code=202)
+async def ingest_endpoint(admin_user: User = Depends(require_admin)):
     """
-    Triggers the ingestion process for PDF documents in the local 'data' directory.
+    Queues ingestion of the PDF documents in the local 'data' directory as a
+    background job and returns its id; poll `/ingest/jobs/{job_id}` for progress.
     """
     if not os.path.exists(PDF_DIRECTORY) or not os.path.isdir(PDF_DIRECTORY):
          raise HTTPException(status_code=404, detail=f"Directory not found: {PDF_DIRECTORY}")
 
     try:
-        ingest_pdfs_from_directory(PDF_DIRECTORY)
-        return {"message": "Ingestion process started successfully."}
+        job = providers.get("ingestion_jobs").submit(PDF_DIRECTORY)
+        return {"message": "Ingestion job queued.", "job_id": job.id, "status": job.status}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to start ingestion: {str(e)}")
+
+@router.get("/ingest/jobs")
+async def list_ingest_jobs(admin_user: User = Depends(require_admin)):
+    """
+    Lists recent ingestion jobs, newest first, without per-file detail.
+    """
+    return {"jobs": [job.as_dict(include_files=False) for job in providers.get("ingestion_jobs").list()]}
+
+@router.get("/ingest/jobs/{job_id}")
+async def get_ingest_job(job_id: str, admin_user: User = Depends(require_admin)):
+    """
+    Returns a job's status, per-file progress, per-stage throughput and errors.
+    """
+    job = providers.get("ingestion_jobs").get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Ingestion job not found: {job_id}")
+    return job.as_dict()
+
+@router.post("/ingest/jobs/{job_id}/cancel")
+async def cancel_ingest_job(job_id: str, admin_user: User = Depends(require_admin)):
+    """
+    Cancels a queued or running job. Files that have not finished are rolled back.
+    """
+    manager = providers.get("ingestion_jobs")
+    job = manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Ingestion job not found: {job_id}")
+    if job.finished:
+        raise HTTPException(status_code=409, detail=f"Ingestion job already {job.status}")
+    manager.cancel(job_id)
+    return {"message": "Cancellation requested.", "job_id": job.id, "status": job.status}
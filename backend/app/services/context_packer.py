@@ -0,0 +1,185 @@
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+from ..core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+WORD_RE = re.compile(r"\w+")
+
+
+@dataclass
+class PackedContext:
+    text: str
+    tokens: int
+    chunk_ids: List[str] = field(default_factory=list)
+    dropped_redundant: int = 0
+    dropped_budget: int = 0
+    trimmed_overlap_chars: int = 0
+    fallbacks: int = 0
+    recounted: int = 0  # Chunks tokenized here because they had no usable stored token_count
+    scripts: Dict[str, int] = field(default_factory=dict)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "tokens": self.tokens,
+            "chunks": len(self.chunk_ids),
+            "dropped_redundant": self.dropped_redundant,
+            "dropped_budget": self.dropped_budget,
+            "trimmed_overlap_chars": self.trimmed_overlap_chars,
+            "fallbacks": self.fallbacks,
+            "recounted": self.recounted,
+            "scripts": dict(self.scripts),
+        }
+
+
+def _shingles(text: str, size: int = 5) -> Set[int]:
+    words = WORD_RE.findall(text.casefold())
+    if len(words) < size:
+        return {hash(" ".join(words))} if words else set()
+    return {hash(" ".join(words[i:i + size])) for i in range(len(words) - size + 1)}
+
+
+def _overlap(previous: str, current: str, window: int = 300, min_overlap: int = 20) -> int:
+    """Length of the longest suffix of `previous` that `current` starts with (splitter overlap)"""
+    tail = previous[-window:]
+    probe = current[:min_overlap]
+    if len(probe) < min_overlap:
+        return 0
+    start = tail.find(probe)
+    while start != -1:
+        if current.startswith(tail[start:]):
+            return len(tail) - start
+        start = tail.find(probe, start + 1)
+    return 0
+
+
+class ContextPacker:
+    """
+    Fills a prompt token budget with retrieved chunks in rerank order.
+
+    Chunks that are (near-)duplicates of an already packed chunk are dropped, and
+    the text shared with a neighbouring chunk through the splitter overlap is
+    trimmed so the same sentences are not paid for twice. A document carrying
+    `fallback_content` (a parent section expanded from a matched child) falls
+    back to that shorter text when the section does not fit.
+
+    Token counts stored at ingestion (`token_count`, `fallback_token_count`) are
+    used as is; only text changed by overlap trimming, or rows without a count,
+    is tokenized here.
+    """
+
+    def __init__(
+        self,
+        token_budget: int,
+        model: str = "gpt-3.5-turbo",
+        separator: str = "\n---\n",
+        redundancy_threshold: float = 0.8,
+    ):
+        import tiktoken
+
+        self.token_budget = token_budget
+        self.separator = separator
+        self.redundancy_threshold = redundancy_threshold
+        try:
+            self.encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            self.encoding = tiktoken.get_encoding("cl100k_base")
+        self.separator_tokens = len(self.encoding.encode(separator))
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.encoding.encode(text))
+
+    def _tokens(self, text: str, stored: Optional[int], result: PackedContext) -> int:
+        if stored is not None:
+            return stored
+        result.recounted += 1
+        return self.count_tokens(text)
+
+    def _is_redundant(self, shingles: Set[int], packed_shingles: List[Set[int]]) -> bool:
+        if not shingles:
+            return True
+        for other in packed_shingles:
+            # Containment rather than Jaccard so a short chunk inside a longer one counts
+            if len(shingles & other) / min(len(shingles), len(other) or 1) >= self.redundancy_threshold:
+                return True
+        return False
+
+    @staticmethod
+    def _trim_overlap(content: str, pieces: List[str]) -> str:
+        """Drop the text `content` shares with packed pieces through the splitter overlap"""
+        for previous in pieces:
+            overlap = _overlap(previous, content)
+            if overlap:
+                content = content[overlap:].lstrip()
+            overlap = _overlap(content, previous)
+            if overlap:
+                content = content[:-overlap].rstrip()
+        return content
+
+    def pack(self, docs: List[Dict[str, Any]], max_chunks: Optional[int] = None) -> PackedContext:
+        pieces: List[str] = []
+        packed_shingles: List[Set[int]] = []
+        result = PackedContext(text="", tokens=0)
+
+        for doc in docs:
+            if max_chunks is not None and len(pieces) >= max_chunks:
+                break
+            content = (doc.get("content") or "").strip()
+            if not content:
+                continue
+
+            shingles = _shingles(content)
+            if self._is_redundant(shingles, packed_shingles):
+                result.dropped_redundant += 1
+                continue
+
+            original_length = len(content)
+            content = self._trim_overlap(content, pieces)
+            result.trimmed_overlap_chars += original_length - len(content)
+            if not content:
+                result.dropped_redundant += 1
+                continue
+
+            untrimmed = len(content) == original_length
+            tokens = self._tokens(content, doc.get("token_count") if untrimmed else None, result)
+            cost = tokens + (self.separator_tokens if pieces else 0)
+            remaining = self.token_budget - result.tokens
+
+            script = doc.get("script")
+            fallback = (doc.get("fallback_content") or "").strip()
+            if cost > remaining and fallback:
+                fallback_shingles = _shingles(fallback)
+                trimmed = self._trim_overlap(fallback, pieces)
+                if trimmed and not self._is_redundant(fallback_shingles, packed_shingles):
+                    stored = doc.get("fallback_token_count") if trimmed == fallback else None
+                    fallback_cost = self._tokens(trimmed, stored, result) + (self.separator_tokens if pieces else 0)
+                    if fallback_cost <= remaining:
+                        result.trimmed_overlap_chars += len(fallback) - len(trimmed)
+                        content, shingles, cost = trimmed, fallback_shingles, fallback_cost
+                        script = doc.get("fallback_script", script)
+                        result.fallbacks += 1
+
+            if cost > remaining:
+                if pieces:
+                    result.dropped_budget += 1
+                    continue
+                # A single oversized best chunk is truncated rather than lost
+                content = self.encoding.decode(self.encoding.encode(content)[:remaining])
+                cost = remaining
+
+            pieces.append(content)
+            packed_shingles.append(shingles)
+            result.chunk_ids.append(doc.get("id"))
+            result.tokens += cost
+            result.scripts[script or "unknown"] = result.scripts.get(script or "unknown", 0) + 1
+
+        result.text = self.separator.join(pieces)
+        metrics.observe("rag.context.tokens", result.tokens)
+        metrics.observe("rag.context.chunks", len(pieces))
+        metrics.incr("rag.context.dropped_redundant", result.dropped_redundant)
+        metrics.incr("rag.context.dropped_budget", result.dropped_budget)
+        metrics.incr("rag.context.recounted", result.recounted)
+        return result
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import time
+from typing import List, Optional, Union
+
+from sqlalchemy.exc import IntegrityError
+
+from ..core.config import get_settings
+from ..core.database import AsyncSessionLocal
+from ..core.metrics import metrics
+from .database_service import SummaryRecord, TurnRecord, database_service
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+_STOP = object()
+
+
+class ConversationWriter:
+    """
+    Write-behind persistence for chat turns and conversation summaries.
+
+    Requests hand records to a bounded queue and move on; a single background
+    writer drains it in batches (up to `batch_size` records, or whatever arrived
+    within `max_wait_ms` of the first) and writes each batch in one transaction
+    on its own connection. A full queue makes producers wait instead of growing
+    memory. `close()` writes everything queued before it returns, so the
+    application lifespan makes shutdowns durable; records that still arrive
+    afterwards are written one at a time instead of being queued.
+    """
+
+    def __init__(
+        self,
+        max_queue: int = 1000,
+        batch_size: int = 100,
+        max_wait_ms: float = 50.0,
+        max_attempts: int = 3,
+        session_factory=AsyncSessionLocal,
+    ):
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.max_wait_ms = max_wait_ms
+        self.max_attempts = max_attempts
+        self._session_factory = session_factory
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    async def start(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._closed = False
+        self._spawn()
+
+    def _spawn(self) -> None:
+        # A restarted writer picks up the records still in the queue
+        self._task = asyncio.create_task(self._run())
+        self._task.add_done_callback(self._on_done)
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        if task.cancelled() or task.exception() is None:
+            return
+        logger.error("Conversation writer stopped unexpectedly; restarting it", exc_info=task.exception())
+        metrics.incr("conversation_writer.restarts")
+        if task is self._task and not self._closed:
+            # Producers may be waiting on a full queue that nothing else drains
+            self._spawn()
+
+    async def put(self, record: Union[TurnRecord, SummaryRecord]) -> None:
+        """Queue a record; waits only while the queue is full. After close() it is written directly."""
+        if self._closed:
+            logger.warning(f"Conversation writer is closed; writing {type(record).__name__} directly")
+            metrics.incr("conversation_writer.late_writes")
+            await self._write([record])
+            return
+        await self.start()
+        await self._queue.put(record)
+        metrics.observe("conversation_writer.queue_depth", self._queue.qsize())
+
+    async def close(self) -> None:
+        """Write everything queued so far, then stop the writer"""
+        if self._task is None:
+            return
+        await self.start()  # Restart a writer that died, or nothing drains the queue
+        self._closed = True
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+        self._queue = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            record = await self._queue.get()
+            if record is _STOP:
+                break
+            batch = [record]
+            deadline = loop.time() + self.max_wait_ms / 1000
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    record = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if record is _STOP:
+                    stopping = True
+                    break
+                batch.append(record)
+            await self._write(batch)
+
+    async def _write(self, batch: List[Union[TurnRecord, SummaryRecord]]) -> None:
+        turns = [record for record in batch if isinstance(record, TurnRecord)]
+        summaries = {}
+        for record in batch:
+            if isinstance(record, SummaryRecord):
+                summaries[record.conversation_id] = record.summary  # Latest refresh wins
+
+        started = time.perf_counter()
+        try:
+            for attempt in range(1, self.max_attempts + 1):
+                try:
+                    async with self._session_factory() as session:
+                        await database_service.save_conversation_writes(session, turns, summaries)
+                    break
+                except IntegrityError as e:
+                    # Another worker process took the same turn_index; renumber and retry
+                    if attempt == self.max_attempts:
+                        raise
+                    logger.warning(f"Turn numbering conflict, retrying batch (attempt {attempt}): {e}")
+        except Exception as e:
+            if len(batch) > 1:
+                # Keep one bad record from taking the rest of the batch with it
+                logger.warning(f"Batch of {len(batch)} records failed, writing them one by one: {e}")
+                for record in batch:
+                    await self._write([record])
+                return
+            logger.error(f"Conversation writer dropped a {type(batch[0]).__name__}: {e}")
+            metrics.incr("conversation_writer.dropped")
+        else:
+            metrics.observe("conversation_writer.batch_size", len(batch))
+            metrics.observe("conversation_writer.write_ms", (time.perf_counter() - started) * 1000)
+
+
+# Shared writer; started and drained by the application lifespan
+conversation_writer = ConversationWriter(
+    max_queue=settings.CONVERSATION_WRITE_QUEUE_SIZE,
+    batch_size=settings.CONVERSATION_WRITE_BATCH_SIZE,
+    max_wait_ms=settings.CONVERSATION_WRITE_MAX_WAIT_MS,
+)
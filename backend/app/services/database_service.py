@@ -1,11 +1,12 @@
 import logging
+from dataclasses import dataclass
 from uuid import UUID, uuid4
 from datetime import datetime, timezone, timedelta
 from typing import Optional, List, Dict, Any, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete, update, func, desc, asc, or_
+from sqlalchemy import select, insert, delete, update, func, desc, asc, or_
 
-from ..models.database import Conversation, User
+from ..models.database import Conversation, ConversationTurn, User
 from ..models.schemas import UserCreate, ConversationFilter
 from ..core.config import get_settings
 
@@ -13,6 +14,25 @@ logger = logging.getLogger(__name__)
 settings = get_settings()
 
 
+@dataclass
+class TurnRecord:
+    """A finished exchange waiting to be written (see ConversationWriter)"""
+    conversation_id: str
+    user_id: str
+    user_question: str
+    assistant_answer: str
+    response_time: int
+    created_at: datetime
+    new_conversation: bool = False  # Opening turn; its answer is copied to the header
+
+
+@dataclass
+class SummaryRecord:
+    """A refreshed rolling summary waiting to be written"""
+    conversation_id: str
+    summary: str
+
+
 class DatabaseService:
     """User-centric database service for AISachi application"""
     
@@ -66,69 +86,162 @@ class DatabaseService:
         )
         return result.scalars().all()
 
-    async def get_conversation_by_id(self, db: AsyncSession, conversation_id: str, user_id: str) -> List[Conversation]:
-        """Get a specific conversation by its ID"""
-        user_uuid = UUID(user_id)
+    async def get_recent_turns(self, db: AsyncSession, conversation_id: str, user_id: str, limit: int = 5) -> List[Any]:
+        """
+        Get the last `limit` turns of one of the user's conversations, oldest first.
+        One range scan on (conversation_id, turn_index) that reads only the columns
+        the prompt needs; each row also carries the conversation's rolling summary.
+        Returns an empty list if the conversation does not exist or is not the user's.
+        """
+        try:
+            conversation_uuid = UUID(conversation_id)
+            user_uuid = UUID(user_id)
+        except (ValueError, TypeError) as e:
+            self.logger.error(f"Invalid UUID format for conversation_id: {conversation_id}. Error: {e}")
+            return []
         result = await db.execute(
-            select(Conversation).where(
-                Conversation.id == conversation_id,
+            select(
+                ConversationTurn.turn_index,
+                ConversationTurn.user_question,
+                ConversationTurn.assistant_answer,
+                Conversation.summary,
+            )
+            .join(Conversation, ConversationTurn.conversation_id == Conversation.id)
+            .where(
+                ConversationTurn.conversation_id == conversation_uuid,
                 Conversation.user_id == user_uuid
             )
+            .order_by(ConversationTurn.turn_index.desc())
+            .limit(limit)
         )
-        return result.scalars().all()
+        return list(reversed(result.all()))
 
-    async def save_conversation(
-        self,
-        db: AsyncSession,
-        user_id: str,
-        user_question: str,
-        assistant_answer: str,
-        response_time: int,
-    ) -> Conversation:
-        """Save a new conversation to the database"""
+    async def create_conversation(
+        self, db: AsyncSession, conversation_id: str, user_id: str, user_question: str
+    ) -> None:
+        """
+        Write the header of a new conversation before its first turn streams, so
+        follow-ups find it from any worker process. The answer and response time
+        are filled in when the opening turn is written.
+        """
         try:
-            user_uuid = UUID(user_id)
-            conversation = Conversation(
-                user_id=user_uuid,
+            await db.execute(insert(Conversation).values(
+                id=UUID(conversation_id),
+                user_id=UUID(user_id),
                 user_question=user_question,
-                assistant_answer=assistant_answer,
-                response_time=response_time,
-                created_at=datetime.now(timezone.utc),
-                updated_at=datetime.now(timezone.utc)
-            )
-            db.add(conversation)
+                assistant_answer="",
+                response_time=0,
+            ))
             await db.commit()
-            await db.refresh(conversation)
-            self.logger.info(f"Conversation saved for user {user_id}")
-            return conversation
         except Exception as e:
-            self.logger.error(f"Error saving conversation for user {user_id}: {e}")
+            self.logger.error(f"Error creating conversation {conversation_id}: {e}")
             await db.rollback()
             raise
 
-    async def update_conversation(
+    async def conversation_exists(self, db: AsyncSession, conversation_id: str, user_id: str) -> bool:
+        """True if the conversation exists and is the user's (its turns may still be queued)"""
+        try:
+            conversation_uuid = UUID(conversation_id)
+            user_uuid = UUID(user_id)
+        except (ValueError, TypeError):
+            return False
+        result = await db.execute(
+            select(Conversation.id).where(Conversation.id == conversation_uuid, Conversation.user_id == user_uuid)
+        )
+        return result.first() is not None
+
+    async def get_conversation_turns(
+        self, db: AsyncSession, conversation_id: str, user_id: str, limit: int = 500
+    ) -> List[Any]:
+        """
+        Get the turns of one of the user's conversations in order, as a range scan
+        on (conversation_id, turn_index). Returns an empty list if the conversation
+        does not exist, is not the user's, or its opening turn is still queued.
+        """
+        try:
+            conversation_uuid = UUID(conversation_id)
+            user_uuid = UUID(user_id)
+        except (ValueError, TypeError) as e:
+            self.logger.error(f"Invalid UUID format for conversation_id: {conversation_id}. Error: {e}")
+            return []
+        result = await db.execute(
+            select(
+                ConversationTurn.turn_index,
+                ConversationTurn.user_question,
+                ConversationTurn.assistant_answer,
+                ConversationTurn.response_time,
+                ConversationTurn.created_at,
+            )
+            .join(Conversation, ConversationTurn.conversation_id == Conversation.id)
+            .where(
+                ConversationTurn.conversation_id == conversation_uuid,
+                Conversation.user_id == user_uuid
+            )
+            .order_by(ConversationTurn.turn_index.asc())
+            .limit(limit)
+        )
+        return result.all()
+
+    async def save_conversation_writes(
         self,
         db: AsyncSession,
-        conversation_id: str,
-        assistant_answer: str,
-        response_time: int,
-    ) -> bool:
-        """Update an existing conversation with the final response"""
+        turns: List[TurnRecord],
+        summaries: Dict[str, str],
+    ) -> None:
+        """
+        Write a batch of finished turns and summary refreshes in one transaction,
+        with one statement per kind: the answers of opening turns onto their
+        conversation headers (written by create_conversation), then the turns,
+        then the summaries. Turns are numbered after their conversation's last
+        stored turn, in batch order.
+        """
         try:
-            conversation_uuid = UUID(conversation_id)
-            result = await db.execute(
-                update(Conversation)
-                .where(Conversation.id == conversation_uuid)
-                .values(
-                    assistant_answer=assistant_answer,
-                    response_time=response_time,
-                    updated_at=datetime.now(timezone.utc)
+            openings = [turn for turn in turns if turn.new_conversation]
+            if openings:
+                await db.execute(
+                    update(Conversation),
+                    [
+                        {
+                            "id": UUID(turn.conversation_id),
+                            "assistant_answer": turn.assistant_answer,
+                            "response_time": turn.response_time,
+                            "updated_at": turn.created_at,
+                        }
+                        for turn in openings
+                    ]
+                )
+
+            if turns:
+                conversation_uuids = {UUID(turn.conversation_id) for turn in turns}
+                result = await db.execute(
+                    select(ConversationTurn.conversation_id, func.max(ConversationTurn.turn_index))
+                    .where(ConversationTurn.conversation_id.in_(conversation_uuids))
+                    .group_by(ConversationTurn.conversation_id)
+                )
+                next_index = {str(conversation_id): last + 1 for conversation_id, last in result.all()}
+                rows = []
+                for turn in turns:
+                    turn_index = next_index.get(turn.conversation_id, 0)
+                    next_index[turn.conversation_id] = turn_index + 1
+                    rows.append({
+                        "id": uuid4(),
+                        "conversation_id": UUID(turn.conversation_id),
+                        "turn_index": turn_index,
+                        "user_question": turn.user_question,
+                        "assistant_answer": turn.assistant_answer,
+                        "response_time": turn.response_time,
+                        "created_at": turn.created_at,
+                    })
+                await db.execute(insert(ConversationTurn).values(rows))
+
+            if summaries:
+                await db.execute(
+                    update(Conversation),
+                    [{"id": UUID(conversation_id), "summary": summary} for conversation_id, summary in summaries.items()]
                 )
-            )
             await db.commit()
-            return result.rowcount > 0
         except Exception as e:
-            self.logger.error(f"Error updating conversation {conversation_id}: {e}")
+            self.logger.error(f"Error saving {len(turns)} turns and {len(summaries)} summaries: {e}")
             await db.rollback()
             raise
 
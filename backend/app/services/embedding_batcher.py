@@ -0,0 +1,186 @@
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Tuple
+
+import openai
+
+from ..core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Limits of the OpenAI embeddings endpoint
+MAX_INPUT_TOKENS = 8191
+MAX_BATCH_ITEMS = 2048
+
+
+class EmbeddingRateLimiter:
+    """
+    Paces embedding requests under a requests-per-minute and a tokens-per-minute
+    limit shared by all workers. A 429 pauses every worker for the server's
+    retry-after and slows the pace down; successes bring it back gradually.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        max_slowdown: float = 16.0,
+        recovery: float = 0.9,
+    ):
+        self.request_interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self.token_interval = 60.0 / tokens_per_minute if tokens_per_minute > 0 else 0.0
+        self.max_slowdown = max_slowdown
+        self.recovery = recovery
+        self.slowdown = 1.0
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int) -> float:
+        """Block until a request of `tokens` may start; returns the seconds waited"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot, self._paused_until)
+            cost = max(self.request_interval, tokens * self.token_interval)
+            self._next_slot = slot + cost * self.slowdown
+        if slot > now:
+            time.sleep(slot - now)
+        return slot - now
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.slowdown = max(1.0, self.slowdown * self.recovery)
+
+    def on_rate_limited(self, retry_after: Optional[float]) -> None:
+        with self._lock:
+            self.slowdown = min(self.max_slowdown, self.slowdown * 2)
+            pause = retry_after if retry_after is not None else self.slowdown
+            self._paused_until = max(self._paused_until, time.monotonic() + pause)
+        metrics.observe("ingest.embed.slowdown", self.slowdown)
+
+
+def _retry_after(error: openai.APIStatusError) -> Optional[float]:
+    headers = error.response.headers if error.response is not None else {}
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+@dataclass
+class EmbeddingResult:
+    vectors: List[List[float]]
+    tokens: int
+    attempts: int
+    request_seconds: float
+
+
+class BatchPacker:
+    """Accumulates items into batches bounded by a token and an item budget"""
+
+    def __init__(self, max_tokens: int, max_items: int):
+        self.max_tokens = max_tokens
+        self.max_items = min(max_items, MAX_BATCH_ITEMS)
+        self.items: List[Any] = []
+        self.tokens = 0
+
+    def add(self, item: Any, tokens: int) -> Optional[Tuple[List[Any], int]]:
+        """Add an item; returns the previous batch if the item did not fit in it"""
+        full = None
+        if self.items and (self.tokens + tokens > self.max_tokens or len(self.items) >= self.max_items):
+            full = self.flush()
+        self.items.append(item)
+        self.tokens += tokens
+        return full
+
+    def flush(self) -> Optional[Tuple[List[Any], int]]:
+        if not self.items:
+            return None
+        batch = (self.items, self.tokens)
+        self.items, self.tokens = [], 0
+        return batch
+
+
+class EmbeddingBatcher:
+    """
+    Token-aware client for the embeddings endpoint: counts and truncates inputs
+    with tiktoken, paces requests through an `EmbeddingRateLimiter` and retries a
+    failed batch on rate limits and transient errors, so one bad response does
+    not cost a whole file.
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[], Any],
+        model: str,
+        requests_per_minute: int = 500,
+        tokens_per_minute: int = 1_000_000,
+        max_retries: int = 6,
+    ):
+        import tiktoken
+
+        self._client_factory = client_factory
+        self._client = None
+        self.model = model
+        self.max_retries = max_retries
+        self.rate_limiter = EmbeddingRateLimiter(requests_per_minute, tokens_per_minute)
+        try:
+            self.encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            self.encoding = tiktoken.get_encoding("cl100k_base")
+
+    @property
+    def client(self):
+        if self._client is None:
+            # Retries are handled here, with pacing shared across workers
+            self._client = self._client_factory().with_options(max_retries=0)
+        return self._client
+
+    def prepare(self, text: str) -> Tuple[str, int]:
+        """Return the text to embed and its token count, truncated to the model's input limit"""
+        tokens = self.encoding.encode(text)
+        if len(tokens) > MAX_INPUT_TOKENS:
+            metrics.incr("ingest.embed.truncated")
+            return self.encoding.decode(tokens[:MAX_INPUT_TOKENS]), MAX_INPUT_TOKENS
+        return text, len(tokens)
+
+    def embed(self, texts: List[str], tokens: int) -> EmbeddingResult:
+        """Embed one packed batch, retrying rate limits and transient failures"""
+        attempt = 0
+        while True:
+            attempt += 1
+            self.rate_limiter.acquire(tokens)
+            started = time.perf_counter()
+            try:
+                response = self.client.embeddings.create(input=texts, model=self.model)
+            except openai.RateLimitError as e:
+                retry_after = _retry_after(e)
+                self.rate_limiter.on_rate_limited(retry_after)
+                metrics.incr("ingest.embed.rate_limited")
+                if attempt > self.max_retries:
+                    raise
+                logger.warning(f"Embedding rate limited (attempt {attempt}); retry after {retry_after or 'backoff'}")
+                continue
+            except (openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError) as e:
+                if attempt > self.max_retries:
+                    raise
+                delay = min(30.0, 2 ** attempt) * random.uniform(0.5, 1.0)
+                metrics.incr("ingest.embed.retries")
+                logger.warning(f"Embedding request failed (attempt {attempt}): {e}; retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            elapsed = time.perf_counter() - started
+            self.rate_limiter.on_success()
+            metrics.incr("ingest.embed.tokens", tokens)
+            metrics.observe("ingest.embed.batch_tokens", tokens)
+            metrics.observe("ingest.embed.request_ms", elapsed * 1000)
+            vectors = [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+            return EmbeddingResult(vectors=vectors, tokens=tokens, attempts=attempt, request_seconds=elapsed)
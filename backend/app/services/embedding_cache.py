@@ -0,0 +1,185 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from ..core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(text: str) -> str:
+    """Normalize text so trivially different spellings of a question share a cache key"""
+    text = unicodedata.normalize("NFKC", text)
+    return " ".join(text.casefold().split())
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache of query embeddings keyed by (model, normalized text).
+
+    Tier 1 is an in-process LRU of float32 arrays; tier 2 is a SQLite file shared
+    by all workers on the host so a restart does not start cold. Both tiers are
+    bounded and evict least recently used entries first.
+    """
+
+    def __init__(
+        self, path: Optional[str], memory_size: int = 2048, disk_size: int = 50000, touch_batch_size: int = 64
+    ):
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self.touch_batch_size = touch_batch_size
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._disk_count = 0
+        # Disk hits whose last_used is written later, in one statement, so reads stay read-only
+        self._touched: Dict[str, float] = {}
+
+        if path and disk_size > 0:
+            try:
+                self._open_disk(path)
+            except sqlite3.Error as e:
+                logger.error(f"Embedding cache disk tier disabled, cannot open {path}: {e}")
+                self._db = None
+
+    def _open_disk(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_used ON embeddings(last_used)")
+        self._disk_count = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def make_key(text: str, model: str) -> str:
+        return hashlib.sha256(f"{model}\x00{normalize_query(text)}".encode("utf-8")).hexdigest()
+
+    def get(self, text: str, model: str) -> Optional[np.ndarray]:
+        """Look up an embedding, promoting disk hits into the memory tier"""
+        key = self.make_key(text, model)
+
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                metrics.incr("embedding_cache.memory_hits")
+                return vector
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+                except sqlite3.Error as e:
+                    # e.g. "database is locked" by another worker: a miss, not a failed request
+                    logger.warning(f"Embedding cache disk read failed, treating as a miss: {e}")
+                    metrics.incr("embedding_cache.disk_errors")
+                    row = None
+                if row is not None:
+                    vector = np.frombuffer(row[0], dtype=np.float32)
+                    self._remember(key, vector)
+                    self._touched[key] = time.time()
+                    if len(self._touched) >= self.touch_batch_size:
+                        self._flush_touched()
+                    metrics.incr("embedding_cache.disk_hits")
+                    return vector
+
+        metrics.incr("embedding_cache.misses")
+        return None
+
+    def put(self, text: str, model: str, embedding: Sequence[float]) -> np.ndarray:
+        """Store an embedding in both tiers and return it as a float32 array"""
+        key = self.make_key(text, model)
+        vector = np.asarray(embedding, dtype=np.float32)
+
+        with self._lock:
+            self._remember(key, vector)
+            if self._db is not None:
+                try:
+                    now = time.time()
+                    cursor = self._db.execute(
+                        "INSERT OR IGNORE INTO embeddings (key, model, vector, last_used) VALUES (?, ?, ?, ?)",
+                        (key, model, vector.tobytes(), now),
+                    )
+                    if cursor.rowcount:
+                        self._disk_count += cursor.rowcount
+                        self._flush_touched()  # Recent hits must not look stale to eviction
+                        self._evict_disk()
+                    else:
+                        # Existing key: refresh it in place, the row count is unchanged
+                        self._db.execute(
+                            "UPDATE embeddings SET vector = ?, last_used = ? WHERE key = ?",
+                            (vector.tobytes(), now, key),
+                        )
+                except sqlite3.Error as e:
+                    logger.error(f"Failed to persist embedding to disk cache: {e}")
+        return vector
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+            metrics.incr("embedding_cache.memory_evictions")
+
+    def _flush_touched(self) -> None:
+        """Best effort: a lost last_used update only makes eviction slightly less accurate"""
+        if not self._touched or self._db is None:
+            return
+        touched = [(last_used, key) for key, last_used in self._touched.items()]
+        self._touched.clear()
+        try:
+            self._db.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?", touched)
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to record {len(touched)} embedding cache hits: {e}")
+
+    def _evict_disk(self) -> None:
+        if self._disk_count <= self.disk_size:
+            return
+        # Trim to 90% of capacity so eviction is amortized over many inserts
+        excess = self._disk_count - int(self.disk_size * 0.9)
+        cursor = self._db.execute(
+            "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+        self._disk_count = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        metrics.incr("embedding_cache.disk_evictions", cursor.rowcount)
+
+    def stats(self) -> Dict[str, Any]:
+        memory_hits = metrics.counter("embedding_cache.memory_hits")
+        disk_hits = metrics.counter("embedding_cache.disk_hits")
+        misses = metrics.counter("embedding_cache.misses")
+        lookups = memory_hits + disk_hits + misses
+        return {
+            "memory_entries": len(self._memory),
+            "disk_entries": self._disk_count,
+            "memory_hits": memory_hits,
+            "disk_hits": disk_hits,
+            "misses": misses,
+            "hit_ratio": (memory_hits + disk_hits) / lookups if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._flush_touched()
+                self._db.close()
+                self._db = None
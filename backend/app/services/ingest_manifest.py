@@ -0,0 +1,124 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+
+def file_digest(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(block_size):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_hash(page: int, content: str, parent: Optional[str] = None) -> str:
+    """
+    Identity of a chunk's content at a given page, and of its parent section's
+    hash if it has one; unchanged chunks keep their row
+    """
+    key = f"{page}\0{content}" if parent is None else f"{page}\0{parent}\0{content}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class IngestManifest:
+    """
+    Record of what has been ingested from a directory, stored as JSON next to
+    the PDFs:
+
+        {"version": 1, "files": {"<filename>": {"sha256": ..., "size": ...,
+         "mtime_ns": ..., "chunks": {"<chunk hash>": "<documents row id>"},
+         "sections": {"<section hash>": "<document_sections row id>"}}},
+         "signatures": {"<row id>": "<MinHash signature hex>"},
+         "orphans": ["<row id>", ...], "orphan_sections": ["<section id>", ...]}
+
+    Re-ingestion compares files against it to skip unchanged PDFs and to work
+    out which rows to insert and which to delete. Near-duplicate chunks map to
+    the same row from several files, so a row is only deleted once no file
+    references it; `orphans` holds rows whose deletion failed and is retried.
+    Parent sections belong to the file they were cut from.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.signatures: Dict[str, str] = {}
+        self.orphans: List[str] = []
+        self.orphan_sections: List[str] = []
+        self.dirty = False
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == MANIFEST_VERSION:
+                    self.files = data.get("files", {})
+                    self.signatures = data.get("signatures", {})
+                    self.orphans = data.get("orphans", [])
+                    self.orphan_sections = data.get("orphan_sections", [])
+                else:
+                    logger.warning(f"Ignoring ingest manifest {path} with unsupported version {data.get('version')}")
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not read ingest manifest {path}: {e}")
+
+    def get(self, filename: str) -> Optional[Dict[str, Any]]:
+        return self.files.get(filename)
+
+    def set(self, filename: str, entry: Dict[str, Any]) -> None:
+        self.files[filename] = entry
+        self.dirty = True
+
+    def remove(self, filename: str) -> None:
+        if self.files.pop(filename, None) is not None:
+            self.dirty = True
+
+    def filenames(self) -> List[str]:
+        return list(self.files)
+
+    def references(self) -> Dict[str, Set[str]]:
+        """Row id -> files whose chunks resolve to that row"""
+        refs: Dict[str, Set[str]] = {}
+        for filename, entry in self.files.items():
+            for row_id in entry["chunks"].values():
+                refs.setdefault(row_id, set()).add(filename)
+        return refs
+
+    def section_references(self) -> Set[str]:
+        return {section_id for entry in self.files.values() for section_id in entry.get("sections", {}).values()}
+
+    def is_unchanged(self, filename: str, path: str) -> bool:
+        """True if the file on disk matches its entry; size/mtime first, content hash if they differ"""
+        entry = self.files.get(filename)
+        if entry is None:
+            return False
+        stat = os.stat(path)
+        if stat.st_size == entry.get("size") and stat.st_mtime_ns == entry.get("mtime_ns"):
+            return True
+        if stat.st_size != entry.get("size") or file_digest(path) != entry.get("sha256"):
+            return False
+        # Touched but identical: remember the new mtime so the next run stays on the fast path
+        entry["mtime_ns"] = stat.st_mtime_ns
+        self.dirty = True
+        return True
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": MANIFEST_VERSION,
+                    "files": self.files,
+                    "signatures": self.signatures,
+                    "orphans": self.orphans,
+                    "orphan_sections": self.orphan_sections,
+                },
+                f,
+            )
+        os.replace(tmp_path, self.path)
+        self.dirty = False
@@ -0,0 +1,852 @@
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..core.config import settings
+from ..core.metrics import metrics
+from ..core.providers import providers
+from .embedding_batcher import BatchPacker, EmbeddingBatcher
+from .ingest_manifest import IngestManifest, chunk_hash, file_digest
+from .near_duplicates import MinHasher, NearDuplicateIndex
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+DEVANAGARI_LETTER_RE = re.compile(r"[\u0900-\u0963\u0971-\u097F]")
+ROMAN_LETTER_RE = re.compile(r"[A-Za-z]")
+
+# Filter attributes recorded on every chunk row (see RetrievalFilters)
+ATTRIBUTE_NAMES = ("department", "state", "issued_on")
+# "दिनांक 12/03/2023", "Dated: 12.03.2023", "Dt. 12-3-2023"; circulars use day-first dates
+ISSUED_ON_RE = re.compile(r"(?:दिनांक|dated|date|dt\.?)\s*[:\-]?\s*(\d{1,2})[./\-](\d{1,2})[./\-](\d{4})", re.IGNORECASE)
+PDF_DATE_RE = re.compile(r"D:(\d{4})(\d{2})(\d{2})")
+
+
+@dataclass
+class IngestConfig:
+    chunk_size: int = 400
+    chunk_overlap: int = 50
+    parent_chunk_size: int = 2000
+    parse_workers: int = 2
+    embed_concurrency: int = 4
+    embed_batch_size: int = 256
+    embed_batch_tokens: int = 100_000
+    embed_requests_per_minute: int = 500
+    embed_tokens_per_minute: int = 1_000_000
+    embed_max_retries: int = 6
+    insert_batch_size: int = 500
+    queue_size: int = 8
+    embedding_model: str = "text-embedding-3-small"
+    token_model: str = "gpt-3.5-turbo"  # Stored token counts use this model's encoding, as the context packer does
+    manifest_filename: str = ".ingest_manifest.json"
+    attributes_filename: str = "ingest_metadata.json"
+    delete_batch_size: int = 200
+    dedup_enabled: bool = True
+    dedup_threshold: float = 0.9
+
+    @classmethod
+    def from_settings(cls) -> "IngestConfig":
+        return cls(
+            chunk_size=settings.INGEST_CHUNK_SIZE,
+            chunk_overlap=settings.INGEST_CHUNK_OVERLAP,
+            parent_chunk_size=settings.INGEST_PARENT_CHUNK_SIZE,
+            parse_workers=settings.INGEST_PARSE_WORKERS,
+            embed_concurrency=settings.INGEST_EMBED_CONCURRENCY,
+            embed_batch_size=settings.INGEST_EMBED_BATCH_SIZE,
+            embed_batch_tokens=settings.INGEST_EMBED_BATCH_TOKENS,
+            embed_requests_per_minute=settings.INGEST_EMBED_REQUESTS_PER_MINUTE,
+            embed_tokens_per_minute=settings.INGEST_EMBED_TOKENS_PER_MINUTE,
+            embed_max_retries=settings.INGEST_EMBED_MAX_RETRIES,
+            insert_batch_size=settings.INGEST_INSERT_BATCH_SIZE,
+            queue_size=settings.INGEST_QUEUE_SIZE,
+            embedding_model=settings.EMBEDDING_MODEL,
+            token_model=settings.OPENAI_MODEL,
+            manifest_filename=settings.INGEST_MANIFEST_FILENAME,
+            attributes_filename=settings.INGEST_ATTRIBUTES_FILENAME,
+            dedup_enabled=settings.INGEST_DEDUP_ENABLED,
+            dedup_threshold=settings.INGEST_DEDUP_THRESHOLD,
+        )
+
+
+@dataclass
+class StageStats:
+    """Work done by one pipeline stage; `busy_seconds` excludes time spent waiting on queues"""
+    name: str
+    items: int = 0
+    busy_seconds: float = 0.0
+    tokens: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, items: int, seconds: float, tokens: int = 0) -> None:
+        with self._lock:
+            self.items += items
+            self.busy_seconds += seconds
+            self.tokens += tokens
+
+    def as_dict(self) -> Dict[str, Any]:
+        stats = {
+            "items": self.items,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "items_per_second": round(self.items / self.busy_seconds, 1) if self.busy_seconds else 0.0,
+        }
+        if self.tokens:
+            stats["tokens"] = self.tokens
+            stats["tokens_per_second"] = round(self.tokens / self.busy_seconds, 1) if self.busy_seconds else 0.0
+        return stats
+
+
+@dataclass
+class FileProgress:
+    filename: str
+    status: str = "pending"  # pending -> parsing -> embedding -> done | failed | cancelled; or unchanged | removed
+    pages: int = 0
+    chunks: int = 0  # Chunks that needed embedding; unchanged chunks are counted in `reused`
+    embedded: int = 0
+    inserted: int = 0
+    reused: int = 0
+    duplicates: int = 0  # Near-duplicates of an existing chunk, stored as a reference to its row
+    sections: int = 0  # Parent sections inserted
+    deleted: int = 0
+    error: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "filename": self.filename,
+            "status": self.status,
+            "pages": self.pages,
+            "chunks": self.chunks,
+            "embedded": self.embedded,
+            "inserted": self.inserted,
+            "reused": self.reused,
+            "duplicates": self.duplicates,
+            "sections": self.sections,
+            "deleted": self.deleted,
+            "error": self.error,
+        }
+
+
+@dataclass
+class IngestReport:
+    files: Dict[str, FileProgress] = field(default_factory=dict)
+    stages: Dict[str, StageStats] = field(default_factory=dict)
+    errors: List[str] = field(default_factory=list)
+    started_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        files = list(self.files.values())
+        duplicates = sum(progress.duplicates for progress in files)
+        considered = duplicates + sum(progress.chunks for progress in files)
+        return {
+            "files": [progress.as_dict() for progress in files],
+            "stages": {name: stats.as_dict() for name, stats in self.stages.items()},
+            "errors": list(self.errors),
+            "elapsed_seconds": round(elapsed, 3),
+            "chunks_inserted": sum(progress.inserted for progress in files),
+            "chunks_deleted": sum(progress.deleted for progress in files),
+            "near_duplicates": duplicates,
+            "dedup_ratio": round(duplicates / considered, 4) if considered else 0.0,
+        }
+
+    @property
+    def changed(self) -> bool:
+        return any(progress.inserted or progress.deleted or progress.duplicates for progress in self.files.values())
+
+
+def parse_pdf(filepath: str) -> Tuple[List[Tuple[int, str]], Dict[str, str]]:
+    """Extract (page number, text) for every non-empty page, and the PDF's metadata; runs in a worker process"""
+    import fitz  # PyMuPDF
+
+    pages = []
+    with fitz.open(filepath) as doc:
+        info = {key: value for key, value in (doc.metadata or {}).items() if isinstance(value, str) and value}
+        for page_num, page in enumerate(doc):
+            text = page.get_text()
+            if text.strip():
+                pages.append((page_num + 1, text))
+    return pages, info
+
+
+def detect_issued_on(pages: List[Tuple[int, str]], info: Dict[str, str]) -> Optional[str]:
+    """Issue date of a circular: the first "dated dd/mm/yyyy" on its first two pages, else the PDF creation date"""
+    for _, text in pages[:2]:
+        for match in ISSUED_ON_RE.finditer(text):
+            day, month, year = (int(group) for group in match.groups())
+            try:
+                return date(year, month, day).isoformat()
+            except ValueError:
+                continue
+    if match := PDF_DATE_RE.match(info.get("creationDate", "")):
+        try:
+            return date(*(int(group) for group in match.groups())).isoformat()
+        except ValueError:
+            pass
+    return None
+
+
+class DirectoryAttributes:
+    """
+    Filter attributes for the PDFs of a directory, from an optional JSON file
+    kept next to them:
+
+        {"defaults": {"state": "...", "department": "..."},
+         "files": {"<filename>": {"department": "...", "issued_on": "YYYY-MM-DD"}}}
+
+    Per-file values override the defaults, which override what is detected
+    from the PDF itself.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.defaults: Dict[str, Any] = {}
+        self.files: Dict[str, Dict[str, Any]] = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+                self.defaults = self._clean(data.get("defaults") or {}, path)
+                self.files = {name: self._clean(values, path) for name, values in (data.get("files") or {}).items()}
+            except (OSError, ValueError, AttributeError) as e:
+                logger.warning(f"Could not read ingest attributes {path}: {e}")
+
+    @staticmethod
+    def _clean(values: Dict[str, Any], path: str) -> Dict[str, Any]:
+        cleaned = {}
+        for name, value in values.items():
+            if name not in ATTRIBUTE_NAMES:
+                logger.warning(f"Ignoring unknown attribute {name!r} in {path}")
+            elif name == "issued_on" and value is not None:
+                cleaned[name] = date.fromisoformat(str(value)).isoformat()
+            else:
+                cleaned[name] = str(value).strip() if value is not None else None
+        return cleaned
+
+    def for_file(self, filename: str, detected: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return {name: None for name in ATTRIBUTE_NAMES} | (detected or {}) | self.defaults | self.files.get(filename, {})
+
+
+def detect_script(text: str) -> Optional[str]:
+    """'devanagari', 'roman' or 'mixed' by the share of Devanagari letters; None for text without letters"""
+    devanagari = len(DEVANAGARI_LETTER_RE.findall(text))
+    letters = devanagari + len(ROMAN_LETTER_RE.findall(text))
+    if not letters:
+        return None
+    share = devanagari / letters
+    return "devanagari" if share >= 0.8 else "roman" if share <= 0.2 else "mixed"
+
+
+def _timed_parse(filepath: str) -> Tuple[Tuple[List[Tuple[int, str]], Dict[str, str]], float]:
+    started = time.perf_counter()
+    parsed = parse_pdf(filepath)
+    return parsed, time.perf_counter() - started
+
+
+def list_pdfs(directory_path: str) -> List[str]:
+    return sorted(
+        os.path.join(directory_path, filename)
+        for filename in os.listdir(directory_path)
+        if filename.lower().endswith(".pdf")
+    )
+
+
+class IngestionPipeline:
+    """
+    Streaming PDF ingestion: parse -> chunk -> embed -> insert.
+
+    PDFs are parsed in a process pool with a bounded number in flight; chunks
+    flow to concurrent, rate-limited embedding workers and then to a bulk
+    inserter through bounded queues, so memory stays flat regardless of corpus
+    size. Per-file progress and per-stage throughput are kept on the report.
+
+    With `parent_chunk_size`, pages are first cut into parent sections stored
+    in `document_sections`; only the small child chunks cut from them are
+    embedded, each pointing at its section through `parent_id`.
+
+    With a manifest, unchanged files are skipped, only chunks whose content
+    hash is new are embedded, and rows of vanished chunks and deleted files are
+    removed once the replacement rows are in.
+    """
+
+    def __init__(
+        self,
+        config: IngestConfig,
+        report: Optional[IngestReport] = None,
+        manifest: Optional[IngestManifest] = None,
+        cancel_event: Optional[threading.Event] = None,
+        attributes: Optional[DirectoryAttributes] = None,
+    ):
+        self.config = config
+        self.report = report or IngestReport()
+        self.manifest = manifest
+        self.attributes = attributes or DirectoryAttributes()
+        # Files chunked with other settings are re-chunked; unchanged chunks still keep their rows
+        self._layout = {
+            "chunk_size": config.chunk_size,
+            "chunk_overlap": config.chunk_overlap,
+            "parent_chunk_size": config.parent_chunk_size,
+        }
+        self.cancel_event = cancel_event or threading.Event()
+        for name in ("parse", "chunk", "embed", "insert"):
+            self.report.stages.setdefault(name, StageStats(name))
+        self.embedder = EmbeddingBatcher(
+            lambda: providers.get("openai"),
+            config.embedding_model,
+            requests_per_minute=config.embed_requests_per_minute,
+            tokens_per_minute=config.embed_tokens_per_minute,
+            max_retries=config.embed_max_retries,
+        )
+        self._packer = BatchPacker(config.embed_batch_tokens, config.embed_batch_size)
+        self._token_encoding = self._load_token_encoding(config.token_model)
+        self._embed_queue: queue.Queue = queue.Queue(maxsize=config.queue_size)
+        self._insert_queue: queue.Queue = queue.Queue(maxsize=config.queue_size)
+        self._lock = threading.Lock()
+        # Manifest entries being rebuilt for files that are (re-)ingested in this run
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        # Rows inserted in this run -> (filename, chunk hash), and near-duplicate
+        # chunks waiting on the row of a canonical chunk from this run
+        self._inserted: Dict[str, Tuple[str, str]] = {}
+        self._aliases: List[Tuple[str, str, str, str]] = []
+        self._signatures: Dict[Tuple[str, str], str] = {}
+        # Parent sections inserted in this run -> filename
+        self._inserted_sections: Dict[str, str] = {}
+        self._referenced: Optional[Dict[str, Any]] = None
+        # First unexpected error in a worker thread; fails the whole run
+        self._failure: Optional[str] = None
+        self.minhasher: Optional[MinHasher] = None
+        self.duplicates: Optional[NearDuplicateIndex] = None
+        if manifest is not None and config.dedup_enabled:
+            self.minhasher = MinHasher()
+            self.duplicates = NearDuplicateIndex(threshold=config.dedup_threshold)
+            for row_id, signature in manifest.signatures.items():
+                self.duplicates.add(row_id, MinHasher.from_hex(signature))
+
+    @staticmethod
+    def _load_token_encoding(model: str):
+        import tiktoken
+
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+
+    def _text_columns(self, text: str, tokens: Optional[int] = None) -> Dict[str, Any]:
+        """token_count and script of text as the request path reads it (stripped)"""
+        text = text.strip()
+        if tokens is None:
+            tokens = len(self._token_encoding.encode(text))
+        return {"token_count": tokens, "script": detect_script(text)}
+
+    def _fail(self, filename: str, message: str) -> None:
+        with self._lock:
+            progress = self.report.files[filename]
+            progress.status = "failed"
+            progress.error = progress.error or message
+            self.report.errors.append(f"{filename}: {message}")
+        logger.error(f"Ingestion error for {filename}: {message}")
+
+    def _cancel(self, filename: str) -> None:
+        with self._lock:
+            progress = self.report.files[filename]
+            if progress.status not in ("done", "failed", "unchanged"):
+                progress.status = "cancelled"
+
+    def _abort(self, stage: str, error: Exception) -> None:
+        """Stop the run after an unexpected error in a stage; the workers keep draining their queues"""
+        with self._lock:
+            if self._failure is None:
+                self._failure = f"{stage} worker failed: {error}"
+                self.report.errors.append(self._failure)
+        logger.exception(f"Ingestion {stage} worker failed")
+        self.cancel_event.set()
+
+    def _update(self, filename: str, apply: Callable[[FileProgress], None]) -> None:
+        with self._lock:
+            progress = self.report.files[filename]
+            apply(progress)
+            if progress.status == "embedding" and progress.inserted == progress.chunks:
+                progress.status = "done"
+
+    def _delete_rows(self, ids: List[str], table_name: str = "documents") -> int:
+        table = providers.get("supabase").table(table_name)
+        for start in range(0, len(ids), self.config.delete_batch_size):
+            table.delete().in_("id", ids[start:start + self.config.delete_batch_size]).execute()
+        return len(ids)
+
+    def _retag(self, filename: str, attributes: Dict[str, Any]) -> bool:
+        """Write changed filter attributes onto the rows a file owns, without re-embedding them"""
+        try:
+            providers.get("supabase").table("documents").update(attributes).eq("metadata->>source", filename).execute()
+        except Exception as e:
+            self.report.errors.append(f"{filename}: updating attributes failed: {e}")
+            logger.error(f"Error updating attributes of {filename}: {e}")
+            return False
+        metrics.incr("ingest.attributes.updated")
+        return True
+
+    def _select_changed(self, paths: List[str]) -> List[str]:
+        if self.manifest is None:
+            return list(paths)
+        changed = []
+        for path in paths:
+            filename = os.path.basename(path)
+            entry = self.manifest.get(filename)
+            if entry is None or entry.get("layout") != self._layout or not self.manifest.is_unchanged(filename, path):
+                changed.append(path)
+                continue
+            progress = self.report.files[filename]
+            progress.status = "unchanged"
+            progress.reused = len(entry["chunks"])
+            attributes = self.attributes.for_file(filename, entry.get("detected"))
+            if attributes != entry.get("attributes") and self._retag(filename, attributes):
+                entry["attributes"] = attributes
+                self.manifest.dirty = True
+        return changed
+
+    # Stage 1 + 2: parse in worker processes, chunk on the calling thread
+    def _produce(self, paths: List[str]) -> None:
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=self.config.chunk_size, chunk_overlap=self.config.chunk_overlap
+        )
+        parent_splitter = None
+        if self.config.parent_chunk_size:
+            parent_splitter = RecursiveCharacterTextSplitter(chunk_size=self.config.parent_chunk_size, chunk_overlap=0)
+        context = multiprocessing.get_context("spawn")
+        max_in_flight = max(1, self.config.parse_workers * 2)
+        pending_paths = list(paths)
+
+        with ProcessPoolExecutor(max_workers=self.config.parse_workers, mp_context=context) as pool:
+            in_flight = {}
+            while pending_paths or in_flight:
+                if self.cancel_event.is_set():
+                    for path in pending_paths:
+                        self._cancel(os.path.basename(path))
+                    pending_paths.clear()
+                while pending_paths and len(in_flight) < max_in_flight:
+                    path = pending_paths.pop(0)
+                    filename = os.path.basename(path)
+                    self._update(filename, lambda p: setattr(p, "status", "parsing"))
+                    in_flight[pool.submit(_timed_parse, path)] = (filename, path)
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    filename, path = in_flight.pop(future)
+                    try:
+                        (pages, info), seconds = future.result()
+                    except Exception as e:
+                        self._fail(filename, f"parse failed: {e}")
+                        continue
+                    self.report.stages["parse"].record(1, seconds)
+                    if self.cancel_event.is_set():
+                        self._cancel(filename)
+                        continue
+                    try:
+                        self._chunk(filename, path, pages, info, splitter, parent_splitter)
+                    except Exception as e:
+                        self._fail(filename, f"chunking failed: {e}")
+
+        if (batch := self._packer.flush()) is not None:
+            self._embed_queue.put(batch)
+
+    def _chunk(
+        self,
+        filename: str,
+        path: str,
+        pages: List[Tuple[int, str]],
+        info: Dict[str, str],
+        splitter,
+        parent_splitter=None,
+    ) -> None:
+        started = time.perf_counter()
+        detected = {"issued_on": detect_issued_on(pages, info)}
+        attributes = self.attributes.for_file(filename, detected)
+        previous = self.manifest.get(filename) if self.manifest is not None else None
+        previous_chunks = previous["chunks"] if previous else {}
+        previous_sections = previous.get("sections", {}) if previous else {}
+        kept: Dict[str, str] = {}
+        sections: Dict[str, Optional[str]] = {}  # Section hash -> row id, None until inserted
+        section_rows: Dict[str, Dict[str, Any]] = {}
+        # This file's rows matched again from an edited section, which then point at the new section
+        own_rows = set(previous_chunks.values())
+        repointed: Dict[str, List[str]] = {}
+        linked = aliased = 0
+        chunks = []
+        for page_num, text in pages:
+            index = 0
+            for section_text in parent_splitter.split_text(text) if parent_splitter is not None else [text]:
+                section_hash = chunk_hash(page_num, section_text) if parent_splitter is not None else None
+                if section_hash is not None and section_hash not in sections:
+                    sections[section_hash] = previous_sections.get(section_hash)
+                    if sections[section_hash] is None:
+                        section_rows[section_hash] = {
+                            "source": filename,
+                            "page": page_num,
+                            "content": section_text,
+                            "content_hash": section_hash,
+                        }
+                for chunk_text in splitter.split_text(section_text):
+                    index += 1
+                    content_hash = chunk_hash(page_num, chunk_text, section_hash)
+                    if content_hash in previous_chunks:
+                        kept[content_hash] = previous_chunks[content_hash]
+                        continue
+                    if self.duplicates is not None and (signature := self.minhasher.signature(chunk_text)) is not None:
+                        canonical = self.duplicates.find(signature)
+                        if isinstance(canonical, str):
+                            # Row from an earlier run
+                            kept[content_hash] = canonical
+                            linked += 1
+                            if section_hash is not None and canonical in own_rows:
+                                repointed.setdefault(section_hash, []).append(canonical)
+                            continue
+                        if canonical is not None:
+                            # Chunk from this run; its row id is resolved at commit
+                            self._aliases.append((filename, content_hash, *canonical))
+                            aliased += 1
+                            continue
+                        self.duplicates.add((filename, content_hash), signature)
+                        self._signatures[(filename, content_hash)] = MinHasher.to_hex(signature)
+                    chunk = {
+                        **attributes,
+                        "content": chunk_text,
+                        "metadata": {
+                            "source": filename,
+                            "sources": [filename],
+                            "page": page_num,
+                            "chunk": index - 1,
+                            "content_hash": content_hash,
+                        },
+                    }
+                    if section_hash is not None:
+                        chunk["metadata"]["section"] = section_hash
+                    chunks.append(chunk)
+        self.report.stages["chunk"].record(len(chunks) + len(kept) + aliased, time.perf_counter() - started)
+
+        deleted = 0
+        if self.manifest is not None and previous is None:
+            # Rows ingested before the manifest existed can only be found by
+            # source; rows shared with files in the manifest are kept
+            supabase = providers.get("supabase")
+            rows = supabase.table("documents").select("id").eq("metadata->>source", filename).execute().data or []
+            if self._referenced is None:
+                self._referenced = self.manifest.references()
+            referenced = self._referenced
+            deleted = self._delete_rows([str(row["id"]) for row in rows if str(row["id"]) not in referenced])
+            # Sections belong to one file, so none of this file's are still in use
+            supabase.table("document_sections").delete().eq("source", filename).execute()
+
+        # Parent sections are only stored when a new chunk points at them (sections
+        # made entirely of near-duplicates are dropped), before any child row
+        referenced_sections = {chunk["metadata"].get("section") for chunk in chunks} | set(repointed)
+        needed = [row for section_hash, row in section_rows.items() if section_hash in referenced_sections]
+        for row in needed:
+            row.update(self._text_columns(row["content"]))
+        for start in range(0, len(needed), self.config.insert_batch_size):
+            response = (
+                providers.get("supabase").table("document_sections")
+                .insert(needed[start:start + self.config.insert_batch_size]).execute()
+            )
+            with self._lock:
+                for row in response.data or []:
+                    sections[row["content_hash"]] = str(row["id"])
+                    self._inserted_sections[str(row["id"])] = filename
+        for chunk in chunks:
+            if "section" in chunk["metadata"]:
+                chunk["parent_id"] = sections[chunk["metadata"]["section"]]
+        for section_hash, row_ids in repointed.items():
+            if previous_sections.get(section_hash) is None and sections[section_hash] is not None:
+                providers.get("supabase").table("documents").update(
+                    {"parent_id": sections[section_hash]}
+                ).in_("id", row_ids).execute()
+
+        if self.manifest is not None:
+            stat = os.stat(path)
+            self._entries[filename] = {
+                "sha256": file_digest(path),
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "chunks": dict(kept),
+                "sections": {section_hash: row_id for section_hash, row_id in sections.items() if row_id is not None},
+                "layout": self._layout,
+                "detected": detected,
+                "attributes": attributes,
+            }
+            if previous is not None and kept and previous.get("attributes") != attributes:
+                # Rows kept from the previous version still carry its attributes
+                self._retag(filename, attributes)
+
+        def start_embedding(progress: FileProgress) -> None:
+            progress.pages = len(pages)
+            progress.chunks = len(chunks)
+            progress.reused = len(kept) - linked
+            progress.duplicates = linked + aliased
+            progress.sections = len(needed)
+            progress.deleted += deleted
+            progress.status = "embedding"
+
+        self._update(filename, start_embedding)
+        if not chunks:
+            logger.info(f"No new text in {filename}. Skipping embeddings.")
+            return
+
+        # Batches are packed across files up to the token and item budgets
+        same_encoding = self.embedder.encoding.name == self._token_encoding.name
+        for chunk in chunks:
+            text, tokens = self.embedder.prepare(chunk["content"])
+            reuse = same_encoding and text == chunk["content"] == chunk["content"].strip()
+            chunk.update(self._text_columns(chunk["content"], tokens if reuse else None))
+            if (batch := self._packer.add((chunk, text), tokens)) is not None:
+                self._embed_queue.put(batch)
+
+    # Stage 3: embeddings, several requests in flight under a shared, adaptive rate limit
+    def _embed_worker(self) -> None:
+        # Never leaves before _DONE: the producer and run() would block on a full queue
+        while (item := self._embed_queue.get()) is not _DONE:
+            try:
+                self._embed_batch(*item)
+            except Exception as e:
+                self._abort("embed", e)
+
+    def _embed_batch(self, batch: List[Tuple[Dict[str, Any], str]], tokens: int) -> None:
+        by_file: Dict[str, List[Dict[str, Any]]] = {}
+        for chunk, _ in batch:
+            by_file.setdefault(chunk["metadata"]["source"], []).append(chunk)
+
+        if self.cancel_event.is_set():
+            for filename in by_file:
+                self._cancel(filename)
+            return
+        try:
+            result = self.embedder.embed([text for _, text in batch], tokens)
+        except Exception as e:
+            for filename in by_file:
+                self._fail(filename, f"embedding failed: {e}")
+            return
+        for (chunk, _), vector in zip(batch, result.vectors):
+            chunk["embedding"] = vector
+        self.report.stages["embed"].record(len(batch), result.request_seconds, tokens)
+        for filename, chunks in by_file.items():
+            self._update(filename, lambda p, n=len(chunks): setattr(p, "embedded", p.embedded + n))
+            self._insert_queue.put((filename, chunks))
+
+    # Stage 4: bulk inserts, accumulated across files
+    def _insert_worker(self) -> None:
+        buffer: List[Tuple[str, Dict[str, Any]]] = []
+
+        def flush() -> None:
+            if not buffer:
+                return
+            started = time.perf_counter()
+            rows = [row for _, row in buffer]
+            try:
+                response = providers.get("supabase").table("documents").insert(rows).execute()
+            except Exception as e:
+                for filename in {filename for filename, _ in buffer}:
+                    self._fail(filename, f"insert failed: {e}")
+            else:
+                self.report.stages["insert"].record(len(rows), time.perf_counter() - started)
+                with self._lock:
+                    for row in response.data or []:
+                        metadata = row.get("metadata") or {}
+                        entry = self._entries.get(metadata.get("source"))
+                        if entry is not None and metadata.get("content_hash"):
+                            entry["chunks"][metadata["content_hash"]] = str(row["id"])
+                            self._inserted[str(row["id"])] = (metadata["source"], metadata["content_hash"])
+                inserted: Dict[str, int] = {}
+                for filename, _ in buffer:
+                    inserted[filename] = inserted.get(filename, 0) + 1
+                for filename, count in inserted.items():
+                    self._update(filename, lambda p, count=count: setattr(p, "inserted", p.inserted + count))
+            finally:
+                buffer.clear()
+
+        # Never leaves before _DONE: the embed workers would block on a full queue
+        while (item := self._insert_queue.get()) is not _DONE:
+            filename, chunks = item
+            if self.cancel_event.is_set():
+                self._cancel(filename)
+                continue
+            buffer.extend((filename, chunk) for chunk in chunks)
+            try:
+                if len(buffer) >= self.config.insert_batch_size:
+                    flush()
+            except Exception as e:
+                self._abort("insert", e)
+        try:
+            flush()
+        except Exception as e:
+            self._abort("insert", e)
+
+    def _update_sources(self, sources: Dict[str, List[str]]) -> None:
+        """Rewrite `metadata.sources` of canonical rows whose set of referencing files changed"""
+        table = providers.get("supabase").table("documents")
+        row_ids = list(sources)
+        for start in range(0, len(row_ids), self.config.delete_batch_size):
+            rows = table.select("id, metadata").in_("id", row_ids[start:start + self.config.delete_batch_size]).execute().data
+            for row in rows or []:
+                metadata = {**(row.get("metadata") or {}), "sources": sources[str(row["id"])]}
+                table.update({"metadata": metadata}).eq("id", row["id"]).execute()
+
+    def _commit_manifest(self, present: List[str]) -> None:
+        """
+        Record the files that finished, forget deleted files, then delete every
+        row that no file references any more (replaced chunks, removed files and
+        rows of files that failed or were cancelled in this run), and the parent
+        sections of those files.
+        """
+        previous_refs = self.manifest.references()
+        previous_sections = self.manifest.section_references()
+
+        for file_b, hash_b, file_a, hash_a in self._aliases:
+            row_id = self._entries[file_a]["chunks"].get(hash_a)
+            if row_id is not None:
+                self._entries[file_b]["chunks"][hash_b] = row_id
+            elif self.report.files[file_b].status == "done":
+                self._fail(file_b, f"canonical chunk from {file_a} was not ingested")
+
+        for filename, entry in self._entries.items():
+            if self.report.files[filename].status == "done":
+                self.manifest.set(filename, entry)
+
+        for filename in set(self.manifest.filenames()) - set(present):
+            self.report.files.setdefault(filename, FileProgress(filename)).status = "removed"
+            self.manifest.remove(filename)
+
+        refs = self.manifest.references()
+        dead = (set(previous_refs) | set(self._inserted) | set(self.manifest.orphans)) - set(refs)
+        for row_id in dead:
+            owners = sorted(previous_refs.get(row_id) or [self._inserted.get(row_id, ("",))[0]])
+            if owners[0] in self.report.files:
+                self.report.files[owners[0]].deleted += 1
+            self.manifest.signatures.pop(row_id, None)
+        try:
+            self._delete_rows(sorted(dead))
+            self.manifest.orphans = []
+        except Exception as e:
+            self.manifest.orphans = sorted(dead)
+            self.report.errors.append(f"deleting {len(dead)} unreferenced chunks failed: {e}")
+            logger.error(f"Error deleting unreferenced chunks, will retry next run: {e}")
+
+        dead_sections = (
+            (previous_sections | set(self._inserted_sections) | set(self.manifest.orphan_sections))
+            - self.manifest.section_references()
+        )
+        try:
+            self._delete_rows(sorted(dead_sections), "document_sections")
+            self.manifest.orphan_sections = []
+        except Exception as e:
+            self.manifest.orphan_sections = sorted(dead_sections)
+            self.report.errors.append(f"deleting {len(dead_sections)} unreferenced sections failed: {e}")
+            logger.error(f"Error deleting unreferenced sections, will retry next run: {e}")
+
+        for row_id, (filename, content_hash) in self._inserted.items():
+            signature = self._signatures.get((filename, content_hash))
+            if row_id in refs and signature is not None:
+                self.manifest.signatures[row_id] = signature
+
+        changed_sources = {}
+        for row_id, files in refs.items():
+            before = previous_refs.get(row_id)
+            if before is None and row_id in self._inserted:
+                before = {self._inserted[row_id][0]}  # Written with the row
+            if files != before:
+                changed_sources[row_id] = sorted(files)
+        try:
+            self._update_sources(changed_sources)
+        except Exception as e:
+            self.report.errors.append(f"updating chunk sources failed: {e}")
+            logger.error(f"Error updating chunk sources: {e}")
+
+        self.manifest.dirty = True
+        self.manifest.save()
+
+    def run(self, paths: List[str]) -> IngestReport:
+        for path in paths:
+            filename = os.path.basename(path)
+            self.report.files.setdefault(filename, FileProgress(filename))
+        changed = self._select_changed(paths)
+
+        embedders = [
+            threading.Thread(target=self._embed_worker, name=f"ingest-embed-{i}", daemon=True)
+            for i in range(self.config.embed_concurrency)
+        ]
+        inserter = threading.Thread(target=self._insert_worker, name="ingest-insert", daemon=True)
+        for thread in embedders + [inserter]:
+            thread.start()
+
+        try:
+            self._produce(changed)
+        finally:
+            for _ in embedders:
+                self._embed_queue.put(_DONE)
+            for thread in embedders:
+                thread.join()
+            self._insert_queue.put(_DONE)
+            inserter.join()
+
+        if self._failure is not None:
+            # Nothing in flight finished cleanly; roll those files back with the manifest commit
+            for progress in self.report.files.values():
+                if progress.status not in ("done", "failed", "unchanged"):
+                    progress.status = "failed"
+                    progress.error = progress.error or self._failure
+        if self.manifest is not None:
+            self._commit_manifest([os.path.basename(path) for path in paths])
+        self.report.finished_at = time.time()
+
+        for name, stats in self.report.stages.items():
+            metrics.incr(f"ingest.{name}.items", stats.items)
+            logger.info(f"Ingest stage {name}: {stats.as_dict()}")
+        if self._failure is not None:
+            raise RuntimeError(f"Ingestion aborted: {self._failure}")
+        return self.report
+
+
+def ingest_pdfs_from_directory(
+    directory_path: str,
+    config: Optional[IngestConfig] = None,
+    report: Optional[IngestReport] = None,
+    cancel_event: Optional[threading.Event] = None,
+) -> IngestReport:
+    """
+    Ingests the PDF documents of a directory into Supabase, skipping files and
+    chunks already recorded in the directory's ingest manifest, and rebuilds
+    the lexical index if anything changed. Department, state and issue date
+    come from the directory's attributes file (see DirectoryAttributes) and
+    the PDFs themselves.
+
+    `report` is filled in while the run progresses, and setting `cancel_event`
+    stops it after the batches in flight; files that did not finish are rolled
+    back so the next run picks them up again. An unexpected error in one of the
+    pipeline stages rolls back the unfinished files the same way and is raised.
+    """
+    from .rag_service import rebuild_lexical_index
+
+    config = config or IngestConfig.from_settings()
+    manifest = IngestManifest(os.path.join(directory_path, config.manifest_filename))
+    attributes = DirectoryAttributes(os.path.join(directory_path, config.attributes_filename))
+    pipeline = IngestionPipeline(
+        config, report=report, manifest=manifest, cancel_event=cancel_event, attributes=attributes
+    )
+    report = pipeline.run(list_pdfs(directory_path))
+
+    if not report.changed:
+        logger.info("Ingestion found no changes; lexical index left as is.")
+        return report
+    try:
+        rebuild_lexical_index()
+    except Exception as e:
+        report.errors.append(f"lexical index rebuild failed: {e}")
+        logger.error(f"Error rebuilding lexical index: {e}")
+    return report
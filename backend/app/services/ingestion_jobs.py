@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from ..core.config import settings
+from ..core.metrics import metrics
+from ..core.providers import providers
+from .ingestion import IngestReport, ingest_pdfs_from_directory
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+
+def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat() if timestamp else None
+
+
+@dataclass
+class IngestionJob:
+    directory: str
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = "queued"  # queued -> running -> completed | failed | cancelled
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    report: IngestReport = field(default_factory=IngestReport)
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def as_dict(self, include_files: bool = True) -> Dict[str, Any]:
+        report = self.report.as_dict()
+        files = report.pop("files")
+        settled = [f for f in files if f["status"] not in ("pending", "parsing", "embedding")]
+        result = {
+            "job_id": self.id,
+            "directory": self.directory,
+            "status": self.status,
+            "created_at": _isoformat(self.created_at),
+            "started_at": _isoformat(self.started_at),
+            "finished_at": _isoformat(self.finished_at),
+            "error": self.error,
+            "progress": {
+                "files_total": len(files),
+                "files_settled": len(settled),
+                "chunks_embedded": sum(f["embedded"] for f in files),
+            },
+            **report,
+        }
+        if include_files:
+            result["files"] = files
+        return result
+
+
+class IngestionJobManager:
+    """
+    Runs ingestion jobs on a small thread pool so request handlers return at
+    once and the event loop keeps serving chat traffic. Jobs run one at a time
+    by default, since concurrent runs over the same directory would race on its
+    ingest manifest. The most recent `max_jobs_kept` jobs stay queryable.
+    """
+
+    def __init__(self, max_workers: int = 1, max_jobs_kept: int = 50):
+        self.max_jobs_kept = max_jobs_kept
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest-job")
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, directory: str) -> IngestionJob:
+        job = IngestionJob(directory=directory)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job)
+        metrics.incr("ingest.jobs.submitted")
+        logger.info(f"Ingestion job {job.id} queued for {directory}")
+        return job
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(self._jobs) - self.max_jobs_kept)]:
+            del self._jobs[job_id]
+
+    def _run(self, job: IngestionJob) -> None:
+        if job.cancel_event.is_set():
+            job.status = "cancelled"
+            job.finished_at = time.time()
+            return
+
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            ingest_pdfs_from_directory(job.directory, report=job.report, cancel_event=job.cancel_event)
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            logger.exception(f"Ingestion job {job.id} failed")
+        else:
+            job.status = "cancelled" if job.cancel_event.is_set() else "completed"
+        job.finished_at = time.time()
+        metrics.incr(f"ingest.jobs.{job.status}")
+        metrics.observe("ingest.jobs.duration_s", job.finished_at - job.started_at)
+        logger.info(f"Ingestion job {job.id} {job.status} in {job.finished_at - job.started_at:.1f}s")
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        return self._jobs.get(job_id)
+
+    def list(self) -> List[IngestionJob]:
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    def cancel(self, job_id: str) -> Optional[IngestionJob]:
+        """Request cancellation; a queued job never starts, a running one stops after its in-flight batches"""
+        job = self._jobs.get(job_id)
+        if job is not None and not job.finished:
+            job.cancel_event.set()
+        return job
+
+    async def close(self) -> None:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            job.cancel_event.set()
+        await asyncio.to_thread(self._executor.shutdown, True)
+
+
+providers.register(
+    "ingestion_jobs",
+    lambda: IngestionJobManager(settings.INGEST_JOB_WORKERS, settings.INGEST_JOBS_KEPT),
+    close=lambda manager: manager.close(),
+)
@@ -0,0 +1,210 @@
+import logging
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Devanagari letters and signs (excluding the danda punctuation U+0964/U+0965),
+# or Roman/number runs that may be joined by "/", "-" or "." as in form numbers
+# and circular IDs such as "12/2023" or "F-7".
+TOKEN_RE = re.compile(r"[\u0900-\u0963\u0971-\u097F]+|[a-z0-9]+(?:[/.\-][a-z0-9]+)*")
+DEVANAGARI_DIGITS = str.maketrans("०१२३४५६७८९", "0123456789")
+ROMAN_FOLDS = (("ee", "i"), ("oo", "u"), ("w", "v"))
+REPEATED_LETTER_RE = re.compile(r"([a-z])\1+")
+
+
+def _fold_roman(token: str) -> str:
+    """Smooth over common Hinglish spelling variants (e.g. 'yojnaa' / 'yojna', 'neeti' / 'niti')"""
+    for source, target in ROMAN_FOLDS:
+        token = token.replace(source, target)
+    return REPEATED_LETTER_RE.sub(r"\1", token)
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokenize mixed Devanagari / Roman text for BM25"""
+    text = unicodedata.normalize("NFKC", text).casefold().translate(DEVANAGARI_DIGITS)
+    # Zero-width joiners, nukta and chandrabindu vary between typists
+    text = text.replace("\u200c", "").replace("\u200d", "").replace("\u093c", "").replace("\u0901", "\u0902")
+
+    tokens = []
+    for match in TOKEN_RE.finditer(text):
+        token = match.group()
+        if token.isascii():
+            parts = re.split(r"[/.\-]", token)
+            if len(parts) > 1:
+                # Keep the verbatim identifier and its components
+                tokens.append(token)
+                tokens.extend(_fold_roman(part) if part.isalpha() else part for part in parts if part)
+                continue
+            if token.isalpha():
+                token = _fold_roman(token)
+        tokens.append(token)
+    return tokens
+
+
+class LexicalIndex:
+    """
+    BM25 index with compact CSR-style postings.
+
+    Postings for term `t` live in `postings_docs[offsets[t]:offsets[t + 1]]` with
+    matching term frequencies in `postings_tf`; everything is a flat NumPy array
+    so the index loads in one read and a lookup is a slice plus a vectorized score.
+    """
+
+    def __init__(
+        self,
+        vocabulary: Dict[str, int],
+        offsets: np.ndarray,
+        postings_docs: np.ndarray,
+        postings_tf: np.ndarray,
+        doc_lengths: np.ndarray,
+        doc_ids: np.ndarray,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.postings_docs = postings_docs
+        self.postings_tf = postings_tf
+        self.doc_lengths = doc_lengths
+        self.doc_ids = doc_ids
+        self.k1 = k1
+        self.b = b
+        self.avg_doc_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+        document_frequency = np.diff(offsets).astype(np.float32)
+        self.idf = np.log1p((len(doc_ids) - document_frequency + 0.5) / (document_frequency + 0.5)).astype(np.float32)
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    @classmethod
+    def build(cls, rows: Iterable[Tuple[str, str]]) -> "LexicalIndex":
+        """Build from (document id, content) pairs"""
+        vocabulary: Dict[str, int] = {}
+        term_postings: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+        doc_ids: List[str] = []
+        doc_lengths: List[int] = []
+
+        for doc_index, (doc_id, content) in enumerate(rows):
+            tokens = tokenize(content or "")
+            doc_ids.append(str(doc_id))
+            doc_lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                term_id = vocabulary.setdefault(term, len(vocabulary))
+                term_postings[term_id].append((doc_index, tf))
+
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        for term_id in range(len(vocabulary)):
+            offsets[term_id + 1] = offsets[term_id] + len(term_postings[term_id])
+
+        postings_docs = np.empty(offsets[-1], dtype=np.int32)
+        postings_tf = np.empty(offsets[-1], dtype=np.uint16)
+        for term_id, postings in term_postings.items():
+            start = offsets[term_id]
+            docs, tfs = zip(*postings)
+            postings_docs[start:start + len(docs)] = docs
+            postings_tf[start:start + len(tfs)] = np.minimum(tfs, np.iinfo(np.uint16).max)
+
+        return cls(
+            vocabulary,
+            offsets,
+            postings_docs,
+            postings_tf,
+            np.asarray(doc_lengths, dtype=np.int32),
+            np.asarray(doc_ids),
+        )
+
+    def search(self, query: str, top_k: int = 20) -> List[Tuple[str, float]]:
+        """Return up to `top_k` (document id, BM25 score) pairs, best first"""
+        if not len(self.doc_ids) or self.avg_doc_length == 0:
+            return []  # Empty corpus (or only empty chunks): nothing to normalize lengths against
+        term_ids = {self.vocabulary[token] for token in tokenize(query) if token in self.vocabulary}
+        if not term_ids:
+            return []
+
+        scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+        for term_id in term_ids:
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            docs = self.postings_docs[start:end]
+            tf = self.postings_tf[start:end].astype(np.float32)
+            norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[docs] / self.avg_doc_length)
+            scores[docs] += self.idf[term_id] * tf * (self.k1 + 1) / (tf + norm)
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > top_k:
+            matched = matched[np.argpartition(-scores[matched], top_k)[:top_k]]
+        matched = matched[np.argsort(-scores[matched])]
+        return [(str(self.doc_ids[i]), float(scores[i])) for i in matched]
+
+    def save(self, path: str) -> None:
+        """Write atomically so readers never observe a partial file"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        terms = np.empty(len(self.vocabulary), dtype=object)
+        for term, term_id in self.vocabulary.items():
+            terms[term_id] = term
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            terms=terms.astype(str),
+            offsets=self.offsets,
+            postings_docs=self.postings_docs,
+            postings_tf=self.postings_tf,
+            doc_lengths=self.doc_lengths,
+            doc_ids=self.doc_ids.astype(str),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "LexicalIndex":
+        with np.load(path) as data:
+            vocabulary = {term: term_id for term_id, term in enumerate(data["terms"].tolist())}
+            return cls(
+                vocabulary,
+                data["offsets"],
+                data["postings_docs"],
+                data["postings_tf"],
+                data["doc_lengths"],
+                data["doc_ids"],
+            )
+
+
+class LexicalIndexFile:
+    """Serves the index at `path`, reloading it when another process rebuilds it"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._index: Optional[LexicalIndex] = None
+        self._mtime: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def current(self) -> Optional[LexicalIndex]:
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return None
+
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    try:
+                        self._index = LexicalIndex.load(self.path)
+                        self._mtime = mtime
+                        logger.info(f"Loaded lexical index with {len(self._index)} chunks from {self.path}")
+                    except Exception as e:
+                        logger.error(f"Failed to load lexical index {self.path}: {e}")
+        return self._index
+
+    def replace(self, index: LexicalIndex) -> None:
+        """Persist a freshly built index and serve it immediately"""
+        with self._lock:
+            index.save(self.path)
+            self._index = index
+            self._mtime = os.stat(self.path).st_mtime
@@ -0,0 +1,93 @@
+import re
+import zlib
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+WORD_RE = re.compile(r"\w+")
+
+# Hash permutations are (a * x + b) mod p over 31-bit shingle hashes, which
+# keeps every intermediate product inside uint64
+_PRIME = np.uint64((1 << 31) - 1)
+
+
+class MinHasher:
+    """
+    MinHash signatures over word shingles. Signatures are deterministic across
+    processes and runs (CRC32 shingle hashes, seeded permutations), so they can
+    be persisted and compared with later ingests.
+    """
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 5, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_PRIME), size=num_perm, dtype=np.uint64)
+
+    def _shingle_hashes(self, text: str) -> np.ndarray:
+        words = WORD_RE.findall(text.casefold())
+        size = self.shingle_size
+        shingles = [" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))] if words else []
+        return np.array([zlib.crc32(s.encode("utf-8")) for s in set(shingles)], dtype=np.uint64) % _PRIME
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """uint32 signature, or None for text without words"""
+        hashes = self._shingle_hashes(text)
+        if not len(hashes):
+            return None
+        return ((hashes[:, None] * self._a + self._b) % _PRIME).min(axis=0).astype(np.uint32)
+
+    @staticmethod
+    def similarity(a: np.ndarray, b: np.ndarray) -> float:
+        """Estimated Jaccard similarity of the underlying shingle sets"""
+        return float(np.mean(a == b))
+
+    @staticmethod
+    def to_hex(signature: np.ndarray) -> str:
+        return signature.astype("<u4").tobytes().hex()
+
+    @staticmethod
+    def from_hex(value: str) -> np.ndarray:
+        return np.frombuffer(bytes.fromhex(value), dtype="<u4").astype(np.uint32)
+
+
+class NearDuplicateIndex:
+    """
+    LSH over MinHash signatures: signatures are split into `bands` bands and
+    any shared band makes a candidate, which is confirmed against `threshold`.
+    With 64 permutations and 8 bands, pairs at 0.9 similarity become
+    candidates ~99% of the time.
+    """
+
+    def __init__(self, bands: int = 8, threshold: float = 0.9):
+        self.bands = bands
+        self.threshold = threshold
+        self._buckets: Dict[Tuple[int, bytes], List[Hashable]] = {}
+        self._signatures: Dict[Hashable, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def _band_keys(self, signature: np.ndarray):
+        for band, values in enumerate(np.array_split(signature, self.bands)):
+            yield band, values.tobytes()
+
+    def find(self, signature: np.ndarray) -> Optional[Hashable]:
+        """Key of the most similar indexed signature at or above the threshold"""
+        best_key, best_similarity = None, self.threshold
+        seen = set()
+        for band_key in self._band_keys(signature):
+            for key in self._buckets.get(band_key, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                similarity = MinHasher.similarity(signature, self._signatures[key])
+                if similarity >= best_similarity:
+                    best_key, best_similarity = key, similarity
+        return best_key
+
+    def add(self, key: Hashable, signature: np.ndarray) -> None:
+        self._signatures[key] = signature
+        for band_key in self._band_keys(signature):
+            self._buckets.setdefault(band_key, []).append(key)
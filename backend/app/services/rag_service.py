@@ -1,135 +1,335 @@
 # app/services/rag_service.py
 
-import os
-import fitz  # PyMuPDF
+import asyncio
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
 from app.core.config import settings
-from supabase import create_client, Client
-from openai import OpenAI
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from sentence_transformers import CrossEncoder
-import numpy as np
+from app.core.database import engine
+from app.core.metrics import metrics
+from app.core.providers import providers
+from app.services.embedding_cache import EmbeddingCache
+from app.services.rerank_batcher import RerankBatcher
+from app.services.rerank_cache import RerankScoreCache
+from app.services.reranker_backends import load_reranker
+from app.services.retrieval_cascade import CascadeConfig, plan_rerank, reciprocal_rank_fusion
+from app.services.lexical_index import LexicalIndex, LexicalIndexFile
+from app.services.vector_store import RetrievalFilters, create_vector_store
+from app.services.context_packer import ContextPacker
+
+# Clients and models are built on first use (or during the lifespan warm-up),
+# not as import side effects.
+def _create_supabase_client():
+    from supabase import create_client
+    return create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+
+def _create_openai_client():
+    from openai import OpenAI
+    return OpenAI(api_key=settings.OPENAI_API_KEY)
 
-# Initialize Supabase and OpenAI clients
-supabase: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
-openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
+providers.register("supabase", _create_supabase_client)
+providers.register("openai", _create_openai_client)
+providers.register(
+    "rerank_model",
+    lambda: load_reranker(
+        settings.RERANKER_BACKEND,
+        settings.RERANKER_MODEL,
+        onnx_dir=settings.RERANKER_ONNX_DIR,
+        max_length=settings.RERANKER_MAX_LENGTH,
+    ),
+)
+providers.register(
+    "rerank_batcher",
+    lambda: RerankBatcher(
+        providers.get("rerank_model"),
+        max_batch_size=settings.RERANK_MAX_BATCH_SIZE,
+        max_wait_ms=settings.RERANK_MAX_WAIT_MS,
+        predict_batch_size=settings.RERANK_PREDICT_BATCH_SIZE,
+    ),
+    close=lambda batcher: batcher.close(),
+)
+# Refined or repeated questions only send unseen (query, chunk) pairs to the model
+providers.register(
+    "rerank_cache",
+    lambda: RerankScoreCache(
+        max_entries=settings.RERANK_CACHE_SIZE,
+        ttl_seconds=settings.RERANK_CACHE_TTL_SECONDS,
+    ),
+)
+# Repeat questions skip the embedding round trip entirely
+providers.register(
+    "embedding_cache",
+    lambda: EmbeddingCache(
+        path=settings.EMBEDDING_CACHE_PATH,
+        memory_size=settings.EMBEDDING_CACHE_SIZE,
+        disk_size=settings.EMBEDDING_CACHE_DISK_SIZE,
+    ),
+    close=lambda cache: cache.close(),
+)
+# pgvector (default) or the offline memory-mapped index
+providers.register(
+    "vector_store",
+    lambda: create_vector_store(
+        settings.VECTOR_BACKEND,
+        engine=engine,
+        local_index_dir=settings.LOCAL_INDEX_DIR,
+        compact_dimensions=settings.EMBEDDING_COMPACT_DIMENSIONS,
+        rescore_factor=settings.RAG_RESCORE_FACTOR,
+        iterative_scan=settings.RAG_HNSW_ITERATIVE_SCAN,
+        ef_search=settings.RAG_HNSW_EF_SEARCH,
+    ),
+)
+providers.register(
+    "context_packer",
+    lambda: ContextPacker(
+        token_budget=settings.RAG_CONTEXT_TOKEN_BUDGET,
+        model=settings.OPENAI_MODEL,
+        redundancy_threshold=settings.RAG_CONTEXT_REDUNDANCY_THRESHOLD,
+    ),
+)
 
-# Initialize the re-ranking model
-rerank_model = CrossEncoder('cross-encoder/ms-marco-MiniLM-L-6-v2')
+cascade_config = CascadeConfig(
+    similarity_window=settings.RAG_RERANK_SIMILARITY_WINDOW,
+    decisive_gap=settings.RAG_RERANK_DECISIVE_GAP,
+    min_pairs=settings.RAG_RERANK_MIN_PAIRS,
+    max_pairs=settings.RAG_RERANK_MAX_PAIRS,
+)
 
-def get_embedding(text, model="text-embedding-3-small"):
-   text = text.replace("\n", " ")
-   return openai_client.embeddings.create(input = [text], model=model).data[0].embedding
+# BM25 over chunk text, rebuilt after each ingest and shared by all workers
+lexical_index_file = LexicalIndexFile(settings.LEXICAL_INDEX_PATH)
 
-def ingest_pdfs_from_directory(directory_path: str):
+def get_embedding(text, model=settings.EMBEDDING_MODEL):
+   embedding_cache = providers.get("embedding_cache")
+   cached = embedding_cache.get(text, model)
+   if cached is not None:
+       return cached
+   openai_client = providers.get("openai")
+   embedding = openai_client.embeddings.create(input = [text.replace("\n", " ")], model=model).data[0].embedding
+   return embedding_cache.put(text, model, embedding)
+
+async def lexical_search(
+    query: str,
+    query_embedding,
+    known_docs: list[dict],
+    top_k: int,
+    filters: RetrievalFilters | None = None,
+) -> list[dict]:
     """
-    Ingests all PDF documents from a specified directory into Supabase using batch processing.
+    BM25 hits for the query, best first. Hits already present in `known_docs`
+    are reused; the rest are fetched from the vector store, which drops the
+    ones outside `filters`.
     """
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-    
-    for filename in os.listdir(directory_path):
-        if not filename.lower().endswith(".pdf"):
-            continue
+    def search() -> list[tuple[str, float]]:
+        index = lexical_index_file.current()
+        if index is None:
+            return []
+        # The BM25 index is unfiltered; over-fetch so enough hits survive the scope
+        return index.search(query, top_k * 4 if filters else top_k)
 
-        filepath = os.path.join(directory_path, filename)
-        print(f"Processing {filename}...")
-        
-        # 1. Document Loading
-        doc = fitz.open(filepath)
-        
-        all_chunks = []
-        
-        for page_num, page in enumerate(doc):
-            text = page.get_text()
-            if not text.strip():
-                continue
+    # Reloading a rebuilt index and scoring the postings are blocking; keep them off the event loop
+    hits = await asyncio.to_thread(search)
+    if not hits:
+        return []
 
-            # 2. Text Chunking
-            chunks = text_splitter.split_text(text)
-            
-            for i, chunk_text in enumerate(chunks):
-                all_chunks.append({
-                    "content": chunk_text,
-                    "metadata": {"source": filename, "page": page_num + 1, "chunk": i}
-                })
-        
-        doc.close()
+    docs_by_id = {doc['id']: doc for doc in known_docs}
+    missing = [doc_id for doc_id, _ in hits if doc_id not in docs_by_id]
+    for doc in await providers.get("vector_store").fetch_documents(missing, query_embedding, filters):
+        docs_by_id[doc['id']] = doc
 
-        if not all_chunks:
-            print(f"No text found in {filename}. Skipping.")
-            continue
+    lexical_docs = []
+    for doc_id, score in hits:
+        doc = docs_by_id.get(doc_id)
+        if doc is not None:  # Stale index entries for deleted chunks are skipped
+            doc['lexical_score'] = score
+            lexical_docs.append(doc)
+    return lexical_docs[:top_k]
 
-        # 3. Embedding Generation (in batches)
-        print(f"Generating embeddings for {len(all_chunks)} chunks from {filename}...")
-        chunk_contents = [chunk['content'] for chunk in all_chunks]
-        
-        try:
-            embeddings_response = openai_client.embeddings.create(input=chunk_contents, model="text-embedding-3-small")
-            embeddings = [item.embedding for item in embeddings_response.data]
-            
-            # Add embeddings to our chunks
-            for i, chunk in enumerate(all_chunks):
-                chunk['embedding'] = embeddings[i]
+def rebuild_lexical_index(page_size: int = 1000) -> LexicalIndex:
+    """
+    Rebuilds the BM25 index over every chunk in the documents table and
+    publishes it for all workers.
+    """
+    supabase = providers.get("supabase")
 
-        except Exception as e:
-            print(f"Error generating embeddings for {filename}: {e}")
-            continue # Skip to the next file
+    def iter_rows():
+        start = 0
+        while True:
+            rows = supabase.table("documents").select("id, content").order("id").range(start, start + page_size - 1).execute().data
+            for row in rows:
+                yield row["id"], row["content"]
+            if len(rows) < page_size:
+                break
+            start += page_size
 
-        # 4. Vector Storage (in batches)
-        print(f"Ingesting {len(all_chunks)} chunks into Supabase for {filename}...")
-        batch_size = 100
-        total_batches = (len(all_chunks) + batch_size - 1) // batch_size
+    index = LexicalIndex.build(iter_rows())
+    lexical_index_file.replace(index)
+    print(f"Lexical index rebuilt with {len(index)} chunks.")
+    return index
 
-        try:
-            for i in range(0, len(all_chunks), batch_size):
-                batch = all_chunks[i:i + batch_size]
-                current_batch_num = (i // batch_size) + 1
-                print(f"  - Ingesting batch {current_batch_num} of {total_batches} for {filename}...")
-                supabase.table("documents").insert(batch).execute()
-            
-            print(f"Successfully ingested {filename}")
-        except Exception as e:
-            print(f"Error ingesting data for {filename}: {e}")
+async def expand_to_parents(docs: list[dict], limit: int) -> list[dict]:
+    """
+    Replaces the best `limit` child chunks with their parent sections, fetched
+    in one round trip. Children of a parent that is already in the list are
+    dropped, so each section is sent once; the child text is kept as
+    `fallback_content` for when the section does not fit the prompt budget.
+    Stored token counts and scripts travel with both texts.
+    """
+    head = docs[:limit]
+    parent_ids = list(dict.fromkeys(doc['parent_id'] for doc in head if doc.get('parent_id')))
+    if not parent_ids:
+        return docs
+    sections = await providers.get("vector_store").fetch_sections(parent_ids)
 
+    expanded, seen = [], set()
+    for doc in head:
+        parent_id = doc.get('parent_id')
+        section = sections.get(parent_id) if parent_id else None
+        if section is None:  # No parent, or it was deleted with its file
+            expanded.append(doc)
+        elif parent_id not in seen:
+            seen.add(parent_id)
+            expanded.append({
+                **doc,
+                **section,
+                'fallback_content': doc.get('content', ''),
+                'fallback_token_count': doc.get('token_count'),
+                'fallback_script': doc.get('script'),
+            })
+    metrics.incr("rag.parents.expanded", len(seen))
+    metrics.incr("rag.parents.deduplicated", len(head) - len(expanded))
+    return expanded + docs[limit:]
 
-def get_rag_context(query: str, top_k: int = 5) -> str | None:
+@dataclass
+class RetrievalTrace:
+    """
+    What one get_rag_context call did: wall time per stage and the chunks each
+    stage produced. Pass one in to inspect a call (the retrieval benchmark
+    does); stage timings are recorded as `rag.stage.<name>_ms` metrics either way.
+    """
+    stages_ms: dict[str, float] = field(default_factory=dict)
+    retrieved_ids: list[str] = field(default_factory=list)
+    ranked: list[dict] = field(default_factory=list)  # Final order before parent expansion
+    packed_ids: list[str] = field(default_factory=list)
+    rerank_pairs: int = 0  # Pairs scored by the model (rerank cache misses)
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.stages_ms[name] = self.stages_ms.get(name, 0.0) + elapsed_ms
+            metrics.observe(f"rag.stage.{name}_ms", elapsed_ms)
+
+async def get_rag_context(
+    query: str,
+    top_k: int | None = None,
+    filters: RetrievalFilters | None = None,
+    ef_search: int | None = None,
+    trace: RetrievalTrace | None = None,
+) -> str | None:
     """
     Retrieves and re-ranks context from documents based on a query.
     Returns a formatted context string or None if no relevant documents are found.
+    At most `top_k` chunks are packed, within the configured prompt token budget.
+    `filters` restrict the search to matching circulars (source, department, state, issue date).
+    `ef_search` overrides the HNSW search effort (RAG_HNSW_EF_SEARCH) for this query.
+    `trace`, if given, receives per-stage timings and the chunks each stage kept.
     This function is more robust and includes detailed logging.
     """
+    top_k = top_k or settings.RAG_CONTEXT_MAX_CHUNKS
+    trace = trace if trace is not None else RetrievalTrace()
     try:
         # 1. Query Embedding
-        query_embedding = get_embedding(query)
+        with trace.stage("embed"):
+            # Cache lookups and the embeddings call are blocking; keep them off the event loop
+            query_embedding = await asyncio.to_thread(get_embedding, query)
         print(f"RAG DEBUG: {query} Query embedding: {query_embedding[0]}")
-        # 2. Retrieval from Supabase
-        retrieved_docs = supabase.rpc(
-            "match_documents",
-            {"query_embedding": query_embedding, "match_threshold": 0.5, "match_count": 100}
-        ).execute().data
+        # 2. Vector retrieval
+        with trace.stage("vector"):
+            retrieved_docs = await providers.get("vector_store").match_documents(
+                query_embedding,
+                match_threshold=settings.RAG_MATCH_THRESHOLD,
+                match_count=settings.RAG_MATCH_COUNT,
+                filters=filters,
+                ef_search=ef_search,
+            )
+        trace.retrieved_ids = [doc['id'] for doc in retrieved_docs]
         
         # Log the retrieved documents
-        print(f"RAG DEBUG: Retrieved {len(retrieved_docs)} docs from Supabase.")
+        print(f"RAG DEBUG: Retrieved {len(retrieved_docs)} docs from the {settings.VECTOR_BACKEND} vector store.")
 
-        if not retrieved_docs or not isinstance(retrieved_docs, list):
-            print("RAG DEBUG: No valid documents returned from Supabase.")
+        # 2b. Lexical retrieval catches exact scheme names, form numbers and circular IDs
+        lexical_docs = []
+        if settings.RAG_HYBRID_ENABLED:
+            with trace.stage("lexical"):
+                lexical_docs = await lexical_search(
+                    query, query_embedding, retrieved_docs, settings.RAG_LEXICAL_TOP_K, filters
+                )
+            print(f"RAG DEBUG: Retrieved {len(lexical_docs)} docs from the lexical index.")
+
+        if not retrieved_docs and not lexical_docs:
+            print("RAG DEBUG: No valid documents returned from the vector store.")
             return None
 
-        # 3. Re-ranking
-        cross_inp = [[query, doc.get('content', '')] for doc in retrieved_docs]
-        cross_scores = rerank_model.predict(cross_inp)
-        
-        for doc, score in zip(retrieved_docs, cross_scores):
-            doc['rerank_score'] = score
-            
-        reranked_docs = sorted(retrieved_docs, key=lambda x: x.get('rerank_score', 0), reverse=True)
+        # 3. Re-ranking, limited to the candidates the similarity distribution leaves open
+        rerank_candidates, decision = plan_rerank(retrieved_docs, top_k, cascade_config)
+        print(f"RAG DEBUG: Rerank cascade: {decision.as_dict()}")
+
+        if lexical_docs:
+            # Fuse lexical hits into the rerank pool; if they surface chunks outside
+            # the vector top_k, the decisive-gap shortcut no longer holds.
+            vector_top_ids = {doc['id'] for doc in retrieved_docs[:top_k]}
+            if rerank_candidates or any(doc['id'] not in vector_top_ids for doc in lexical_docs):
+                rerank_candidates = reciprocal_rank_fusion(
+                    [rerank_candidates or retrieved_docs[:top_k], lexical_docs], k=settings.RAG_RRF_K
+                )
+                # Fusion adds lexical-only hits; the per-request pair cap still applies
+                rerank_candidates = rerank_candidates[:cascade_config.max_pairs]
+                metrics.observe("rag.cascade.fused_rerank_pairs", len(rerank_candidates))
+            else:
+                retrieved_docs = reciprocal_rank_fusion([retrieved_docs, lexical_docs], k=settings.RAG_RRF_K)
+
+        if rerank_candidates:
+            rerank_cache = providers.get("rerank_cache")
+            scores = rerank_cache.get_many(query, [doc['id'] for doc in rerank_candidates])
+            uncached_docs = [doc for doc in rerank_candidates if doc['id'] not in scores]
+            print(f"RAG DEBUG: Rerank cache hits: {len(scores)}/{len(rerank_candidates)}")
+
+            if uncached_docs:
+                cross_inp = [[query, doc.get('content', '')] for doc in uncached_docs]
+                with trace.stage("rerank"):
+                    cross_scores = await providers.get("rerank_batcher").score(cross_inp)
+                trace.rerank_pairs = len(cross_inp)
+                fresh_scores = {doc['id']: float(score) for doc, score in zip(uncached_docs, cross_scores)}
+                rerank_cache.put_many(query, fresh_scores)
+                scores.update(fresh_scores)
+
+            for doc in rerank_candidates:
+                doc['rerank_score'] = scores[doc['id']]
+
+            reranked_docs = sorted(rerank_candidates, key=lambda x: x.get('rerank_score', 0), reverse=True)
+        else:
+            # Vector order is already decisive
+            reranked_docs = retrieved_docs
+        trace.ranked = list(reranked_docs)
         
-        # 4. Format final context from top K documents
-        top_docs = reranked_docs[:top_k]
-        final_context = "\n---\n".join([doc['content'] for doc in top_docs if doc.get('content')])
+        # 4. Send the winners' parent sections, each once, in place of the matched chunks
+        if settings.RAG_PARENT_EXPANSION:
+            with trace.stage("expand"):
+                reranked_docs = await expand_to_parents(reranked_docs, top_k * 2)
+
+        # 5. Pack the best chunks into the prompt token budget, skipping overlapping ones
+        with trace.stage("pack"):
+            packed = providers.get("context_packer").pack(reranked_docs, max_chunks=top_k)
+        trace.packed_ids = packed.chunk_ids
+        final_context = packed.text
 
         # Final check to ensure we return a non-empty string or None
         if final_context.strip():
-            print(f"RAG DEBUG: Final context length: {len(final_context)}")
+            print(f"RAG DEBUG: Packed context: {packed.as_dict()}")
             return final_context
         else:
             print("RAG DEBUG: Final context is empty after processing.")
@@ -140,13 +340,13 @@ def get_rag_context(query: str, top_k: int = 5) -> str | None:
         return None
 
 
-def query_rag(query: str):
+async def query_rag(query: str):
     """
     Queries the RAG pipeline to get a direct answer for a given query.
     This is now a wrapper around get_rag_context and the OpenAI API.
     """
     # 1. Retrieve RAG context
-    final_context = get_rag_context(query)
+    final_context = await get_rag_context(query)
     
     # 2. Handle case where no context is found
     if final_context is None:
@@ -167,7 +367,9 @@ def query_rag(query: str):
     Answer:
     """
     
-    response = openai_client.chat.completions.create(
+    # The shared client is synchronous; keep the completion off the event loop
+    response = await asyncio.to_thread(
+        providers.get("openai").chat.completions.create,
         model="gpt-4o",
         messages=[
             {"role": "system", "content": "You are a helpful assistant."},
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+Pair = Sequence[str]
+
+
+class RerankBatcher:
+    """
+    Dynamic micro-batching scheduler for a cross-encoder.
+
+    Concurrent callers submit their (query, passage) pairs; the scheduler gathers
+    requests for up to `max_wait_ms` (or until `max_batch_size` pairs are queued),
+    runs a single `model.predict` on a dedicated worker thread and resolves each
+    caller's future with its slice of the scores. While one batch is scoring, new
+    requests keep queueing, so batch size grows with load.
+    """
+
+    def __init__(
+        self,
+        model,
+        max_batch_size: int = 256,
+        max_wait_ms: float = 5.0,
+        predict_batch_size: int = 64,
+    ):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.predict_batch_size = predict_batch_size
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._carry: Optional[Tuple[List[Pair], asyncio.Future, float]] = None
+
+    async def score(self, pairs: List[Pair]) -> np.ndarray:
+        """Score pairs as part of the next batch; returns one score per pair"""
+        if not pairs:
+            return np.empty(0, dtype=np.float32)
+
+        self._ensure_started()
+        future = self._loop.create_future()
+        await self._queue.put((pairs, future, time.perf_counter()))
+        return await future
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._carry = None
+            self._worker = loop.create_task(self._run())
+
+    async def _next_batch(self) -> List[Tuple[List[Pair], asyncio.Future, float]]:
+        if self._carry is not None:
+            first, self._carry = self._carry, None
+        else:
+            first = await self._queue.get()
+
+        batch = [first]
+        total = len(first[0])
+        deadline = self._loop.time() + self.max_wait
+
+        while total < self.max_batch_size:
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if total + len(item[0]) > self.max_batch_size:
+                # Keep oversized follow-ups for the next batch instead of overshooting
+                self._carry = item
+                break
+            batch.append(item)
+            total += len(item[0])
+
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            batch = [item for item in batch if not item[1].done()]
+            if not batch:
+                continue
+
+            all_pairs: List[Pair] = []
+            started = time.perf_counter()
+            for pairs, _, enqueued_at in batch:
+                all_pairs.extend(pairs)
+                metrics.observe("rerank.queue_wait_ms", (started - enqueued_at) * 1000)
+
+            try:
+                scores = await self._loop.run_in_executor(self._executor, self._predict, all_pairs)
+            except Exception as e:
+                logger.error(f"Rerank batch of {len(all_pairs)} pairs failed: {e}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            metrics.incr("rerank.batches")
+            metrics.incr("rerank.pairs", len(all_pairs))
+            metrics.observe("rerank.batch_pairs", len(all_pairs))
+            metrics.observe("rerank.batch_requests", len(batch))
+            metrics.observe("rerank.batch_ms", (time.perf_counter() - started) * 1000)
+
+            offset = 0
+            for pairs, future, _ in batch:
+                if not future.done():
+                    future.set_result(scores[offset:offset + len(pairs)])
+                offset += len(pairs)
+
+    def _predict(self, pairs: List[Pair]) -> np.ndarray:
+        scores = self.model.predict(pairs, batch_size=self.predict_batch_size, show_progress_bar=False)
+        return np.asarray(scores, dtype=np.float32)
+
+    async def close(self) -> None:
+        """Stop the scheduler and release the worker thread"""
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+        self._executor.shutdown(wait=False)
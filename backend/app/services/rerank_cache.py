@@ -0,0 +1,71 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Tuple
+
+from ..core.metrics import metrics
+from .embedding_cache import normalize_query
+
+
+class RerankScoreCache:
+    """
+    Bounded cache of cross-encoder scores keyed by (query fingerprint, chunk id).
+
+    Entries expire after `ttl_seconds`; when full, the least recently used entry
+    is evicted. Only pairs missing from the cache need to go to the model.
+    """
+
+    def __init__(self, max_entries: int = 50000, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(query: str) -> str:
+        return hashlib.sha1(normalize_query(query).encode("utf-8")).hexdigest()
+
+    def get_many(self, query: str, chunk_ids: Iterable[str]) -> Dict[str, float]:
+        """Return cached scores for the chunk ids that have a live entry"""
+        fingerprint = self.fingerprint(query)
+        now = time.monotonic()
+        found: Dict[str, float] = {}
+        lookups = 0
+
+        with self._lock:
+            for chunk_id in chunk_ids:
+                lookups += 1
+                key = (fingerprint, chunk_id)
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                score, expires_at = entry
+                if expires_at <= now:
+                    del self._entries[key]
+                    metrics.incr("rerank_cache.expired")
+                    continue
+                self._entries.move_to_end(key)
+                found[chunk_id] = score
+
+        metrics.incr("rerank_cache.hits", len(found))
+        metrics.incr("rerank_cache.misses", lookups - len(found))
+        if lookups:
+            metrics.observe("rerank_cache.hit_ratio", len(found) / lookups)
+        return found
+
+    def put_many(self, query: str, scores: Dict[str, float]) -> None:
+        fingerprint = self.fingerprint(query)
+        expires_at = time.monotonic() + self.ttl_seconds
+
+        with self._lock:
+            for chunk_id, score in scores.items():
+                key = (fingerprint, chunk_id)
+                self._entries[key] = (float(score), expires_at)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                metrics.incr("rerank_cache.evictions")
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,141 @@
+import json
+import logging
+import os
+import time
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+ONNX_FP32_FILENAME = "model.onnx"
+ONNX_INT8_FILENAME = "model_int8.onnx"
+ONNX_CONFIG_FILENAME = "reranker_config.json"
+
+
+class OnnxCrossEncoder:
+    """
+    Cross-encoder served by ONNX Runtime from a dynamically int8-quantized export.
+
+    Exposes the same `predict(pairs, batch_size=..., show_progress_bar=...)` contract
+    as `sentence_transformers.CrossEncoder`, applying the same activation the torch
+    model was exported with. Only `onnxruntime` and `tokenizers` are needed at
+    inference time, so torch is never imported.
+    """
+
+    def __init__(self, model_dir: str, max_length: int = 512, num_threads: Optional[int] = None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        config_path = os.path.join(model_dir, ONNX_CONFIG_FILENAME)
+        config = {}
+        if os.path.exists(config_path):
+            with open(config_path, encoding="utf-8") as f:
+                config = json.load(f)
+        self.activation = config.get("activation", "identity")
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        pad_token = "[PAD]"
+        self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id(pad_token) or 0, pad_token=pad_token)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, ONNX_INT8_FILENAME),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def predict(self, sentences: Sequence[Sequence[str]], batch_size: int = 32, show_progress_bar: bool = False) -> np.ndarray:
+        scores: List[np.ndarray] = []
+        for start in range(0, len(sentences), batch_size):
+            batch = sentences[start:start + batch_size]
+            encodings = self.tokenizer.encode_batch([(query, passage) for query, passage in batch])
+            feeds = {
+                "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+                "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+                "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+            }
+            logits = self.session.run(None, {name: value for name, value in feeds.items() if name in self.input_names})[0]
+            scores.append(logits[:, 0])
+
+        if not scores:
+            return np.empty(0, dtype=np.float32)
+        logits = np.concatenate(scores).astype(np.float32)
+        if self.activation == "sigmoid":
+            return 1 / (1 + np.exp(-logits))
+        return logits
+
+
+def export_onnx_reranker(model_name: str, output_dir: str, opset: int = 17) -> str:
+    """
+    Export a Hugging Face cross-encoder to ONNX and quantize its weights to int8.
+    Needs torch, sentence-transformers and onnx; run once per host (or bake into the image).
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import CrossEncoder
+
+    os.makedirs(output_dir, exist_ok=True)
+    fp32_path = os.path.join(output_dir, ONNX_FP32_FILENAME)
+    int8_path = os.path.join(output_dir, ONNX_INT8_FILENAME)
+
+    started = time.perf_counter()
+    cross_encoder = CrossEncoder(model_name, device="cpu")
+    tokenizer = cross_encoder.tokenizer
+    model = cross_encoder.model
+    model.eval()
+
+    # Keep the score scale identical to the torch backend
+    activation_fn = getattr(cross_encoder, "activation_fn", None) or getattr(cross_encoder, "default_activation_function", None)
+    activation = "sigmoid" if isinstance(activation_fn, torch.nn.Sigmoid) else "identity"
+
+    sample = tokenizer(
+        [["sample query", "sample passage"], ["another query", "a somewhat longer sample passage"]],
+        padding=True,
+        truncation=True,
+        return_tensors="pt",
+    )
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            dynamo=False,
+        )
+
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    tokenizer.save_pretrained(output_dir)
+    with open(os.path.join(output_dir, ONNX_CONFIG_FILENAME), "w", encoding="utf-8") as f:
+        json.dump({"model_name": model_name, "activation": activation}, f)
+
+    logger.info(f"Exported {model_name} to {int8_path} in {time.perf_counter() - started:.1f}s")
+    return int8_path
+
+
+def load_reranker(backend: str, model_name: str = DEFAULT_RERANK_MODEL, onnx_dir: str = "", max_length: int = 512):
+    """Build the configured reranker backend ("torch" or "onnx")"""
+    if backend == "onnx":
+        if not os.path.exists(os.path.join(onnx_dir, ONNX_INT8_FILENAME)):
+            logger.info(f"No ONNX reranker found in {onnx_dir}, exporting {model_name} once")
+            export_onnx_reranker(model_name, onnx_dir)
+        return OnnxCrossEncoder(onnx_dir, max_length=max_length)
+
+    if backend != "torch":
+        raise ValueError(f"Unknown reranker backend: {backend}")
+
+    from sentence_transformers import CrossEncoder
+    return CrossEncoder(model_name, max_length=max_length)
@@ -0,0 +1,98 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence, Tuple
+
+from ..core.metrics import metrics
+
+
+@dataclass
+class CascadeConfig:
+    """Knobs that trade rerank recall for latency"""
+    similarity_window: float = 0.15  # Only candidates within this distance of the best hit are reranked
+    decisive_gap: float = 0.10       # Similarity drop after the k-th hit that makes reranking unnecessary
+    min_pairs: int = 10              # Always rerank at least this many candidates (when available)
+    max_pairs: int = 50              # Hard cap on cross-encoder pairs per request
+
+
+@dataclass
+class CascadeDecision:
+    candidates: int
+    rerank_pairs: int
+    skipped_rerank: bool
+    reason: str
+    top_similarity: float
+    boundary_gap: float
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "candidates": self.candidates,
+            "rerank_pairs": self.rerank_pairs,
+            "skipped_rerank": self.skipped_rerank,
+            "reason": self.reason,
+            "top_similarity": self.top_similarity,
+            "boundary_gap": self.boundary_gap,
+        }
+
+
+def plan_rerank(docs: List[Dict[str, Any]], top_k: int, config: CascadeConfig) -> Tuple[List[Dict[str, Any]], CascadeDecision]:
+    """
+    Decide which vector hits reach the cross-encoder.
+
+    `docs` must be ordered by similarity (as returned by match_documents). Returns
+    the candidates to rerank (empty when reranking is skipped) and the decision.
+    """
+    similarities = [float(doc.get("similarity", 0.0)) for doc in docs]
+    top_similarity = similarities[0] if similarities else 0.0
+
+    # Keep hits close to the best one, bounded by the min/max pair budget
+    floor = top_similarity - config.similarity_window
+    in_window = sum(1 for similarity in similarities if similarity >= floor)
+    pool_size = max(in_window, min(config.min_pairs, len(docs)))
+    pool_size = min(pool_size, config.max_pairs, len(docs))
+
+    boundary_gap = 0.0
+    if len(similarities) > top_k:
+        boundary_gap = similarities[top_k - 1] - similarities[top_k]
+
+    if len(docs) <= 1:
+        reason = "single_candidate"
+    elif pool_size <= top_k:
+        reason = "pool_within_top_k"
+    elif boundary_gap >= config.decisive_gap:
+        reason = "decisive_gap"
+    else:
+        reason = "reranked"
+
+    skipped = reason != "reranked"
+    decision = CascadeDecision(
+        candidates=len(docs),
+        rerank_pairs=0 if skipped else pool_size,
+        skipped_rerank=skipped,
+        reason=reason,
+        top_similarity=top_similarity,
+        boundary_gap=boundary_gap,
+    )
+    record_decision(decision)
+    return ([] if skipped else docs[:pool_size]), decision
+
+
+def record_decision(decision: CascadeDecision) -> None:
+    metrics.incr(f"rag.cascade.{decision.reason}")
+    metrics.observe("rag.cascade.candidates", decision.candidates)
+    metrics.observe("rag.cascade.rerank_pairs", decision.rerank_pairs)
+    metrics.observe("rag.cascade.top_similarity", decision.top_similarity)
+    metrics.observe("rag.cascade.boundary_gap", decision.boundary_gap)
+
+
+def reciprocal_rank_fusion(ranked_lists: Sequence[List[Dict[str, Any]]], k: int = 60) -> List[Dict[str, Any]]:
+    """Merge ranked document lists by reciprocal rank, deduplicating on `id`"""
+    fused: Dict[str, Dict[str, Any]] = {}
+    scores: Dict[str, float] = {}
+    for ranked in ranked_lists:
+        for rank, doc in enumerate(ranked):
+            fused.setdefault(doc["id"], doc)
+            scores[doc["id"]] = scores.get(doc["id"], 0.0) + 1.0 / (k + rank + 1)
+
+    ordered = sorted(fused.values(), key=lambda doc: scores[doc["id"]], reverse=True)
+    for doc in ordered:
+        doc["fusion_score"] = scores[doc["id"]]
+    return ordered
@@ -0,0 +1,716 @@
+import asyncio
+import json
+import logging
+import mmap
+import os
+import shutil
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+LOCAL_EMBEDDINGS_FILENAME = "embeddings.npy"
+LOCAL_DOCUMENTS_FILENAME = "documents.jsonl"
+LOCAL_OFFSETS_FILENAME = "offsets.npy"
+LOCAL_IDS_FILENAME = "ids.npy"
+LOCAL_MANIFEST_FILENAME = "manifest.json"
+LOCAL_COMPACT_FILENAME = "compact.npy"
+LOCAL_COMPACT_SCALES_FILENAME = "compact_scales.npy"
+LOCAL_SECTIONS_FILENAME = "sections.jsonl"
+LOCAL_FILTERS_FILENAME = "filters.npz"
+
+# pgvector caps hnsw.ef_search at 1000; an HNSW scan returns at most ef_search rows
+HNSW_MAX_EF_SEARCH = 1000
+
+# Same cosine-similarity search as the `match_documents` SQL function, issued
+# directly over the asyncpg pool instead of a blocking PostgREST round trip.
+# `{filters}` takes the metadata prefilter clauses (see RetrievalFilters).
+MATCH_DOCUMENTS_TEMPLATE = """
+    select
+        d.id,
+        d.content,
+        d.metadata,
+        d.parent_id,
+        d.token_count,
+        d.script,
+        1 - (d.embedding <=> cast(:query_embedding as vector)) as similarity
+    from documents as d
+    where 1 - (d.embedding <=> cast(:query_embedding as vector)) > :match_threshold{filters}
+    order by d.embedding <=> cast(:query_embedding as vector)
+    limit :match_count
+"""
+MATCH_DOCUMENTS_SQL = text(MATCH_DOCUMENTS_TEMPLATE.format(filters=""))
+
+# Two-stage search over the compact `embedding_compact` halfvec column (see
+# scripts/supabase_compact_embeddings.sql): its HNSW index yields candidates, which are then
+# re-scored against the full-precision `embedding`.
+MATCH_DOCUMENTS_COMPACT_SQL = """
+    with candidates as (
+        select d.id, d.content, d.metadata, d.parent_id, d.token_count, d.script, d.embedding
+        from documents as d{where}
+        order by d.embedding_compact <=> cast(:query_compact as halfvec({dimensions}))
+        limit :candidate_count
+    )
+    select
+        c.id,
+        c.content,
+        c.metadata,
+        c.parent_id,
+        c.token_count,
+        c.script,
+        1 - (c.embedding <=> cast(:query_embedding as vector)) as similarity
+    from candidates as c
+    where 1 - (c.embedding <=> cast(:query_embedding as vector)) > :match_threshold
+    order by similarity desc
+    limit :match_count
+"""
+
+FETCH_DOCUMENTS_TEMPLATE = """
+    select
+        d.id,
+        d.content,
+        d.metadata,
+        d.parent_id,
+        d.token_count,
+        d.script,
+        1 - (d.embedding <=> cast(:query_embedding as vector)) as similarity
+    from documents as d
+    where d.id = any(cast(:ids as uuid[])){filters}
+"""
+FETCH_DOCUMENTS_SQL = text(FETCH_DOCUMENTS_TEMPLATE.format(filters=""))
+
+FETCH_SECTIONS_SQL = text("""
+    select s.id, s.content, s.token_count, s.script
+    from document_sections as s
+    where s.id = any(cast(:ids as uuid[]))
+""")
+
+
+@dataclass(frozen=True)
+class RetrievalFilters:
+    """
+    Metadata scope of a search; unset fields do not filter. `sources` matches
+    rows whose `metadata.sources` contains any of the files, so a chunk shared
+    by several files is found through each of them.
+    """
+    sources: Optional[Tuple[str, ...]] = None
+    department: Optional[str] = None
+    state: Optional[str] = None
+    issued_from: Optional[date] = None
+    issued_to: Optional[date] = None
+
+    def __post_init__(self):
+        if self.sources is not None:
+            object.__setattr__(self, "sources", tuple(self.sources))
+
+    def __bool__(self) -> bool:
+        return any(value is not None for value in (
+            self.sources, self.department, self.state, self.issued_from, self.issued_to
+        ))
+
+    def to_sql(self) -> Tuple[Tuple[str, ...], Dict[str, Any]]:
+        """Clauses over the `d` alias (each backed by an index) and their bind parameters"""
+        clauses, params = [], {}
+        if self.sources is not None:
+            clauses.append("d.metadata->'sources' ?| cast(:filter_sources as text[])")
+            params["filter_sources"] = list(self.sources)
+        if self.department is not None:
+            clauses.append("d.department = :filter_department")
+            params["filter_department"] = self.department
+        if self.state is not None:
+            clauses.append("d.state = :filter_state")
+            params["filter_state"] = self.state
+        if self.issued_from is not None:
+            clauses.append("d.issued_on >= :filter_issued_from")
+            params["filter_issued_from"] = self.issued_from
+        if self.issued_to is not None:
+            clauses.append("d.issued_on <= :filter_issued_to")
+            params["filter_issued_to"] = self.issued_to
+        return tuple(clauses), params
+
+
+@lru_cache(maxsize=128)
+def _filtered_statement(template: str, clauses: Tuple[str, ...], dimensions: int = 0):
+    """Compile `template` with the given filter clauses; one statement per filter combination"""
+    filters = "".join(f"\n      and {clause}" for clause in clauses)
+    where = "\n        where " + "\n          and ".join(clauses) if clauses else ""
+    return text(template.format(filters=filters, where=where, dimensions=dimensions))
+
+
+def to_vector_literal(embedding) -> str:
+    """Formats an embedding as a pgvector text literal, e.g. '[0.1,0.2]'."""
+    # pgvector stores float4; 9 significant digits round-trip exactly at half the length of repr()
+    return "[" + ",".join(f"{x:.9g}" for x in np.asarray(embedding, dtype=np.float32).tolist()) + "]"
+
+
+def compact_embedding(embedding, dimensions: int) -> np.ndarray:
+    """
+    Leading `dimensions` components, re-normalized. text-embedding-3 models are
+    trained so this matches requesting the embedding with `dimensions=...`.
+    """
+    vector = np.asarray(embedding, dtype=np.float32)[:dimensions]
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def parse_vector_literal(value: str) -> np.ndarray:
+    """Parses a pgvector text literal back into a float32 array."""
+    return np.array(value.strip("[]").split(","), dtype=np.float32)
+
+
+class PgVectorStore:
+    """
+    Vector search over the Supabase `documents` table via the async engine.
+
+    With `compact_dimensions` set, candidates come from the half-precision,
+    reduced-dimension `embedding_compact` index (`rescore_factor` x match_count of
+    them) and are re-scored at full precision before thresholding.
+
+    An HNSW scan returns at most `hnsw.ef_search` rows, so every search sets it
+    for its transaction: the requested (or default) search effort, raised to
+    the number of rows the scan has to produce.
+
+    Metadata filters are pushed into the query. HNSW filters after visiting
+    ef_search neighbours, so filtered searches also enable pgvector's iterative
+    index scan (`iterative_scan`, pgvector >= 0.8) to keep scanning until enough
+    rows pass.
+    """
+
+    def __init__(
+        self,
+        engine,
+        compact_dimensions: int = 0,
+        rescore_factor: int = 4,
+        iterative_scan: str = "",
+        ef_search: int = 0,
+    ):
+        if iterative_scan not in ("", "off", "relaxed_order", "strict_order"):
+            raise ValueError(f"Unknown hnsw.iterative_scan mode: {iterative_scan}")
+        self.engine = engine
+        self.compact_dimensions = compact_dimensions
+        self.rescore_factor = rescore_factor
+        self.iterative_scan = iterative_scan
+        self.ef_search = ef_search
+
+    def _search_options(self, scan_limit: int, ef_search: Optional[int], filtered: bool) -> Dict[str, str]:
+        options = {"hnsw.ef_search": str(min(HNSW_MAX_EF_SEARCH, max(ef_search or self.ef_search, scan_limit)))}
+        if filtered and self.iterative_scan:
+            options["hnsw.iterative_scan"] = self.iterative_scan
+        return options
+
+    async def match_documents(
+        self,
+        query_embedding,
+        match_threshold: float,
+        match_count: int,
+        filters: Optional[RetrievalFilters] = None,
+        ef_search: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Same contract as the `match_documents` RPC: id, content, metadata, similarity.
+        `ef_search` overrides the store's HNSW search effort for this query.
+        """
+        clauses, params = filters.to_sql() if filters else ((), {})
+        params.update({
+            "query_embedding": to_vector_literal(query_embedding),
+            "match_threshold": match_threshold,
+            "match_count": match_count,
+        })
+        template = MATCH_DOCUMENTS_TEMPLATE
+        scan_limit = match_count
+        if self.compact_dimensions:
+            template = MATCH_DOCUMENTS_COMPACT_SQL
+            scan_limit = params["candidate_count"] = match_count * self.rescore_factor
+            params["query_compact"] = to_vector_literal(compact_embedding(query_embedding, self.compact_dimensions))
+
+        async with self.engine.connect() as conn:
+            await _set_local(conn, self._search_options(scan_limit, ef_search, bool(clauses)))
+            result = await conn.execute(_filtered_statement(template, clauses, self.compact_dimensions), params)
+            rows = result.mappings().all()
+        documents = [_document_from_row(row) for row in rows]
+        if clauses:
+            # A relaxed iterative scan may return rows slightly out of order
+            documents.sort(key=lambda document: document["similarity"], reverse=True)
+        return documents
+
+    async def fetch_documents(
+        self,
+        ids: Sequence[str],
+        query_embedding,
+        filters: Optional[RetrievalFilters] = None,
+    ) -> List[Dict[str, Any]]:
+        """Fetch documents by id with their similarity to the query; rows outside `filters` are left out."""
+        if not ids:
+            return []
+        clauses, params = filters.to_sql() if filters else ((), {})
+        params.update({"query_embedding": to_vector_literal(query_embedding), "ids": list(ids)})
+        async with self.engine.connect() as conn:
+            result = await conn.execute(_filtered_statement(FETCH_DOCUMENTS_TEMPLATE, clauses), params)
+            rows = result.mappings().all()
+        return [_document_from_row(row) for row in rows]
+
+    async def fetch_sections(self, ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """Parent sections by id, as {"content", "token_count", "script"}."""
+        if not ids:
+            return {}
+        async with self.engine.connect() as conn:
+            result = await conn.execute(FETCH_SECTIONS_SQL, {"ids": list(ids)})
+            return {
+                str(row.id): {"content": row.content, "token_count": row.token_count, "script": row.script}
+                for row in result
+            }
+
+
+async def _set_local(conn, options: Dict[str, str]) -> None:
+    """Transaction-local settings, all in one round trip"""
+    names = sorted(options)
+    calls = ", ".join(f"set_config(:name_{i}, :value_{i}, true)" for i in range(len(names)))
+    params = {}
+    for i, name in enumerate(names):
+        params[f"name_{i}"], params[f"value_{i}"] = name, options[name]
+    await conn.execute(text(f"select {calls}"), params)
+
+
+def _document_from_row(row) -> Dict[str, Any]:
+    return {
+        "id": str(row["id"]),
+        "content": row["content"],
+        "metadata": row["metadata"] or {},
+        "parent_id": str(row["parent_id"]) if row["parent_id"] else None,
+        "token_count": row["token_count"],
+        "script": row["script"],
+        "similarity": float(row["similarity"]),
+    }
+
+
+class LocalFilterColumns:
+    """
+    Filter attributes of every local index row as flat arrays: department and
+    state as codes into a vocabulary (-1 when unset), the issue date as days
+    since the epoch, and each row's sources as a CSR list of codes. Filtering is
+    then a vectorized row mask instead of a pass over documents.jsonl.
+    """
+
+    NO_DATE = np.iinfo(np.int32).min
+    EPOCH = date(1970, 1, 1)
+
+    def __init__(self):
+        self.vocabularies: Dict[str, Dict[str, int]] = {"department": {}, "state": {}, "sources": {}}
+        self._codes: Dict[str, List[int]] = {"department": [], "state": [], "issued_on": []}
+        self._source_codes: List[int] = []
+        self._source_offsets: List[int] = [0]
+        self.arrays: Dict[str, np.ndarray] = {}
+
+    def _code(self, name: str, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        return self.vocabularies[name].setdefault(value, len(self.vocabularies[name]))
+
+    def append(self, metadata: Dict[str, Any], columns: Dict[str, Any]) -> None:
+        self._codes["department"].append(self._code("department", columns.get("department")))
+        self._codes["state"].append(self._code("state", columns.get("state")))
+        issued_on = columns.get("issued_on")
+        if isinstance(issued_on, str):
+            issued_on = date.fromisoformat(issued_on)
+        self._codes["issued_on"].append((issued_on - self.EPOCH).days if issued_on else self.NO_DATE)
+        sources = metadata.get("sources") or ([metadata["source"]] if metadata.get("source") else [])
+        self._source_codes.extend(self._code("sources", source) for source in sources)
+        self._source_offsets.append(len(self._source_codes))
+
+    def save(self, path: str, count: int) -> None:
+        arrays = {name: np.array(codes[:count], dtype=np.int32) for name, codes in self._codes.items()}
+        arrays["source_offsets"] = np.array(self._source_offsets[:count + 1], dtype=np.int64)
+        arrays["source_codes"] = np.array(self._source_codes[:arrays["source_offsets"][-1]], dtype=np.int32)
+        for name, vocabulary in self.vocabularies.items():
+            arrays[f"{name}_vocabulary"] = np.array(list(vocabulary), dtype=str)
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "LocalFilterColumns":
+        columns = cls()
+        with np.load(path) as data:
+            columns.arrays = {name: data[name] for name in data.files}
+        for name in columns.vocabularies:
+            vocabulary = columns.arrays.pop(f"{name}_vocabulary").tolist()
+            columns.vocabularies[name] = {value: code for code, value in enumerate(vocabulary)}
+        offsets = columns.arrays["source_offsets"]
+        columns.arrays["source_rows"] = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+        return columns
+
+    def mask(self, filters: RetrievalFilters) -> np.ndarray:
+        arrays = self.arrays
+        mask = np.ones(len(arrays["department"]), dtype=bool)
+        for name in ("department", "state"):
+            value = getattr(filters, name)
+            if value is not None:
+                mask &= arrays[name] == self.vocabularies[name].get(value, -2)
+        if filters.issued_from is not None:
+            mask &= arrays["issued_on"] >= (filters.issued_from - self.EPOCH).days
+        if filters.issued_to is not None:
+            mask &= (arrays["issued_on"] <= (filters.issued_to - self.EPOCH).days) & (arrays["issued_on"] != self.NO_DATE)
+        if filters.sources is not None:
+            codes = [self.vocabularies["sources"][source] for source in filters.sources if source in self.vocabularies["sources"]]
+            in_sources = np.zeros_like(mask)
+            in_sources[arrays["source_rows"][np.isin(arrays["source_codes"], codes)]] = True
+            mask &= in_sources
+        return mask
+
+
+class LocalVectorStore:
+    """
+    Offline vector index with the same contract as `PgVectorStore`.
+
+    The index directory holds an L2-normalized embedding matrix (`embeddings.npy`,
+    float32 or float16) that is memory-mapped rather than read, plus a JSONL
+    sidecar with one {id, content, metadata} object per row, the byte offset of
+    every line and the row ids, so only the rows that are actually returned get
+    parsed. Search is an exact, blockwise NumPy dot product run off the event loop.
+
+    If the index was written with a compact matrix (reduced dimensions, float16
+    or int8 with per-row scales), the scan runs over that instead and only the
+    top `rescore_factor` x match_count rows are read from the full matrix.
+
+    Metadata filters mask rows out of the scan using `LocalFilterColumns`.
+    """
+
+    def __init__(self, directory: str, block_size: int = 16384, rescore_factor: int = 4):
+        self.directory = directory
+        self.block_size = block_size
+        self.rescore_factor = rescore_factor
+        self.embeddings = np.load(os.path.join(directory, LOCAL_EMBEDDINGS_FILENAME), mmap_mode="r")
+        self.offsets = np.load(os.path.join(directory, LOCAL_OFFSETS_FILENAME))
+        with open(os.path.join(directory, LOCAL_MANIFEST_FILENAME), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.compact = None
+        self.compact_scales = None
+        if compact := self.manifest.get("compact"):
+            self.compact_dimensions = compact["dimensions"]
+            self.compact = np.load(os.path.join(directory, LOCAL_COMPACT_FILENAME), mmap_mode="r")
+            if compact["dtype"] == "int8":
+                self.compact_scales = np.load(os.path.join(directory, LOCAL_COMPACT_SCALES_FILENAME))
+        self._section_offsets: Optional[Dict[str, int]] = None
+        self._filter_columns: Optional[LocalFilterColumns] = None
+        with open(os.path.join(directory, LOCAL_DOCUMENTS_FILENAME), "rb") as f:
+            self._documents = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+        self._ids = np.load(os.path.join(directory, LOCAL_IDS_FILENAME)).tolist()
+        self._row_by_id = {doc_id: i for i, doc_id in enumerate(self._ids)}
+        logger.info(f"Loaded local vector index with {len(self._ids)} chunks from {directory}")
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _read_row(self, row: int) -> Dict[str, Any]:
+        start = int(self.offsets[row])
+        end = self._documents.find(b"\n", start)
+        return json.loads(self._documents[start:end if end != -1 else None])
+
+    def _document(self, row: int, similarity: float) -> Dict[str, Any]:
+        document = self._read_row(row)
+        return {
+            "id": document["id"],
+            "content": document["content"],
+            "metadata": document.get("metadata") or {},
+            "parent_id": document.get("parent_id"),
+            "token_count": document.get("token_count"),
+            "script": document.get("script"),
+            "similarity": similarity,
+        }
+
+    @staticmethod
+    def _normalize(query_embedding) -> np.ndarray:
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        return query / norm if norm else query
+
+    def _similarities(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        if rows is not None:
+            return np.asarray(self.embeddings[rows], dtype=np.float32) @ query
+        scores = np.empty(len(self.embeddings), dtype=np.float32)
+        for start in range(0, len(self.embeddings), self.block_size):
+            block = np.asarray(self.embeddings[start:start + self.block_size], dtype=np.float32)
+            scores[start:start + len(block)] = block @ query
+        return scores
+
+    def _compact_similarities(self, query_embedding) -> np.ndarray:
+        query = compact_embedding(query_embedding, self.compact_dimensions)
+        scores = np.empty(len(self.compact), dtype=np.float32)
+        for start in range(0, len(self.compact), self.block_size):
+            block = np.asarray(self.compact[start:start + self.block_size], dtype=np.float32)
+            scores[start:start + len(block)] = block @ query
+        if self.compact_scales is not None:
+            scores *= self.compact_scales
+        return scores
+
+    def _filter_mask(self, filters: Optional[RetrievalFilters]) -> Optional[np.ndarray]:
+        if not filters:
+            return None
+        if self._filter_columns is None:
+            path = os.path.join(self.directory, LOCAL_FILTERS_FILENAME)
+            if not os.path.exists(path):
+                raise ValueError(f"Local index {self.directory} was exported without filter columns")
+            self._filter_columns = LocalFilterColumns.load(path)
+        return self._filter_columns.mask(filters)
+
+    def _rescored_candidates(
+        self,
+        query: np.ndarray,
+        match_count: int,
+        mask: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        approximate = self._compact_similarities(query)
+        available = len(approximate)
+        if mask is not None:
+            approximate[~mask] = -np.inf
+            available = int(mask.sum())
+        count = min(available, match_count * self.rescore_factor)
+        if not count:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        rows = np.argpartition(-approximate, count - 1)[:count] if count < len(approximate) else np.arange(count)
+        rows.sort()  # Ascending row order keeps reads from the full matrix sequential
+        return rows, self._similarities(query, rows)
+
+    def search(
+        self,
+        query_embedding,
+        match_threshold: float,
+        match_count: int,
+        filters: Optional[RetrievalFilters] = None,
+    ) -> List[Dict[str, Any]]:
+        query = self._normalize(query_embedding)
+        if not len(self._ids) or match_count <= 0:
+            return []
+        mask = self._filter_mask(filters)
+        if self.compact is not None:
+            rows, row_scores = self._rescored_candidates(query, match_count, mask)
+            keep = row_scores > match_threshold
+            rows, row_scores = rows[keep], row_scores[keep]
+            order = np.argsort(-row_scores)[:match_count]
+            return [self._document(int(rows[i]), float(row_scores[i])) for i in order]
+
+        scores = self._similarities(query)
+        if mask is not None:
+            scores[~mask] = -np.inf
+        candidates = np.flatnonzero(scores > match_threshold)
+        if len(candidates) > match_count:
+            candidates = candidates[np.argpartition(-scores[candidates], match_count)[:match_count]]
+        candidates = candidates[np.argsort(-scores[candidates])]
+        return [self._document(int(row), float(scores[row])) for row in candidates]
+
+    def fetch(
+        self,
+        ids: Sequence[str],
+        query_embedding,
+        filters: Optional[RetrievalFilters] = None,
+    ) -> List[Dict[str, Any]]:
+        rows = np.array([self._row_by_id[doc_id] for doc_id in ids if doc_id in self._row_by_id], dtype=np.int64)
+        if (mask := self._filter_mask(filters)) is not None:
+            rows = rows[mask[rows]]
+        if not len(rows):
+            return []
+        scores = self._similarities(self._normalize(query_embedding), rows)
+        return [self._document(int(row), float(score)) for row, score in zip(rows, scores)]
+
+    async def match_documents(
+        self,
+        query_embedding,
+        match_threshold: float,
+        match_count: int,
+        filters: Optional[RetrievalFilters] = None,
+        ef_search: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        # The local scan is exact; `ef_search` only exists for the PgVectorStore contract
+        return await asyncio.to_thread(self.search, query_embedding, match_threshold, match_count, filters)
+
+    async def fetch_documents(
+        self,
+        ids: Sequence[str],
+        query_embedding,
+        filters: Optional[RetrievalFilters] = None,
+    ) -> List[Dict[str, Any]]:
+        if not ids:
+            return []
+        return await asyncio.to_thread(self.fetch, ids, query_embedding, filters)
+
+    def _load_section_offsets(self) -> Dict[str, int]:
+        offsets: Dict[str, int] = {}
+        path = os.path.join(self.directory, LOCAL_SECTIONS_FILENAME)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                offset = 0
+                for line in f:
+                    offsets[json.loads(line)["id"]] = offset
+                    offset += len(line)
+        return offsets
+
+    def sections(self, ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        if self._section_offsets is None:
+            self._section_offsets = self._load_section_offsets()
+        found: Dict[str, Dict[str, Any]] = {}
+        if not self._section_offsets:
+            # Exported without sections (or before they existed): children keep their own text
+            return found
+        with open(os.path.join(self.directory, LOCAL_SECTIONS_FILENAME), "rb") as f:
+            for section_id in ids:
+                offset = self._section_offsets.get(section_id)
+                if offset is not None:
+                    f.seek(offset)
+                    section = json.loads(f.readline())
+                    found[section_id] = {
+                        "content": section["content"],
+                        "token_count": section.get("token_count"),
+                        "script": section.get("script"),
+                    }
+        return found
+
+    async def fetch_sections(self, ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        if not ids:
+            return {}
+        return await asyncio.to_thread(self.sections, ids)
+
+    def iter_documents(self) -> Iterator[Tuple[str, str]]:
+        """(id, content) for every row, e.g. to build the lexical index"""
+        with open(os.path.join(self.directory, LOCAL_DOCUMENTS_FILENAME), "rb") as f:
+            for line in f:
+                document = json.loads(line)
+                yield document["id"], document["content"]
+
+
+def _local_columns(columns: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """Non-null optional columns of an exported row, with ids as strings"""
+    values = {}
+    for name, value in (columns[0] if columns else {}).items():
+        if isinstance(value, date):
+            values[name] = value.isoformat()
+        elif value is not None:
+            values[name] = str(value) if name == "parent_id" else value
+    return values
+
+
+def write_local_index(
+    directory: str,
+    rows: Iterable[Tuple[str, str, Dict[str, Any], Sequence[float]]],
+    count: int,
+    dimensions: int,
+    dtype: str = "float16",
+    model: Optional[str] = None,
+    compact_dimensions: int = 0,
+    compact_dtype: str = "int8",
+    sections: Optional[Iterable[Tuple[str, str]]] = None,
+) -> int:
+    """
+    Write (id, content, metadata, embedding[, columns]) rows in the
+    LocalVectorStore format, plus optional (id, content[, columns]) parent
+    sections; `columns` holds the parent_id, token_count and script values and
+    the department, state and issued_on filter attributes.
+    With `compact_dimensions`, a reduced-dimension float16 or int8 matrix is
+    written alongside for the first search pass.
+    Files are staged in a sibling directory and swapped in once complete.
+    """
+    staging = f"{directory.rstrip(os.sep)}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    matrix = np.lib.format.open_memmap(
+        os.path.join(staging, LOCAL_EMBEDDINGS_FILENAME), mode="w+", dtype=np.dtype(dtype), shape=(count, dimensions)
+    )
+    offsets = np.zeros(count, dtype=np.int64)
+    ids: List[str] = []
+    compact = None
+    scales = None
+    if compact_dimensions:
+        compact = np.lib.format.open_memmap(
+            os.path.join(staging, LOCAL_COMPACT_FILENAME),
+            mode="w+",
+            dtype=np.dtype(compact_dtype),
+            shape=(count, compact_dimensions),
+        )
+        scales = np.ones(count, dtype=np.float32)
+
+    filter_columns = LocalFilterColumns()
+    written = 0
+    with open(os.path.join(staging, LOCAL_DOCUMENTS_FILENAME), "wb") as documents:
+        for doc_id, content, metadata, embedding, *columns in rows:
+            if written == count:
+                break
+            vector = np.asarray(embedding, dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            matrix[written] = vector / norm if norm else vector
+            if compact is not None:
+                reduced = compact_embedding(vector, compact_dimensions)
+                if compact_dtype == "int8":
+                    # Symmetric per-row quantization; the row's scale restores the dot product
+                    scale = float(np.abs(reduced).max()) / 127 or 1.0
+                    compact[written] = np.round(reduced / scale).astype(np.int8)
+                    scales[written] = scale
+                else:
+                    compact[written] = reduced
+            offsets[written] = documents.tell()
+            ids.append(str(doc_id))
+            document = {"id": str(doc_id), "content": content, "metadata": metadata or {}}
+            document.update(_local_columns(columns))
+            filter_columns.append(document["metadata"], document)
+            documents.write(json.dumps(document, ensure_ascii=False).encode("utf-8") + b"\n")
+            written += 1
+
+    matrix.flush()
+    del matrix
+    if compact is not None:
+        compact.flush()
+        del compact
+    if written < count:
+        # Rows disappeared between counting and reading; shrink the matrices to match
+        for filename in (LOCAL_EMBEDDINGS_FILENAME, LOCAL_COMPACT_FILENAME if compact_dimensions else None):
+            if filename:
+                trimmed = np.load(os.path.join(staging, filename), mmap_mode="r")[:written].copy()
+                np.save(os.path.join(staging, filename), trimmed)
+        offsets = offsets[:written]
+    if sections is not None:
+        with open(os.path.join(staging, LOCAL_SECTIONS_FILENAME), "wb") as f:
+            for section_id, content, *columns in sections:
+                section = {"id": str(section_id), "content": content, **_local_columns(columns)}
+                line = json.dumps(section, ensure_ascii=False)
+                f.write(line.encode("utf-8") + b"\n")
+    if scales is not None and compact_dtype == "int8":
+        np.save(os.path.join(staging, LOCAL_COMPACT_SCALES_FILENAME), scales[:written])
+    filter_columns.save(os.path.join(staging, LOCAL_FILTERS_FILENAME), written)
+    np.save(os.path.join(staging, LOCAL_OFFSETS_FILENAME), offsets)
+    np.save(os.path.join(staging, LOCAL_IDS_FILENAME), np.array(ids, dtype=str))
+
+    with open(os.path.join(staging, LOCAL_MANIFEST_FILENAME), "w", encoding="utf-8") as f:
+        manifest = {"count": written, "dimensions": dimensions, "dtype": dtype, "model": model}
+        if compact_dimensions:
+            manifest["compact"] = {"dimensions": compact_dimensions, "dtype": compact_dtype}
+        json.dump(manifest, f)
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(staging, directory)
+    return written
+
+
+def create_vector_store(
+    backend: str,
+    engine=None,
+    local_index_dir: str = "",
+    compact_dimensions: int = 0,
+    rescore_factor: int = 4,
+    iterative_scan: str = "",
+    ef_search: int = 0,
+):
+    """Build the configured vector store ("pgvector" or "local")"""
+    if backend == "local":
+        # The local index records its own compact layout in its manifest
+        return LocalVectorStore(local_index_dir, rescore_factor=rescore_factor)
+    if backend != "pgvector":
+        raise ValueError(f"Unknown vector backend: {backend}")
+    return PgVectorStore(
+        engine,
+        compact_dimensions=compact_dimensions,
+        rescore_factor=rescore_factor,
+        iterative_scan=iterative_scan,
+        ef_search=ef_search,
+    )
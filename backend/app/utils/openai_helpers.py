@@ -105,11 +105,43 @@ def get_fallback_government_links(language: str) -> str:
     return f"{link_data['header']}\n\n" + "\n".join(link_data['sites'])
 
 
+async def summarize_exchange(previous_summary: str | None, user_message: str, assistant_answer: str) -> str:
+    """
+    Folds the latest exchange into the running conversation summary (2-3
+    sentences) with the fast model, so the prompt stays the same size however
+    long the conversation gets. Returns "" if the call fails.
+    """
+    summary_prompt = (
+        "Update the summary of a conversation between a user and an assistant with its latest exchange. "
+        "Write 2-3 sentences focusing on the main topics, user needs, and any important context. "
+        "Use the same language as the conversation.\n\n"
+        f"Summary so far: {previous_summary or '(none, this is the first exchange)'}\n\n"
+        "Latest exchange:\n"
+        f"User: {user_message}\n"
+        f"Assistant: {assistant_answer}\n"
+    )
+    try:
+        summary_response = await client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": "You are a helpful assistant that summarizes conversations."},
+                {"role": "user", "content": summary_prompt}
+            ],
+            max_tokens=128,
+            temperature=0.3
+        )
+        return summary_response.choices[0].message.content.strip()
+    except Exception as e:
+        print(f"Error during conversation summarization: {e}")
+        return ""
+
+
 async def get_openai_response(
     message: str,
     conversation_context: list,
     language: str,
-    rag_context: str | None = None
+    rag_context: str | None = None,
+    conversation_summary: str | None = None
 ) -> AsyncGenerator[str, None]:
     """
     Generates a streaming response from OpenAI's chat model, dynamically
@@ -147,6 +179,9 @@ async def get_openai_response(
             if rag_context:
                 system_prompt = rag_system_prompt
 
+        if conversation_summary:
+            system_prompt += f"\n\nPrevious conversation summary: {conversation_summary}"
+
         # Prepare messages
         messages = [{"role": "system", "content": system_prompt}]
 
@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator
+
+import orjson
+
+from ..core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def sse_frame(data: Any) -> bytes:
+    """Encode one data-only SSE message with a JSON payload"""
+    return b"data: " + orjson.dumps(data) + b"\n\n"
+
+
+class SSEWriter:
+    """
+    Encodes the frames of one event stream and measures it. `close()` records
+    frames/sec and bytes/sec for the stream as `<name>.frames_per_sec` and
+    `<name>.bytes_per_sec` samples.
+    """
+
+    def __init__(self, name: str = "sse"):
+        self.name = name
+        self.frames = 0
+        self.bytes = 0
+        self._started = time.perf_counter()
+
+    def frame(self, data: Any) -> bytes:
+        encoded = sse_frame(data)
+        self.frames += 1
+        self.bytes += len(encoded)
+        return encoded
+
+    def close(self) -> None:
+        elapsed = max(time.perf_counter() - self._started, 1e-6)
+        metrics.incr(f"{self.name}.frames", self.frames)
+        metrics.incr(f"{self.name}.bytes", self.bytes)
+        metrics.observe(f"{self.name}.frames_per_sec", self.frames / elapsed)
+        metrics.observe(f"{self.name}.bytes_per_sec", self.bytes / elapsed)
+        logger.debug(
+            f"Stream closed after {elapsed:.2f}s: {self.frames} frames, {self.bytes} bytes "
+            f"({self.frames / elapsed:.1f} frames/s, {self.bytes / elapsed:.0f} B/s)"
+        )
+
+
+async def coalesce(chunks: AsyncIterator[str], max_chars: int = 64, max_delay: float = 0.03) -> AsyncIterator[str]:
+    """
+    Re-chunks a text stream into fewer, larger pieces: buffered text is released
+    once it reaches `max_chars`, or once its oldest part has waited `max_delay`
+    seconds, whichever comes first. The source is read ahead in a task, so a
+    slow upstream never holds back text that is already due.
+    """
+    loop = asyncio.get_running_loop()
+    iterator = chunks.__aiter__()
+    buffer, size, deadline = [], 0, None
+    pending = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            timeout = None if deadline is None else max(0.0, deadline - loop.time())
+            done, _ = await asyncio.wait((pending,), timeout=timeout)
+
+            if done:
+                task, pending = pending, None
+                try:
+                    chunk = task.result()
+                except StopAsyncIteration:
+                    break
+                if not chunk:
+                    continue
+                buffer.append(chunk)
+                size += len(chunk)
+                if deadline is None:
+                    deadline = loop.time() + max_delay
+                if size < max_chars and loop.time() < deadline:
+                    continue
+            if buffer:
+                yield "".join(buffer)
+            buffer, size, deadline = [], 0, None
+
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        if pending is not None:
+            pending.cancel()
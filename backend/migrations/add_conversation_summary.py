@@ -0,0 +1,28 @@
+"""Add rolling summary column to conversations table
+
+Revision ID: add_conversation_summary
+Revises: fix_user_datetime_fields
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_conversation_summary'
+down_revision = 'fix_user_datetime_fields'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add summary column; existing conversations start without one"""
+    
+    # Refreshed after each answer from the previous summary and the latest exchange
+    op.add_column('conversations', sa.Column('summary', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Remove summary column"""
+    
+    op.drop_column('conversations', 'summary')
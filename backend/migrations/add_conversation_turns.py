@@ -0,0 +1,62 @@
+"""Add conversation_turns table for multi-turn conversations
+
+Revision ID: add_conversation_turns
+Revises: add_conversation_summary
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'add_conversation_turns'
+down_revision = 'add_conversation_summary'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create conversation_turns and copy each existing conversation in as its turn 0"""
+    
+    op.create_table(
+        'conversation_turns',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column(
+            'conversation_id',
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey('conversations.id', ondelete='CASCADE'),
+            nullable=False,
+        ),
+        sa.Column('turn_index', sa.Integer(), nullable=False),
+        sa.Column('user_question', sa.Text(), nullable=False),
+        sa.Column('assistant_answer', sa.Text(), nullable=False),
+        sa.Column('response_time', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    
+    # Recent turns are a range scan on this index; uniqueness orders concurrent appends
+    op.create_index(
+        'idx_conversation_turns_conversation_turn',
+        'conversation_turns',
+        ['conversation_id', 'turn_index'],
+        unique=True,
+    )
+    
+    # Until now a conversation was a single question/answer row
+    op.execute(
+        text("""
+            INSERT INTO conversation_turns
+                (id, conversation_id, turn_index, user_question, assistant_answer, response_time, created_at)
+            SELECT gen_random_uuid(), id, 0, user_question, assistant_answer, response_time, created_at
+            FROM conversations
+        """)
+    )
+
+
+def downgrade() -> None:
+    """Drop conversation_turns; the opening exchange remains on conversations"""
+    
+    op.drop_index('idx_conversation_turns_conversation_turn')
+    op.drop_table('conversation_turns')
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Replay a labeled query set through get_rag_context and report retrieval quality
+and per-stage latency.
+
+    python scripts/benchmark_retrieval.py queries.jsonl
+    python scripts/benchmark_retrieval.py queries.jsonl --ef-search 40,100,200,400
+    python scripts/benchmark_retrieval.py queries.jsonl --backend local --index-dir .cache/local_index
+
+Each line of the query file is a JSON object:
+
+    {"query": "...", "relevant": [{"source": "circular_12.pdf", "page": 3}, {"id": "..."}],
+     "filters": {"department": "Panchayati Raj"}, "embedding": [...]}
+
+A relevant entry matches a chunk by id, or by source file (and page, if given).
+`filters` and `embedding` are optional. The embedding function is stubbed: the
+query's stored `embedding` is used when present, otherwise a deterministic
+hashed bag-of-words vector, which exercises every stage but only gives
+meaningful recall against an index embedded the same way.
+
+For each `--ef-search` value (pgvector only; the local index searches exactly)
+it reports recall@k and MRR over the final ranking, how often the packed
+context contains a relevant chunk, p50/p95 latency per stage and the pairs sent
+to the reranker. The rerank score cache is off unless --rerank-cache is given,
+so every pass pays the full reranker cost.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.core.providers import providers
+from app.models.schemas import RetrievalFilterRequest
+from app.services import rag_service
+from app.services.vector_store import RetrievalFilters
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+STAGES = ("embed", "vector", "lexical", "rerank", "expand", "pack", "total")
+WORD_RE = re.compile(r"\w+")
+
+
+def hash_embedding(text: str, dimensions: int) -> list:
+    """Signed feature hashing of the query words, L2-normalized"""
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for word in WORD_RE.findall(text.casefold()):
+        digest = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+        vector[digest % dimensions] += 1.0 if digest >> 63 else -1.0
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).tolist()
+
+
+def load_queries(path: str) -> list:
+    queries = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if not entry.get("query") or not entry.get("relevant"):
+                raise ValueError(f"{path}:{line_number}: 'query' and 'relevant' are required")
+            filters = entry.get("filters")
+            entry["filters"] = RetrievalFilters(**RetrievalFilterRequest(**filters).model_dump()) if filters else None
+            queries.append(entry)
+    return queries
+
+
+def is_relevant(doc: dict, label: dict) -> bool:
+    if "id" in label:
+        return str(doc.get("id")) == str(label["id"])
+    metadata = doc.get("metadata") or {}
+    sources = metadata.get("sources") or [metadata.get("source")]
+    if label.get("source") not in sources:
+        return False
+    return label.get("page") is None or metadata.get("page") == label["page"]
+
+
+def percentile_ms(samples, q: float) -> float:
+    return float(np.percentile(samples, q)) if samples else 0.0
+
+
+async def run_pass(queries: list, ef_search, args) -> dict:
+    samples = {stage: [] for stage in STAGES}
+    recalls, reciprocal_ranks, packed_hits, rerank_pairs = [], [], [], []
+
+    for entry in queries:
+        trace = rag_service.RetrievalTrace()
+        started = time.perf_counter()
+        # get_rag_context logs every stage with print(); keep the report readable
+        with contextlib.redirect_stdout(sys.stdout if args.verbose else io.StringIO()):
+            await rag_service.get_rag_context(
+                entry["query"], top_k=args.top_k, filters=entry["filters"], ef_search=ef_search, trace=trace
+            )
+        samples["total"].append((time.perf_counter() - started) * 1000)
+        for stage in STAGES[:-1]:
+            if stage in trace.stages_ms:
+                samples[stage].append(trace.stages_ms[stage])
+        rerank_pairs.append(trace.rerank_pairs)
+
+        labels = entry["relevant"]
+        top = trace.ranked[:args.k]
+        recalls.append(sum(any(is_relevant(doc, label) for doc in top) for label in labels) / len(labels))
+        rank = next((i for i, doc in enumerate(trace.ranked, 1) if any(is_relevant(doc, label) for label in labels)), None)
+        reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+        ranked_by_id = {doc["id"]: doc for doc in trace.ranked}
+        packed_hits.append(any(
+            is_relevant(ranked_by_id[doc_id], label)
+            for doc_id in trace.packed_ids if doc_id in ranked_by_id
+            for label in labels
+        ))
+
+    return {
+        "recall": float(np.mean(recalls)),
+        "mrr": float(np.mean(reciprocal_ranks)),
+        "packed_hit": float(np.mean(packed_hits)),
+        "rerank_pairs": float(np.mean(rerank_pairs)),
+        "samples": samples,
+    }
+
+
+async def run(args) -> None:
+    queries = load_queries(args.queries)
+
+    # Settings are read when the providers are first built, which happens below
+    settings.VECTOR_BACKEND = args.backend
+    if args.index_dir:
+        settings.LOCAL_INDEX_DIR = args.index_dir
+    if not args.rerank_cache:
+        settings.RERANK_CACHE_SIZE = 0
+    if args.no_hybrid:
+        settings.RAG_HYBRID_ENABLED = False
+    if args.no_parents:
+        settings.RAG_PARENT_EXPANSION = False
+
+    store = providers.get("vector_store")
+    dimensions = store.embeddings.shape[1] if args.backend == "local" else args.dimensions
+    stored = {entry["query"]: entry["embedding"] for entry in queries if entry.get("embedding")}
+    rag_service.get_embedding = lambda text, model=None: stored.get(text) or hash_embedding(text, dimensions)
+
+    ef_values = [int(value) for value in args.ef_search.split(",")] if args.ef_search else [None]
+    if args.backend == "local" and args.ef_search:
+        logger.info("The local index searches exactly; --ef-search has no effect on it.")
+
+    # Warm-up: load the reranker and page in the index before timing anything
+    with contextlib.redirect_stdout(io.StringIO()):
+        await rag_service.get_rag_context(queries[0]["query"], top_k=args.top_k, filters=queries[0]["filters"])
+
+    logger.info(f"{len(queries)} queries against the {args.backend} store, recall@{args.k} over the final ranking")
+    for ef_search in ef_values:
+        result = await run_pass(queries, ef_search, args)
+        label = ef_search if ef_search is not None else f"{settings.RAG_HNSW_EF_SEARCH} (default)"
+        logger.info(
+            f"ef_search={label}: recall@{args.k}={result['recall']:.3f} MRR={result['mrr']:.3f} "
+            f"packed hit={result['packed_hit']:.3f} rerank pairs/query={result['rerank_pairs']:.1f}"
+        )
+        logger.info(f"  {'stage':<10}{'runs':>6}{'p50 ms':>10}{'p95 ms':>10}")
+        for stage, values in result["samples"].items():
+            if values:
+                logger.info(
+                    f"  {stage:<10}{len(values):>6}{percentile_ms(values, 50):>10.2f}{percentile_ms(values, 95):>10.2f}"
+                )
+
+    await providers.close()
+    if args.backend == "pgvector":
+        from app.core.database import engine
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("queries", help="Labeled query set (JSONL)")
+    parser.add_argument("--backend", choices=("pgvector", "local"), default=settings.VECTOR_BACKEND)
+    parser.add_argument("--index-dir", help="Local index directory (default: LOCAL_INDEX_DIR)")
+    parser.add_argument("--ef-search", help="Comma-separated hnsw.ef_search values to sweep (pgvector)")
+    parser.add_argument("-k", type=int, default=10, help="Cut-off for recall@k")
+    parser.add_argument("--top-k", type=int, default=None, help="Chunks packed per query (default: RAG_CONTEXT_MAX_CHUNKS)")
+    parser.add_argument("--dimensions", type=int, default=1536, help="Hashed query embedding size (pgvector)")
+    parser.add_argument("--rerank-cache", action="store_true", help="Keep the rerank score cache on")
+    parser.add_argument("--no-hybrid", action="store_true", help="Vector retrieval only, no BM25 fusion")
+    parser.add_argument("--no-parents", action="store_true", help="Disable parent section expansion")
+    parser.add_argument("--verbose", action="store_true", help="Show get_rag_context's debug output")
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
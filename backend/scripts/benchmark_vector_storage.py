@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Compare vector storage layouts by recall@k and search latency.
+
+    python scripts/benchmark_vector_storage.py --index-dir .cache/local_index
+    python scripts/benchmark_vector_storage.py --synthetic 50000 --layouts float16,int8@512,int8@256
+    python scripts/benchmark_vector_storage.py --pgvector --compact-dimensions 512
+
+Local mode writes the corpus (an exported local index, or synthetic vectors) in
+each layout, either full-precision `float32`/`float16` or a compact
+`<dtype>@<dimensions>` first pass re-scored at full precision. It reports
+recall@k against exact float32 search, p50/p95 latency and the bytes each
+search scans. Synthetic vectors concentrate their energy in the leading
+dimensions like text-embedding-3 does, but only real embeddings should decide
+the production setting.
+
+pgvector mode runs the same comparison against the live `documents` table:
+the full-precision HNSW query and the compact `embedding_compact` query with
+re-scoring, both measured against an exact sequential scan.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy import text
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.vector_store import (
+    MATCH_DOCUMENTS_SQL,
+    LocalVectorStore,
+    PgVectorStore,
+    parse_vector_literal,
+    to_vector_literal,
+    write_local_index,
+)
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def synthetic_corpus(count: int, dimensions: int, seed: int = 0) -> np.ndarray:
+    """Clustered vectors whose variance decays with the dimension index"""
+    rng = np.random.default_rng(seed)
+    decay = (1.0 / np.sqrt(1.0 + np.arange(dimensions) / 64.0)).astype(np.float32)
+    centers = rng.standard_normal((max(1, count // 50), dimensions), dtype=np.float32) * decay
+    vectors = centers[rng.integers(0, len(centers), count)]
+    vectors += rng.standard_normal((count, dimensions), dtype=np.float32) * decay * 0.5
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def make_queries(corpus: np.ndarray, count: int, noise: float, seed: int = 1) -> np.ndarray:
+    """Perturbed copies of random corpus rows, so every query has close neighbours"""
+    rng = np.random.default_rng(seed)
+    queries = corpus[rng.integers(0, len(corpus), count)].astype(np.float32)
+    queries += rng.standard_normal(queries.shape, dtype=np.float32) * noise / np.sqrt(corpus.shape[1])
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def parse_layout(layout: str):
+    """'float16' -> ('float16', 0, None); 'int8@512' -> ('float32', 512, 'int8')"""
+    if "@" not in layout:
+        return layout, 0, None
+    compact_dtype, dimensions = layout.split("@")
+    return "float32", int(dimensions), compact_dtype
+
+
+def percentile_ms(samples, q: float) -> float:
+    return float(np.percentile(samples, q) * 1000) if samples else 0.0
+
+
+def run_local(args) -> None:
+    if args.index_dir:
+        source = LocalVectorStore(args.index_dir)
+        corpus = np.asarray(source.embeddings, dtype=np.float32)
+        ids = list(source._ids)
+    else:
+        corpus = synthetic_corpus(args.synthetic, args.dimensions)
+        ids = [str(i) for i in range(len(corpus))]
+    queries = make_queries(corpus, args.queries, args.noise)
+    k = args.k
+
+    # Ground truth: exact float32 search
+    truth = [set(np.argsort(-(corpus @ query))[:k].tolist()) for query in queries]
+    logger.info(f"Corpus: {len(corpus)} x {corpus.shape[1]}, {len(queries)} queries, k={k}")
+    logger.info(f"{'layout':<16}{'rescore':>8}{'recall@k':>10}{'p50 ms':>9}{'p95 ms':>9}{'scanned MB':>12}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for layout in args.layouts.split(","):
+            dtype, compact_dimensions, compact_dtype = parse_layout(layout)
+            directory = os.path.join(workdir, layout.replace("@", "_"))
+            rows = ((doc_id, "", {}, vector) for doc_id, vector in zip(ids, corpus))
+            write_local_index(
+                directory,
+                rows,
+                len(corpus),
+                corpus.shape[1],
+                dtype,
+                compact_dimensions=compact_dimensions,
+                compact_dtype=compact_dtype or "int8",
+            )
+            row_of = {doc_id: i for i, doc_id in enumerate(ids)}
+
+            for rescore_factor in ([int(r) for r in args.rescore.split(",")] if compact_dimensions else [1]):
+                store = LocalVectorStore(directory, rescore_factor=rescore_factor)
+                scanned = store.compact.nbytes if store.compact is not None else store.embeddings.nbytes
+                store.search(queries[0], -1.0, k)  # Warm the page cache
+
+                latencies, recalls = [], []
+                for query, expected in zip(queries, truth):
+                    started = time.perf_counter()
+                    hits = store.search(query, -1.0, k)
+                    latencies.append(time.perf_counter() - started)
+                    recalls.append(len({row_of[hit["id"]] for hit in hits} & expected) / k)
+
+                logger.info(
+                    f"{layout:<16}{rescore_factor if compact_dimensions else '-':>8}{np.mean(recalls):>10.3f}"
+                    f"{percentile_ms(latencies, 50):>9.2f}{percentile_ms(latencies, 95):>9.2f}{scanned / 1e6:>12.1f}"
+                )
+
+
+async def run_pgvector(args) -> None:
+    from app.core.database import engine
+
+    async with engine.connect() as conn:
+        rows = (await conn.execute(
+            text("select embedding::text as embedding from documents where embedding is not null order by random() limit :n"),
+            {"n": args.queries},
+        )).all()
+    if not rows:
+        logger.error("No embedded documents found.")
+        return
+    corpus_sample = np.stack([parse_vector_literal(row.embedding) for row in rows])
+    queries = make_queries(corpus_sample, len(corpus_sample), args.noise)
+    k = args.k
+
+    async def exact(query) -> set:
+        async with engine.connect() as conn:
+            await conn.execute(text("set local enable_indexscan = off"))
+            result = await conn.execute(
+                MATCH_DOCUMENTS_SQL,
+                {"query_embedding": to_vector_literal(query), "match_threshold": -1.0, "match_count": k},
+            )
+            return {str(row.id) for row in result}
+
+    truth = [await exact(query) for query in queries]
+    stores = [("full", PgVectorStore(engine))]
+    for rescore_factor in (int(r) for r in args.rescore.split(",")):
+        stores.append((
+            f"halfvec@{args.compact_dimensions} x{rescore_factor}",
+            PgVectorStore(engine, compact_dimensions=args.compact_dimensions, rescore_factor=rescore_factor),
+        ))
+
+    logger.info(f"{len(queries)} queries, k={k}; recall against an exact sequential scan")
+    logger.info(f"{'store':<24}{'recall@k':>10}{'p50 ms':>9}{'p95 ms':>9}")
+    for name, store in stores:
+        await store.match_documents(queries[0], -1.0, k)
+        latencies, recalls = [], []
+        for query, expected in zip(queries, truth):
+            started = time.perf_counter()
+            hits = await store.match_documents(query, -1.0, k)
+            latencies.append(time.perf_counter() - started)
+            recalls.append(len({hit["id"] for hit in hits} & expected) / max(1, len(expected)))
+        logger.info(
+            f"{name:<24}{np.mean(recalls):>10.3f}{percentile_ms(latencies, 50):>9.2f}{percentile_ms(latencies, 95):>9.2f}"
+        )
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index-dir", help="Exported local index to benchmark (default: synthetic corpus)")
+    parser.add_argument("--synthetic", type=int, default=20000, help="Synthetic corpus size")
+    parser.add_argument("--dimensions", type=int, default=1536, help="Synthetic vector dimensions")
+    parser.add_argument("--layouts", default="float32,float16,float16@512,int8@512,int8@256")
+    parser.add_argument("--rescore", default="1,4", help="Comma-separated re-score factors for compact layouts")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.5, help="Query perturbation relative to a unit vector")
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--pgvector", action="store_true", help="Benchmark the live documents table instead")
+    parser.add_argument("--compact-dimensions", type=int, default=512, help="embedding_compact dimensions (pgvector)")
+    args = parser.parse_args()
+
+    if args.pgvector:
+        asyncio.run(run_pgvector(args))
+    else:
+        run_local(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Dump the Supabase `documents` table into the offline vector index format used by
+VECTOR_BACKEND=local, and build the matching BM25 lexical index.
+
+    python scripts/export_vector_index.py --output .cache/local_index --dtype float16
+    python scripts/export_vector_index.py --compact-dimensions 512 --compact-dtype int8
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+
+from sqlalchemy import text
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import get_settings
+from app.core.database import engine
+from app.services.lexical_index import LexicalIndex
+from app.services.vector_store import LocalVectorStore, parse_vector_literal, write_local_index
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+_DONE = object()
+
+
+class RowStream:
+    """
+    Batches of rows handed from the async reader to the writer thread through a
+    bounded queue, closed by a _DONE marker. The reader waits for queue space on
+    a worker thread, so a slow writer never blocks the event loop.
+    """
+
+    def __init__(self, max_batches: int = 4):
+        self.queue: queue.Queue = queue.Queue(maxsize=max_batches)
+        self.finished = False
+
+    async def put(self, batch: list) -> None:
+        await asyncio.to_thread(self.queue.put, batch)
+
+    async def close(self) -> None:
+        await asyncio.to_thread(self.queue.put, _DONE)
+
+    def __iter__(self):
+        while not self.finished:
+            batch = self.queue.get()
+            if batch is _DONE:
+                self.finished = True
+                return
+            yield from batch
+
+    def drain(self) -> None:
+        """Discard what is left so the reader can finish"""
+        for _ in self:
+            pass
+
+
+async def stream_documents(documents: RowStream, sections: RowStream, batch_size: int) -> None:
+    """
+    Stream every document row, then every parent section, with server-side
+    cursors. Both streams are closed even if reading fails, so the writer
+    thread always finishes.
+    """
+    try:
+        try:
+            async with engine.connect() as conn:
+                result = await conn.stream(
+                    text(
+                        "select id, content, metadata, parent_id, token_count, script, department, state, issued_on, "
+                        "embedding::text as embedding "
+                        "from documents where embedding is not null order by id"
+                    ),
+                    execution_options={"yield_per": batch_size},
+                )
+                async for partition in result.partitions(batch_size):
+                    await documents.put([
+                        (
+                            str(row.id),
+                            row.content,
+                            row.metadata,
+                            parse_vector_literal(row.embedding),
+                            {
+                                "parent_id": row.parent_id,
+                                "token_count": row.token_count,
+                                "script": row.script,
+                                "department": row.department,
+                                "state": row.state,
+                                "issued_on": row.issued_on,
+                            },
+                        )
+                        for row in partition
+                    ])
+        finally:
+            await documents.close()
+
+        async with engine.connect() as conn:
+            result = await conn.stream(
+                text("select id, content, token_count, script from document_sections order by id"),
+                execution_options={"yield_per": batch_size},
+            )
+            async for partition in result.partitions(batch_size):
+                await sections.put([
+                    (str(row.id), row.content, {"token_count": row.token_count, "script": row.script})
+                    for row in partition
+                ])
+    finally:
+        await sections.close()
+
+
+async def export(args) -> None:
+    async with engine.connect() as conn:
+        count = (await conn.execute(text("select count(*) from documents where embedding is not null"))).scalar()
+        dimensions = (await conn.execute(text("select vector_dims(embedding) from documents where embedding is not null limit 1"))).scalar()
+
+    if not count:
+        logger.error("No embedded documents found; nothing to export.")
+        return
+
+    logger.info(f"Exporting {count} documents ({dimensions} dims, {args.dtype}) to {args.output}")
+    if args.compact_dimensions:
+        logger.info(f"Writing compact {args.compact_dimensions}-dim {args.compact_dtype} matrix for the first search pass")
+    started = time.perf_counter()
+
+    # The writer is synchronous (memory-mapped file), so it runs on a thread fed by bounded queues
+    documents, sections = RowStream(), RowStream()
+    result = {}
+
+    def iter_sections():
+        # Document rows beyond the initial count that the writer did not take
+        documents.drain()
+        yield from sections
+
+    def run_writer():
+        try:
+            result["written"] = write_local_index(
+                args.output,
+                (row for row in documents if row[3].size == dimensions),
+                count,
+                dimensions,
+                args.dtype,
+                settings.EMBEDDING_MODEL,
+                compact_dimensions=args.compact_dimensions,
+                compact_dtype=args.compact_dtype,
+                sections=iter_sections(),
+            )
+        except Exception as e:
+            result["error"] = e
+        finally:
+            # Keep the reader from waiting on a full queue if the writer stopped early
+            documents.drain()
+            sections.drain()
+
+    writer = threading.Thread(target=run_writer)
+    writer.start()
+    try:
+        await stream_documents(documents, sections, args.batch_size)
+    finally:
+        await asyncio.to_thread(writer.join)
+        await engine.dispose()
+
+    if "error" in result:
+        logger.error(f"Export failed: {result['error']}")
+        sys.exit(1)
+    logger.info(f"Wrote {result['written']} rows in {time.perf_counter() - started:.1f}s")
+
+    if args.lexical:
+        store = LocalVectorStore(args.output)
+        index = LexicalIndex.build(store.iter_documents())
+        index.save(args.lexical_path)
+        logger.info(f"Lexical index with {len(index)} chunks written to {args.lexical_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=settings.LOCAL_INDEX_DIR)
+    parser.add_argument("--dtype", default="float16", choices=["float16", "float32"])
+    parser.add_argument("--compact-dimensions", type=int, default=0, help="Also write a reduced-dimension matrix (0 = off)")
+    parser.add_argument("--compact-dtype", default="int8", choices=["int8", "float16"])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--lexical-path", default=settings.LEXICAL_INDEX_PATH)
+    parser.add_argument("--no-lexical", dest="lexical", action="store_false", help="Skip building the BM25 index")
+    asyncio.run(export(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
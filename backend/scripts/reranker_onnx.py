@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Export, verify and benchmark the int8 ONNX reranker backend.
+
+    python scripts/reranker_onnx.py export  --output .cache/reranker-onnx
+    python scripts/reranker_onnx.py parity  --onnx-dir .cache/reranker-onnx
+    python scripts/reranker_onnx.py bench   --onnx-dir .cache/reranker-onnx --batch 100
+
+`parity` compares ONNX scores with the fp32 torch CrossEncoder on the same pairs
+and exits non-zero if rankings diverge; `bench` reports pairs/sec and p50/p95
+latency per batch for each backend.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.reranker_backends import DEFAULT_RERANK_MODEL, export_onnx_reranker, load_reranker
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SAMPLE_QUERIES = [
+    "MGNREGA mein job card kaise banwaye?",
+    "ग्राम सभा की बैठक कितनी बार होनी चाहिए?",
+    "15th Finance Commission grant ka upyog kin kaamon mein ho sakta hai",
+    "प्रधानमंत्री आवास योजना ग्रामीण के लिए पात्रता क्या है",
+]
+
+SAMPLE_PASSAGES = [
+    "Every rural household willing to do unskilled manual work can apply for a job card at the Gram Panchayat.",
+    "ग्राम सभा की बैठक वर्ष में कम से कम चार बार आयोजित की जाएगी।",
+    "Tied grants under the 15th Finance Commission shall be used for sanitation and drinking water supply.",
+    "लाभार्थियों का चयन SECC 2011 के आंकड़ों के आधार पर ग्राम सभा द्वारा सत्यापन के बाद किया जाता है।",
+    "The Panchayat Secretary shall maintain the cash book and reconcile it with the bank pass book every month.",
+    "Circular No. 12/2023 revises the wage rate for unskilled workers with effect from 1 April.",
+    "सामाजिक अंकेक्षण प्रत्येक छह माह में एक बार ग्राम सभा में किया जाएगा।",
+    "Gram Panchayat Development Plan ko har saal 2 October ki Gram Sabha mein pass kiya jata hai.",
+]
+
+
+def load_pairs(path: str | None, count: int):
+    """Pairs from a JSONL file of {"query", "passage"} objects, or the built-in sample"""
+    if path:
+        with open(path, encoding="utf-8") as f:
+            pairs = [(row["query"], row["passage"]) for row in map(json.loads, f) if row]
+    else:
+        pairs = [(q, p) for q in SAMPLE_QUERIES for p in SAMPLE_PASSAGES]
+    return [pairs[i % len(pairs)] for i in range(count)]
+
+
+def cmd_export(args):
+    export_onnx_reranker(args.model, args.output)
+
+
+def cmd_parity(args):
+    pairs = load_pairs(args.pairs, args.count)
+    torch_model = load_reranker("torch", args.model)
+    onnx_model = load_reranker("onnx", args.model, onnx_dir=args.onnx_dir)
+
+    torch_scores = np.asarray(torch_model.predict(pairs, show_progress_bar=False), dtype=np.float32)
+    onnx_scores = onnx_model.predict(pairs)
+
+    diff = np.abs(torch_scores - onnx_scores)
+    torch_rank = np.argsort(np.argsort(-torch_scores))
+    onnx_rank = np.argsort(np.argsort(-onnx_scores))
+    spearman = float(np.corrcoef(torch_rank, onnx_rank)[0, 1]) if len(pairs) > 1 else 1.0
+    top_k = min(args.top_k, len(pairs))
+    overlap = len(set(np.argsort(-torch_scores)[:top_k]) & set(np.argsort(-onnx_scores)[:top_k])) / top_k
+
+    logger.info(f"Pairs compared:        {len(pairs)}")
+    logger.info(f"Max abs score diff:    {diff.max():.4f}")
+    logger.info(f"Mean abs score diff:   {diff.mean():.4f}")
+    logger.info(f"Spearman rank corr:    {spearman:.4f}")
+    logger.info(f"Top-{top_k} overlap:         {overlap:.2%}")
+
+    if spearman < args.min_spearman:
+        logger.error(f"Parity check failed: rank correlation {spearman:.4f} < {args.min_spearman}")
+        sys.exit(1)
+    logger.info("Parity check passed")
+
+
+def cmd_bench(args):
+    pairs = load_pairs(args.pairs, args.batch)
+    for backend in args.backends:
+        model = load_reranker(backend, args.model, onnx_dir=args.onnx_dir)
+        model.predict(pairs[:8], batch_size=args.predict_batch_size)  # Warm up
+
+        latencies = []
+        for _ in range(args.iterations):
+            started = time.perf_counter()
+            model.predict(pairs, batch_size=args.predict_batch_size, show_progress_bar=False)
+            latencies.append(time.perf_counter() - started)
+
+        latencies = np.array(latencies)
+        logger.info(
+            f"{backend:>5}: {len(pairs) * len(latencies) / latencies.sum():8.1f} pairs/sec | "
+            f"p50 {np.percentile(latencies, 50) * 1000:7.1f} ms | "
+            f"p95 {np.percentile(latencies, 95) * 1000:7.1f} ms per {len(pairs)}-pair batch"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=DEFAULT_RERANK_MODEL)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Export and int8-quantize the reranker")
+    export_parser.add_argument("--output", default=".cache/reranker-onnx")
+    export_parser.set_defaults(func=cmd_export)
+
+    parity_parser = subparsers.add_parser("parity", help="Compare ONNX scores against torch")
+    parity_parser.add_argument("--onnx-dir", default=".cache/reranker-onnx")
+    parity_parser.add_argument("--pairs", help="JSONL file with query/passage pairs")
+    parity_parser.add_argument("--count", type=int, default=32)
+    parity_parser.add_argument("--top-k", type=int, default=5)
+    parity_parser.add_argument("--min-spearman", type=float, default=0.95)
+    parity_parser.set_defaults(func=cmd_parity)
+
+    bench_parser = subparsers.add_parser("bench", help="Benchmark pairs/sec and batch latency")
+    bench_parser.add_argument("--onnx-dir", default=".cache/reranker-onnx")
+    bench_parser.add_argument("--pairs", help="JSONL file with query/passage pairs")
+    bench_parser.add_argument("--batch", type=int, default=100)
+    bench_parser.add_argument("--iterations", type=int, default=50)
+    bench_parser.add_argument("--predict-batch-size", type=int, default=64)
+    bench_parser.add_argument("--backends", nargs="+", default=["torch", "onnx"], choices=["torch", "onnx"])
+    bench_parser.set_defaults(func=cmd_bench)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
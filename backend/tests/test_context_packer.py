@@ -0,0 +1,87 @@
+import pytest
+import tiktoken
+
+from app.services.context_packer import ContextPacker
+
+
+class WordEncoding:
+    """One token per whitespace-separated word"""
+
+    def encode(self, text):
+        return text.split()
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+@pytest.fixture
+def make_packer(monkeypatch):
+    monkeypatch.setattr(tiktoken, "encoding_for_model", lambda model: WordEncoding())
+
+    def make(token_budget, **kwargs):
+        return ContextPacker(token_budget, separator=" | ", **kwargs)
+
+    return make
+
+
+def words(prefix, count):
+    return " ".join(f"{prefix}{i}" for i in range(count))
+
+
+def test_near_duplicates_are_dropped(make_packer):
+    text = words("w", 30)
+    packed = make_packer(1000).pack([
+        {"id": "a", "content": text},
+        {"id": "b", "content": text + " extra"},
+        {"id": "c", "content": words("x", 10)},
+    ])
+
+    assert packed.chunk_ids == ["a", "c"]
+    assert packed.dropped_redundant == 1
+
+
+def test_splitter_overlap_is_trimmed_and_recounted(make_packer):
+    shared = words("s", 8)
+    packed = make_packer(1000).pack([
+        {"id": "a", "content": words("a", 20) + " " + shared, "token_count": 28},
+        # A stale stored count must not be used for the trimmed text
+        {"id": "b", "content": shared + " " + words("b", 20), "token_count": 28},
+    ])
+
+    assert packed.text.endswith(" | " + words("b", 20))
+    assert packed.trimmed_overlap_chars == len(shared) + 1
+    assert packed.recounted == 1
+    assert packed.tokens == 28 + 1 + 20
+
+
+def test_oversized_section_falls_back_to_trimmed_child(make_packer):
+    shared = words("s", 8)
+    packed = make_packer(45).pack([
+        {"id": "a", "content": words("a", 20) + " " + shared},
+        {
+            "id": "b",
+            "content": words("section", 100),
+            "fallback_content": shared + " " + words("child", 10),
+            "fallback_token_count": 18,
+            "fallback_script": "roman",
+        },
+    ])
+
+    assert packed.chunk_ids == ["a", "b"]
+    assert packed.fallbacks == 1
+    assert packed.text.endswith(" | " + words("child", 10))
+    # The overlap is not paid for twice: 28 + separator + 10 trimmed child tokens
+    assert packed.tokens == 39
+    assert packed.scripts == {"unknown": 1, "roman": 1}
+
+
+def test_chunks_over_budget_are_skipped_and_a_lone_best_chunk_truncated(make_packer):
+    packed = make_packer(10).pack([
+        {"id": "a", "content": words("a", 25)},
+        {"id": "b", "content": words("b", 5)},
+    ])
+
+    assert packed.chunk_ids == ["a"]
+    assert packed.text == words("a", 10)
+    assert packed.tokens == 10
+    assert packed.dropped_budget == 1
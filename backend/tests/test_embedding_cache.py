@@ -0,0 +1,42 @@
+import sqlite3
+
+from app.services.embedding_cache import EmbeddingCache
+
+
+class LockedConnection:
+    def execute(self, *args):
+        raise sqlite3.OperationalError("database is locked")
+
+    def close(self):
+        pass
+
+
+def test_repeated_puts_count_one_disk_entry(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.db"))
+    for _ in range(3):
+        cache.put("योजना की पात्रता", "model", [0.1, 0.2])
+    assert cache.stats()["disk_entries"] == 1
+    cache.close()
+
+
+def test_disk_hits_touch_last_used_in_batches(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.db"), memory_size=1, touch_batch_size=2)
+    cache.put("a", "model", [1.0])
+    cache.put("b", "model", [2.0])
+
+    assert cache.get("a", "model").tolist() == [1.0]  # Disk hit: "b" holds the memory slot
+    assert len(cache._touched) == 1
+    cache.get("b", "model")
+    assert cache._touched == {}
+    cache.close()
+
+
+def test_locked_disk_is_a_miss(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.db"), memory_size=1)
+    cache.put("a", "model", [1.0])
+    cache.put("b", "model", [2.0])
+    cache._db.close()
+    cache._db = LockedConnection()
+
+    assert cache.get("a", "model") is None
+    assert cache.put("c", "model", [3.0]).tolist() == [3.0]
@@ -0,0 +1,44 @@
+from app.services.ingest_manifest import IngestManifest
+
+
+def entry(chunks, sections=None):
+    return {"sha256": "", "size": 0, "mtime_ns": 0, "chunks": chunks, "sections": sections or {}}
+
+
+def test_references_group_files_sharing_a_row(tmp_path):
+    manifest = IngestManifest(str(tmp_path / ".ingest_manifest.json"))
+    manifest.set("a.pdf", entry({"h1": "row-1", "h2": "row-2"}, {"s1": "section-1"}))
+    manifest.set("b.pdf", entry({"h3": "row-2"}, {"s2": "section-2"}))
+
+    assert manifest.references() == {"row-1": {"a.pdf"}, "row-2": {"a.pdf", "b.pdf"}}
+    assert manifest.section_references() == {"section-1", "section-2"}
+
+    manifest.remove("a.pdf")
+    assert manifest.references() == {"row-2": {"b.pdf"}}
+    assert manifest.section_references() == {"section-2"}
+
+
+def test_orphans_survive_a_reload(tmp_path):
+    path = str(tmp_path / ".ingest_manifest.json")
+    manifest = IngestManifest(path)
+    manifest.set("a.pdf", entry({"h1": "row-1"}))
+    manifest.signatures["row-1"] = "00ff"
+    manifest.orphans = ["row-9"]
+    manifest.orphan_sections = ["section-9"]
+    manifest.save()
+
+    reloaded = IngestManifest(path)
+    assert reloaded.references() == {"row-1": {"a.pdf"}}
+    assert reloaded.signatures == {"row-1": "00ff"}
+    assert reloaded.orphans == ["row-9"]
+    assert reloaded.orphan_sections == ["section-9"]
+    assert not reloaded.dirty
+
+
+def test_unsupported_version_is_ignored(tmp_path):
+    path = tmp_path / ".ingest_manifest.json"
+    path.write_text('{"version": 0, "files": {"a.pdf": {"chunks": {"h1": "row-1"}}}, "orphans": ["row-9"]}')
+
+    manifest = IngestManifest(str(path))
+    assert manifest.references() == {}
+    assert manifest.orphans == []
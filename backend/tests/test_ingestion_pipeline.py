@@ -0,0 +1,73 @@
+import threading
+
+from app.services import ingestion
+from app.services.ingestion import IngestConfig, IngestionPipeline
+
+BATCHES = 6
+
+
+class FakeEmbedder:
+    def __init__(self, *args, **kwargs):
+        pass
+
+
+def make_pipeline(monkeypatch, embed):
+    # Both would load tiktoken encodings; the batches below come with token counts
+    monkeypatch.setattr(ingestion, "EmbeddingBatcher", FakeEmbedder)
+    monkeypatch.setattr(IngestionPipeline, "_load_token_encoding", staticmethod(lambda model: None))
+    # One slot per queue, so a stage that stops consuming blocks the one feeding it at once
+    pipeline = IngestionPipeline(IngestConfig(embed_concurrency=1, queue_size=1, dedup_enabled=False))
+
+    def produce(paths):
+        progress = pipeline.report.files["a.pdf"]
+        progress.chunks, progress.status = BATCHES, "embedding"
+        for i in range(BATCHES):
+            pipeline._embed_queue.put(([({"content": f"chunk {i}", "metadata": {"source": "a.pdf"}}, f"chunk {i}")], 2))
+
+    monkeypatch.setattr(pipeline, "_produce", produce)
+    pipeline.embedder.embed = embed
+    return pipeline
+
+
+def run_with_timeout(pipeline, timeout=10.0):
+    outcome = {}
+
+    def target():
+        try:
+            outcome["report"] = pipeline.run(["/pdfs/a.pdf"])
+        except Exception as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "ingestion run hung"
+    return outcome
+
+
+def test_worker_error_fails_the_run_instead_of_hanging(monkeypatch):
+    # A result without vectors breaks the embed worker outside the guarded API call
+    pipeline = make_pipeline(monkeypatch, lambda texts, tokens: object())
+
+    outcome = run_with_timeout(pipeline)
+
+    assert isinstance(outcome.get("error"), RuntimeError)
+    assert "embed worker failed" in str(outcome["error"])
+    assert pipeline.report.files["a.pdf"].status == "failed"
+    assert pipeline.report.errors[0].startswith("embed worker failed")
+    assert pipeline.report.finished_at is not None
+
+
+def test_embedding_error_fails_only_the_file(monkeypatch):
+    def embed(texts, tokens):
+        raise ValueError("rate limited")
+
+    pipeline = make_pipeline(monkeypatch, embed)
+
+    outcome = run_with_timeout(pipeline)
+
+    assert "error" not in outcome
+    progress = outcome["report"].files["a.pdf"]
+    assert progress.status == "failed"
+    assert progress.error == "embedding failed: rate limited"
+    assert not pipeline.cancel_event.is_set()
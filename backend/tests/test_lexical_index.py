@@ -0,0 +1,63 @@
+from app.services.lexical_index import LexicalIndex, LexicalIndexFile, tokenize
+from app.services.retrieval_cascade import reciprocal_rank_fusion
+
+
+def test_devanagari_digits_fold_to_ascii():
+    assert tokenize("परिपत्र संख्या १२/२०२३") == ["परिपत्र", "संख्या", "12/2023", "12", "2023"]
+
+
+def test_nukta_chandrabindu_and_joiners_are_ignored():
+    assert tokenize("ज़मीन") == tokenize("जमीन")
+    assert tokenize("यहाँ") == tokenize("यहां")
+    assert tokenize("क्‍ष") == tokenize("क्ष")
+
+
+def test_hinglish_spelling_variants_share_a_token():
+    assert tokenize("Yojnaa") == tokenize("yojna")
+    assert tokenize("neeti") == tokenize("niti")
+    assert tokenize("Aawas") == tokenize("awas") == tokenize("avas")
+
+
+def test_identifiers_keep_the_verbatim_form_and_their_parts():
+    assert tokenize("Form F-7 dated 12.03.2023") == [
+        "form", "f-7", "f", "7", "dated", "12.03.2023", "12", "03", "2023",
+    ]
+
+
+def test_search_matches_identifiers_and_hinglish_variants():
+    index = LexicalIndex.build([
+        ("a", "Pradhan Mantri Aawas Yojnaa ki patrata"),
+        ("b", "परिपत्र संख्या 12/2023 आवास योजना"),
+        ("c", "मनरेगा मजदूरी दर"),
+    ])
+
+    hits = index.search("circular १२/२०२३", top_k=5)
+    assert [doc_id for doc_id, _ in hits] == ["b"]
+    assert [doc_id for doc_id, _ in index.search("awas yojna", top_k=1)] == ["a"]
+    assert index.search("unknown words") == []
+
+
+def test_empty_corpus_has_no_hits():
+    assert LexicalIndex.build([]).search("योजना") == []
+    assert LexicalIndex.build([("a", ""), ("b", "   ")]).search("योजना") == []
+
+
+def test_index_file_round_trip(tmp_path):
+    index_file = LexicalIndexFile(str(tmp_path / "lexical.npz"))
+    assert index_file.current() is None
+
+    index_file.replace(LexicalIndex.build([("a", "आवास योजना"), ("b", "मनरेगा")]))
+    reloaded = LexicalIndexFile(index_file.path).current()
+    assert len(reloaded) == 2
+    assert reloaded.search("मनरेगा") == index_file.current().search("मनरेगा")
+
+
+def test_reciprocal_rank_fusion_merges_and_deduplicates():
+    vector = [{"id": "a"}, {"id": "b"}, {"id": "c"}]
+    lexical = [{"id": "c"}, {"id": "d"}]
+
+    fused = reciprocal_rank_fusion([vector, lexical], k=60)
+
+    assert [doc["id"] for doc in fused] == ["c", "a", "b", "d"]
+    assert fused[0]["fusion_score"] == 1 / 63 + 1 / 61
+    assert fused[0] is vector[2]  # The first list's copy of a document is kept
@@ -0,0 +1,44 @@
+from app.services.near_duplicates import MinHasher, NearDuplicateIndex
+
+WORDS = [f"w{i}" for i in range(200)]
+
+
+def text(words):
+    return " ".join(words)
+
+
+def test_signatures_are_deterministic_and_round_trip_through_hex():
+    signature = MinHasher().signature(text(WORDS))
+    assert (MinHasher().signature(text(WORDS)) == signature).all()
+    assert (MinHasher.from_hex(MinHasher.to_hex(signature)) == signature).all()
+    assert MinHasher().signature("  ...  ") is None
+
+
+def test_similarity_tracks_shingle_overlap():
+    hasher = MinHasher()
+    original = hasher.signature(text(WORDS))
+
+    assert MinHasher.similarity(original, hasher.signature(text(WORDS).upper())) == 1.0
+    assert MinHasher.similarity(original, hasher.signature(text(WORDS[:195] + ["x"] * 5))) > 0.9
+    assert MinHasher.similarity(original, hasher.signature(text(WORDS[:100] + ["y"] * 100))) < 0.7
+    assert MinHasher.similarity(original, hasher.signature(text(f"z{i}" for i in range(200)))) < 0.1
+
+
+def test_index_finds_only_pairs_above_the_threshold():
+    hasher = MinHasher()
+    index = NearDuplicateIndex(bands=8, threshold=0.9)
+    index.add("original", hasher.signature(text(WORDS)))
+    index.add("other", hasher.signature(text(f"z{i}" for i in range(200))))
+
+    assert index.find(hasher.signature(text(WORDS[:195] + ["x"] * 5))) == "original"
+    assert index.find(hasher.signature(text(WORDS[:100] + ["y"] * 100))) is None
+    assert len(index) == 2
+
+
+def test_index_prefers_the_most_similar_candidate():
+    hasher = MinHasher()
+    index = NearDuplicateIndex(threshold=0.8)
+    index.add("close", hasher.signature(text(WORDS[:190] + ["x"] * 10)))
+    index.add("exact", hasher.signature(text(WORDS)))
+
+    assert index.find(hasher.signature(text(WORDS))) == "exact"
@@ -0,0 +1,47 @@
+from app.services import rerank_cache
+from app.services.rerank_cache import RerankScoreCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_scores_are_shared_by_trivially_different_queries():
+    cache = RerankScoreCache()
+    cache.put_many("PM Awas  Yojana?", {"a": 0.7, "b": 0.2})
+
+    assert cache.get_many("pm awas yojana?", ["a", "b", "c"]) == {"a": 0.7, "b": 0.2}
+    assert cache.get_many("pm awas yojana", ["a"]) == {}
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rerank_cache.time, "monotonic", clock)
+    cache = RerankScoreCache(ttl_seconds=60)
+    cache.put_many("q", {"a": 0.5})
+
+    clock.now += 59
+    assert cache.get_many("q", ["a"]) == {"a": 0.5}
+    clock.now += 1
+    assert cache.get_many("q", ["a"]) == {}
+    assert len(cache) == 0  # Expired entries are dropped on lookup
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = RerankScoreCache(max_entries=2)
+    cache.put_many("q", {"a": 0.1, "b": 0.2})
+    cache.get_many("q", ["a"])  # "b" is now the least recently used
+    cache.put_many("q", {"c": 0.3})
+
+    assert cache.get_many("q", ["a", "b", "c"]) == {"a": 0.1, "c": 0.3}
+    assert len(cache) == 2
+
+
+def test_zero_capacity_caches_nothing():
+    cache = RerankScoreCache(max_entries=0)
+    cache.put_many("q", {"a": 0.1})
+    assert cache.get_many("q", ["a"]) == {}
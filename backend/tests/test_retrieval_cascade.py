@@ -0,0 +1,51 @@
+from app.services.retrieval_cascade import CascadeConfig, plan_rerank
+
+CONFIG = CascadeConfig(similarity_window=0.15, decisive_gap=0.10, min_pairs=4, max_pairs=6)
+
+
+def docs(*similarities):
+    return [{"id": f"d{i}", "similarity": similarity} for i, similarity in enumerate(similarities)]
+
+
+def test_single_candidate_skips_rerank():
+    candidates, decision = plan_rerank(docs(0.9), 3, CONFIG)
+    assert candidates == []
+    assert decision.reason == "single_candidate"
+    assert decision.skipped_rerank and decision.rerank_pairs == 0
+
+
+def test_pool_within_top_k_skips_rerank():
+    # Only three hits are close to the best one and top_k covers min_pairs
+    candidates, decision = plan_rerank(docs(0.9, 0.85, 0.8, 0.5, 0.4), 4, CONFIG)
+    assert candidates == []
+    assert decision.reason == "pool_within_top_k"
+
+
+def test_decisive_gap_skips_rerank():
+    candidates, decision = plan_rerank(docs(0.9, 0.88, 0.86, 0.70, 0.69, 0.68), 3, CONFIG)
+    assert candidates == []
+    assert decision.reason == "decisive_gap"
+    assert round(decision.boundary_gap, 2) == 0.16
+
+
+def test_close_race_is_reranked_within_the_pair_cap():
+    candidates, decision = plan_rerank(docs(*[0.9 - 0.01 * i for i in range(10)]), 3, CONFIG)
+    assert decision.reason == "reranked"
+    assert not decision.skipped_rerank
+    # Ten hits are in the window; max_pairs caps the pool
+    assert [doc["id"] for doc in candidates] == [f"d{i}" for i in range(6)]
+    assert decision.rerank_pairs == 6
+    assert decision.candidates == 10
+
+
+def test_min_pairs_reaches_past_a_narrow_window():
+    candidates, decision = plan_rerank(docs(0.9, 0.89, 0.6, 0.59, 0.58), 1, CONFIG)
+    assert decision.reason == "reranked"
+    assert len(candidates) == 4
+
+
+def test_no_hits():
+    candidates, decision = plan_rerank([], 3, CONFIG)
+    assert candidates == []
+    assert decision.reason == "single_candidate"
+    assert decision.top_similarity == 0.0
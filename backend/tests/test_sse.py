@@ -0,0 +1,71 @@
+import asyncio
+
+from app.utils.sse import SSEWriter, coalesce, sse_frame
+
+
+async def stream(chunks, delay=0.0):
+    for chunk in chunks:
+        if delay:
+            await asyncio.sleep(delay)
+        yield chunk
+
+
+def collect(chunks, **kwargs):
+    async def run():
+        return [piece async for piece in coalesce(chunks, **kwargs)]
+
+    return asyncio.run(run())
+
+
+def test_frames_are_data_only_json():
+    assert sse_frame({"chunk": "नमस्ते"}) == 'data: {"chunk":"नमस्ते"}\n\n'.encode("utf-8")
+
+
+def test_writer_counts_frames_and_bytes():
+    writer = SSEWriter("test.sse")
+    frame = writer.frame({"conversationId": "c1"})
+    writer.frame({"chunk": "a"})
+    writer.close()
+    assert writer.frames == 2
+    assert writer.bytes == len(frame) + len(sse_frame({"chunk": "a"}))
+
+
+def test_fast_stream_flushes_by_size():
+    # Every delta arrives at once; only max_chars releases text before the end
+    pieces = collect(stream(["abcd"] * 10), max_chars=10, max_delay=60)
+    assert pieces == ["abcdabcdabcd"] * 3 + ["abcd"]
+
+
+def test_slow_stream_flushes_by_delay():
+    # Each delta waits longer than max_delay, so none is held back for the next one
+    pieces = collect(stream(["a", "b", "c"], delay=0.05), max_chars=1000, max_delay=0.01)
+    assert pieces == ["a", "b", "c"]
+
+
+def test_text_is_never_lost_or_reordered():
+    chunks = ["", "नम", "स्ते ", "", "दुनिया"] * 5
+    pieces = collect(stream(chunks), max_chars=7, max_delay=60)
+    assert "".join(pieces) == "".join(chunks)
+    assert all(pieces)
+
+
+def test_closing_early_stops_the_source():
+    closed = []
+
+    async def source():
+        try:
+            while True:
+                await asyncio.sleep(0.001)
+                yield "x"
+        finally:
+            closed.append(True)
+
+    async def run():
+        pieces = coalesce(source(), max_chars=3, max_delay=60)
+        first = await pieces.__anext__()
+        await pieces.aclose()
+        await asyncio.sleep(0.01)
+        return first
+
+    assert asyncio.run(run()) == "xxx"
+    assert closed == [True]
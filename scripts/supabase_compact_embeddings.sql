@@ -0,0 +1,16 @@
+-- Opt-in migration: compact embeddings for two-stage search
+--
+-- Only needed when EMBEDDING_COMPACT_DIMENSIONS=512; leave it out otherwise.
+-- Requires pgvector >= 0.7 (halfvec, subvector, l2_normalize and halfvec HNSW indexes).
+-- Run it after supabase_schema.sql. Adding a stored generated column rewrites the
+-- documents table under an exclusive lock, so run it in a maintenance window.
+--
+-- The leading 512 dimensions of a text-embedding-3 vector, re-normalized, are what the
+-- API returns for `dimensions=512`; stored as half precision they take 1 KB instead of
+-- 6 KB per row. The HNSW index over them produces candidates that the app re-scores
+-- against the full `embedding`. The column is generated, so existing rows are backfilled
+-- and ingestion needs no changes.
+alter table documents add column if not exists embedding_compact halfvec(512)
+    generated always as (l2_normalize(subvector(embedding, 1, 512))::halfvec(512)) stored;
+create index if not exists ix_documents_embedding_compact on documents using hnsw (embedding_compact halfvec_cosine_ops)
+    with (m = 16, ef_construction = 64);
@@ -69,6 +69,34 @@ CREATE TABLE IF NOT EXISTS conversations (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Every exchange of a conversation, in order. The conversations row is the header (its
+-- question/answer columns repeat the opening exchange, turn 0, for listings); the
+-- (conversation_id, turn_index) index serves "last N turns" as one range scan.
+CREATE TABLE IF NOT EXISTS conversation_turns (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    conversation_id UUID NOT NULL REFERENCES conversations(id) ON DELETE CASCADE,
+    turn_index INTEGER NOT NULL,
+    user_question TEXT NOT NULL,
+    assistant_answer TEXT NOT NULL,
+    response_time INTEGER NOT NULL, -- Response time in milliseconds
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_conversation_turns_conversation_turn
+    ON conversation_turns(conversation_id, turn_index);
+
+ALTER TABLE conversation_turns ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can access turns of their own conversations" ON conversation_turns;
+CREATE POLICY "Users can access turns of their own conversations" ON conversation_turns
+    FOR ALL USING (
+        EXISTS (SELECT 1 FROM conversations c WHERE c.id = conversation_id AND c.user_id = auth.uid())
+    );
+
+-- Rolling 2-3 sentence summary, refreshed in the background after each answer and
+-- read by the next turn instead of re-summarizing the whole history
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS summary TEXT;
+
 -- Create indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_conversations_user_id ON conversations(user_id);
 CREATE INDEX IF NOT EXISTS idx_conversations_created_at ON conversations(created_at);
@@ -96,6 +124,40 @@ create table if not exists documents (
     embedding vector(1536)
 );
 
+-- Parent sections (a page, or a heading block of a long page). Documents rows are the
+-- small child chunks that get embedded and matched; the parent text is fetched only
+-- for the winning children and sent to the LLM in their place.
+create table if not exists document_sections (
+    id uuid primary key default gen_random_uuid(),
+    source text not null,
+    page int,
+    content text not null,
+    content_hash text
+);
+create index if not exists ix_document_sections_source on document_sections (source);
+
+alter table documents add column if not exists parent_id uuid references document_sections (id) on delete set null;
+create index if not exists ix_documents_parent_id on documents (parent_id);
+
+-- Computed once at ingestion so the request path never re-tokenizes or re-detects chunk
+-- text: tiktoken count for the chat model's encoding, and the dominant script
+-- ('devanagari', 'roman' or 'mixed').
+alter table documents add column if not exists token_count int;
+alter table documents add column if not exists script text;
+alter table document_sections add column if not exists token_count int;
+alter table document_sections add column if not exists script text;
+
+-- Metadata prefilters (RetrievalFilters): recorded at ingestion from the PDF directory's
+-- ingest metadata file and the PDF itself, and pushed into the vector query. A chunk
+-- shared by near-duplicate files lists all of them in metadata.sources.
+alter table documents add column if not exists department text;
+alter table documents add column if not exists state text;
+alter table documents add column if not exists issued_on date;
+create index if not exists ix_documents_department on documents (department);
+create index if not exists ix_documents_state on documents (state);
+create index if not exists ix_documents_issued_on on documents (issued_on);
+create index if not exists ix_documents_sources on documents using gin ((metadata->'sources'));
+
 -- Create a function to search for documents (using original simpler SQL function)
 create or replace function match_documents (
   query_embedding vector(1536),
@@ -122,4 +184,10 @@ as $$
 $$;
 
 -- Create an index for the documents table (HNSW with correct syntax)
-create index if not exists ix_documents_embedding on documents using hnsw (embedding vector_cosine_ops);
\ No newline at end of file
+-- m / ef_construction are pgvector's defaults, spelled out because they bound the recall
+-- any query-time hnsw.ef_search (RAG_HNSW_EF_SEARCH) can reach; raising them needs a rebuild.
+create index if not exists ix_documents_embedding on documents using hnsw (embedding vector_cosine_ops)
+    with (m = 16, ef_construction = 64);
+
+-- Compact embeddings for two-stage search (EMBEDDING_COMPACT_DIMENSIONS > 0) are an
+-- opt-in migration: scripts/supabase_compact_embeddings.sql (needs pgvector >= 0.7).